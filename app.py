@@ -1,12 +1,36 @@
-from flask import Flask, render_template, redirect, url_for, request, flash, session, jsonify, send_file
+from flask import Flask, render_template, redirect, url_for, request, flash, session, jsonify, send_file, stream_with_context, abort
 from flask_sqlalchemy import SQLAlchemy
 from forms import UserRegistrationForm, LoginForm, SubjectForm, ChapterForm, QuizForm, QuestionForm, UserProfileForm
-from models import db, User, Subject, Chapter, Quiz, Question, QuizAttempt
+from models import db, User, Subject, Chapter, Quiz, Question, QuizAttempt, QuestionStats, UserStats, AttemptSession
+from reports import admin_summary_report
+from migrations import upgrade_database
+from database import init_database
+from catalogue import catalogue_snapshot
+from cache import init_cache, cached, invalidate, cache_stats, CATALOGUE, SUMMARY
+from search import search_users, search_subjects
+from auth import hash_password, verify_password, check_login, load_identity, forget_identity
+from grading import get_answer_key, bump_quiz_version
+from deletion import cascade_delete, attempts_in_scope, deletion_pending, pending_deletions
+from exports import export_attempts, export_filename, parse_date as parse_export_date, ExportError, CONTENT_TYPES as EXPORT_CONTENT_TYPES
+from leaderboards import init_leaderboards, get_leaderboards
+from jobs import start_job, run_inline, get_job, list_jobs
+from summary_pdf import summary_cache_key, request_summary_pdf, SummaryPdfFailed
+from batch_grading import grade_stream, grade_binary_stream, detect_format, SheetError, DEFAULT_CHUNK_SIZE
+from attempt_sessions import start_session, claim_session, session_layout, is_stale, remaining_seconds, ensure_reaper, reap_expired_sessions, SessionMissing, SessionExpired, SessionStale
+from item_analysis import form_picks, pack_responses, analyse_items, question_stats
+from question_import import import_stream, import_binary_stream, detect_format as detect_question_format, QuestionImportError, DEFAULT_CHUNK_SIZE as IMPORT_CHUNK_SIZE
+from quiz_payload import get_quiz_payload, payload_etag
+from autosave import parse_answers, as_form, remember_session, session_owner, buffer_answers, saved_answers, forget_session, ensure_flusher, AutosaveError
+from trends import dashboard_history, trend_page
+from stats import record_attempt, rebuild_user_stats, get_user_stats, get_subject_stats, get_month_stats, month_name
+from instrumentation import init_instrumentation
+from assets import init_assets, build_assets, VENDOR
 from flask_login import login_required, login_user, logout_user, current_user, LoginManager
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from sqlalchemy import or_
 from sqlalchemy.exc import IntegrityError
-import hashlib
+from sqlalchemy.orm import contains_eager
+import hmac
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, IntegerField, SelectField
 from wtforms.validators import DataRequired, NumberRange
@@ -14,19 +38,18 @@ import logging
 from logging.handlers import RotatingFileHandler
 import os
 import argparse
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from io import BytesIO
+import click
 
-# Create logs directory if it doesn't exist
-if not os.path.exists('logs'):
-    os.mkdir('logs')
+class LogFileHandler(RotatingFileHandler):
+    """Rotating log file whose directory is only created when the first record is written."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.baseFilename)), exist_ok=True)
+        return super()._open()
 
 # Configure logging
 formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-file_handler = RotatingFileHandler('logs/quiz_master.log', maxBytes=10240, backupCount=10)
+file_handler = LogFileHandler('logs/quiz_master.log', maxBytes=10240, backupCount=10, delay=True)
 file_handler.setFormatter(formatter)
 file_handler.setLevel(logging.INFO)
 
@@ -34,13 +57,51 @@ file_handler.setLevel(logging.INFO)
 app = Flask(__name__)
 app.logger.addHandler(file_handler)
 app.logger.setLevel(logging.INFO)
-app.logger.info('Quiz Master startup')
 
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your_secret_key')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///site.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SHOW_ERROR_DETAILS'] = True  # Set to True to see detailed errors instead of 500.html
-db.init_app(app)
+app.config['PDF_CACHE_DIR'] = os.environ.get('PDF_CACHE_DIR', 'pdf_cache')
+app.config['PDF_WORKERS'] = int(os.environ.get('PDF_WORKERS', 2))
+app.config['PDF_RETRY_SECONDS'] = int(os.environ.get('PDF_RETRY_SECONDS', 30))  # A failed summary PDF is reported, not rebuilt, for this long
+app.config['DELETE_BATCH_SIZE'] = int(os.environ.get('DELETE_BATCH_SIZE', 5000))
+app.config['BACKGROUND_DELETE_THRESHOLD'] = int(os.environ.get('BACKGROUND_DELETE_THRESHOLD', 20000))  # Attempts
+app.config['IMPORT_ERRORS_SHOWN'] = int(os.environ.get('IMPORT_ERRORS_SHOWN', 10))  # Row errors flashed after an upload
+app.config['EXPORT_BATCH_SIZE'] = int(os.environ.get('EXPORT_BATCH_SIZE', 5000))  # Attempts fetched and encoded per chunk
+app.config['ANALYSIS_BATCH_SIZE'] = int(os.environ.get('ANALYSIS_BATCH_SIZE', 5000))  # Attempts streamed per fetch
+app.config['BACKGROUND_ANALYSIS_THRESHOLD'] = int(os.environ.get('BACKGROUND_ANALYSIS_THRESHOLD', 50000))  # Attempts
+app.config['PASSWORD_HASH_COST'] = int(os.environ.get('PASSWORD_HASH_COST', 2 ** 14))  # scrypt N; see benchmarks/bench_password_cost.py
+app.config['IDENTITY_CACHE_TTL'] = int(os.environ.get('IDENTITY_CACHE_TTL', 30))  # Seconds a logged-in user is served without a user-table read
+app.config['INSTRUMENTATION_ENABLED'] = os.environ.get('INSTRUMENTATION_ENABLED', '0') == '1'
+app.config['METRICS_WINDOW'] = int(os.environ.get('METRICS_WINDOW', 1024))  # Samples kept per endpoint for percentiles
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')  # Bearer token for scrapers that cannot log in
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # Fraction of requests profiled
+app.config['PROFILE_SLOW_MS'] = int(os.environ.get('PROFILE_SLOW_MS', 500))
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')  # memory, sqlite (shared by workers) or none
+app.config['CACHE_PATH'] = os.environ.get('CACHE_PATH', 'cache/quiz_master_cache.sqlite3')
+app.config['CACHE_MAX_ENTRIES'] = int(os.environ.get('CACHE_MAX_ENTRIES', 256))
+app.config['CACHE_DEFAULT_TTL'] = int(os.environ.get('CACHE_DEFAULT_TTL', 300))  # Seconds
+app.config['SUMMARY_CACHE_TTL'] = int(os.environ.get('SUMMARY_CACHE_TTL', 60))  # New attempts show up within this many seconds
+init_cache(app)
+app.config['ATTEMPT_GRACE_SECONDS'] = int(os.environ.get('ATTEMPT_GRACE_SECONDS', 30))  # Late submissions accepted after the deadline
+app.config['SESSION_REAP_INTERVAL'] = int(os.environ.get('SESSION_REAP_INTERVAL', 300))  # Seconds between sweeps of abandoned sessions
+app.config['AUTOSAVE_FLUSH_INTERVAL'] = float(os.environ.get('AUTOSAVE_FLUSH_INTERVAL', 5))  # Seconds between batched autosave writes
+app.config['LEADERBOARD_SYNC_INTERVAL'] = float(os.environ.get('LEADERBOARD_SYNC_INTERVAL', 5))  # Seconds before other workers' attempts show up
+init_leaderboards(app)
+app.config['DATABASE_PROFILE'] = os.environ.get('DATABASE_PROFILE', 'default')  # 'production' enables WAL and a sized pool for SQLite
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # Bytes
+app.config['SQLITE_CACHE_SIZE_KB'] = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536))  # Per connection
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))  # Match the server's thread count
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # Seconds
+if app.config['INSTRUMENTATION_ENABLED']:
+    # Must run before db.init_app so the engine picks up the row-counting cursor
+    init_instrumentation(app)
+init_database(app)
+init_assets(app)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -49,27 +110,23 @@ login_manager.login_message_category = 'info'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
-
-# Create tables and admin user
-with app.app_context():
-    # Create all tables if they don't exist
-    db.create_all()
-    
-    # Check if admin user exists
-    admin = User.query.filter_by(username='admin@example.com').first()
-    if not admin:
-        # Create admin user
-        admin = User(
-            username='admin@example.com',
-            password=hashlib.sha256('admin123'.encode()).hexdigest(),
-            full_name='Administrator',
-            qualification='Admin',
-            dob=datetime.now().date(),
-            is_admin=True
-        )
-        db.session.add(admin)
-        db.session.commit()
+    return load_identity(int(user_id))
+
+def seed_admin(username='admin@example.com', password='admin123'):
+    """Create the administrator account unless it already exists; returns True if created."""
+    if User.query.filter_by(username=username).first():
+        return False
+    admin = User(
+        username=username,
+        password=hash_password(password),
+        full_name='Administrator',
+        qualification='Admin',
+        dob=datetime.now().date(),
+        is_admin=True
+    )
+    db.session.add(admin)
+    db.session.commit()
+    return True
 
 @app.route('/')
 def index():
@@ -80,7 +137,7 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.password == hashlib.sha256(form.password.data.encode()).hexdigest():
+        if check_login(user, form.password.data):
             login_user(user)
             flash('Login successful!', 'success')
             if user.username == 'admin@example.com':  
@@ -106,13 +163,14 @@ def register():
             
             new_user = User(
                 username=form.username.data,
-                password=hashlib.sha256(form.password.data.encode()).hexdigest(),
+                password=hash_password(form.password.data),
                 full_name=form.full_name.data,
                 qualification=form.qualification.data,
                 dob=form.dob.data
             )
             db.session.add(new_user)
             db.session.commit()
+            invalidate(SUMMARY)
             flash('Registration successful! Please login.', 'success')
             return redirect(url_for('login'))
         except Exception as e:
@@ -135,14 +193,62 @@ def admin_dashboard():
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('index'))
     
+    # Subjects and users are fetched page by page from the search endpoints
     active_tab = request.args.get('tab', 'subject')
-    subjects = Subject.query.all()
-    users = User.query.all()
-    
-    return render_template('admin_dashboard.html', 
-                         subjects=subjects, 
-                         users=users, 
-                         active_tab=active_tab)
+    return render_template('admin_dashboard.html', active_tab=active_tab)
+
+@app.route('/admin/search/users')
+@login_required
+def admin_search_users():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin privileges required.'}), 403
+    
+    results, has_more = search_users(request.args.get('q', ''),
+                                     after=request.args.get('after', type=int),
+                                     limit=request.args.get('limit', type=int))
+    users = []
+    for user, stats in results:
+        average_score = None
+        if stats and stats.total_questions > 0:
+            average_score = round(stats.total_score / stats.total_questions * 100, 1)
+        users.append({
+            'id': user.id,
+            'full_name': user.full_name,
+            'username': user.username,
+            'qualification': user.qualification,
+            'dob': user.dob.strftime('%Y-%m-%d'),
+            'attempts': stats.total_attempts if stats else 0,
+            'average_score': average_score,
+            'delete_url': url_for('delete_user', user_id=user.id)
+        })
+    return jsonify({'results': users, 'next_after': users[-1]['id'] if has_more else None})
+
+@app.route('/admin/search/subjects')
+@login_required
+def admin_search_subjects():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin privileges required.'}), 403
+    
+    results, has_more = search_subjects(request.args.get('q', ''),
+                                        after=request.args.get('after', type=int),
+                                        limit=request.args.get('limit', type=int))
+    subjects = []
+    for subject in results:
+        subjects.append({
+            'id': subject.id,
+            'name': subject.name,
+            'description': subject.description or '',
+            'edit_url': url_for('edit_subject', subject_id=subject.id),
+            'delete_url': url_for('delete_subject', subject_id=subject.id),
+            'add_chapter_url': url_for('add_chapter', subject_id=subject.id),
+            'chapters': [{
+                'id': chapter.id,
+                'name': chapter.name,
+                'edit_url': url_for('edit_chapter', chapter_id=chapter.id),
+                'delete_url': url_for('delete_chapter', chapter_id=chapter.id)
+            } for chapter in subject.chapters]
+        })
+    return jsonify({'results': subjects, 'next_after': subjects[-1]['id'] if has_more else None})
 
 @app.route('/quiz_management')
 @login_required
@@ -152,11 +258,9 @@ def quiz_management():
         return redirect(url_for('index'))
     
     try:
-        # Get all subjects with their chapters and quizzes
-        subjects = Subject.query.all()
-        
-        # The relationships are already loaded due to lazy=True in the models
-        # No need to force load them with .all()
+        # Get all subjects with their chapters, quizzes and question ids
+        # in one query per level instead of one lazy load per node
+        subjects = cached(CATALOGUE, 'tree', catalogue_snapshot)
         
         return render_template('quiz_management.html', subjects=subjects)
     except Exception as e:
@@ -171,7 +275,68 @@ def manage_questions(quiz_id):
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('index'))
     quiz = Quiz.query.get_or_404(quiz_id)
-    return render_template('manage_questions.html', quiz=quiz)
+    return render_template('manage_questions.html', quiz=quiz, stats=question_stats(quiz_id))
+
+@app.route('/manage_questions/<int:quiz_id>/import', methods=['POST'])
+@login_required
+def import_questions(quiz_id):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+    
+    Quiz.query.get_or_404(quiz_id)
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Choose a CSV, JSON or Markdown file to import.', 'warning')
+        return redirect(url_for('manage_questions', quiz_id=quiz_id))
+    dry_run = bool(request.form.get('dry_run'))
+    try:
+        report = import_binary_stream(upload.stream, detect_question_format(upload.filename, upload.mimetype),
+                                      quiz_id=quiz_id, dry_run=dry_run)
+    except QuestionImportError as e:
+        flash(f'Import failed: {e}', 'danger')
+        return redirect(url_for('manage_questions', quiz_id=quiz_id))
+    
+    app.logger.info(f"Question import into quiz {quiz_id}: {report['inserted']}/{report['processed']} inserted, "
+                    f"{report['error_count']} errors, {report['rows_per_second']} rows/s")
+    if dry_run:
+        flash(f"Dry run: {report['valid']} of {report['processed']} questions are valid "
+              f"({report['rows_per_second']} rows/s).", 'info')
+    else:
+        flash(f"Imported {report['inserted']} of {report['processed']} questions "
+              f"({report['rows_per_second']} rows/s).", 'success' if report['inserted'] else 'warning')
+    shown = app.config['IMPORT_ERRORS_SHOWN']
+    for error in report['errors'][:shown]:
+        flash(f"Line {error['line']}: {error['error']}", 'danger')
+    if report['error_count'] > shown:
+        flash(f"...and {report['error_count'] - shown} more errors.", 'danger')
+    return redirect(url_for('manage_questions', quiz_id=quiz_id))
+
+@app.route('/manage_questions/<int:quiz_id>/analyse', methods=['POST'])
+@login_required
+def analyse_questions(quiz_id):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+    
+    quiz = Quiz.query.get_or_404(quiz_id)
+    try:
+        # Large response histories are analysed on a background thread
+        attempts = QuizAttempt.query.filter_by(quiz_id=quiz_id).count()
+        if attempts > app.config['BACKGROUND_ANALYSIS_THRESHOLD']:
+            job = start_job('analyse_items', f'Analyse questions of quiz "{quiz.remarks}"', analyse_items,
+                            [quiz_id], batch_size=app.config['ANALYSIS_BATCH_SIZE'])
+            flash(f'Question analytics are being computed in the background (job {job.id}).', 'info')
+        else:
+            run_inline('analyse_items', f'Analyse questions of quiz "{quiz.remarks}"', analyse_items,
+                       [quiz_id], batch_size=app.config['ANALYSIS_BATCH_SIZE'])
+            flash('Question analytics updated.', 'success')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f'Error analysing questions: {str(e)}')
+        flash('An error occurred while computing question analytics.', 'danger')
+    
+    return redirect(url_for('manage_questions', quiz_id=quiz_id))
 
 @app.route('/add_quiz/<int:chapter_id>', methods=['GET', 'POST'])
 @login_required
@@ -187,11 +352,14 @@ def add_quiz(chapter_id):
         quiz = Quiz(
             time_duration=form.time_duration.data,
             remarks=form.remarks.data,
+            questions_per_attempt=form.questions_per_attempt.data,
+            shuffle=form.shuffle.data,
             chapter_id=chapter_id
         )
         db.session.add(quiz)
         try:
             db.session.commit()
+            invalidate(CATALOGUE, SUMMARY)
             flash('Quiz added successfully.', 'success')
             return redirect(url_for('quiz_management'))
         except:
@@ -213,8 +381,13 @@ def edit_quiz(quiz_id):
     if form.validate_on_submit():
         quiz.time_duration = form.time_duration.data
         quiz.remarks = form.remarks.data
+        quiz.questions_per_attempt = form.questions_per_attempt.data
+        quiz.shuffle = form.shuffle.data
+        # The title and duration are part of the cached question payload
+        bump_quiz_version(quiz)
         try:
             db.session.commit()
+            invalidate(CATALOGUE, SUMMARY)
             flash('Quiz updated successfully.', 'success')
             return redirect(url_for('quiz_management'))
         except:
@@ -223,6 +396,60 @@ def edit_quiz(quiz_id):
     
     return render_template('edit_quiz.html', form=form, quiz=quiz)
 
+def delete_with_cascade(kind, target_id, label):
+    # Deletions run as batched short transactions; large ones move to a
+    # background job so the request returns immediately
+    batch_size = app.config['DELETE_BATCH_SIZE']
+    if attempts_in_scope(kind, target_id) > app.config['BACKGROUND_DELETE_THRESHOLD']:
+        return start_job(f'delete_{kind}', f'Delete {label}', cascade_delete, kind, target_id, batch_size=batch_size)
+    run_inline(f'delete_{kind}', f'Delete {label}', cascade_delete, kind, target_id, batch_size=batch_size)
+    return None
+
+@app.route('/admin/jobs')
+@login_required
+def admin_jobs():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin privileges required.'}), 403
+    return jsonify({'jobs': [job.to_dict() for job in list_jobs()]})
+
+@app.route('/admin/jobs/<job_id>')
+@login_required
+def admin_job_status(job_id):
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin privileges required.'}), 403
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job.'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/admin/metrics')
+def admin_metrics():
+    registry = app.extensions.get('instrumentation')
+    if registry is None:
+        return jsonify({'error': 'Instrumentation is disabled.'}), 404
+    token = app.config['METRICS_TOKEN']
+    authorized = token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized and not (current_user.is_authenticated and current_user.is_admin):
+        return jsonify({'error': 'Admin privileges required.'}), 403
+    return app.response_class(registry.prometheus_text() + cache_metrics_text(), mimetype='text/plain; version=0.0.4')
+
+def cache_metrics_text():
+    stats = cache_stats()
+    lines = []
+    for name in ('hits', 'misses', 'evictions', 'expirations', 'invalidations'):
+        lines.append(f'# TYPE quiz_master_cache_{name}_total counter')
+        lines.append(f'quiz_master_cache_{name}_total{{backend="{stats["backend"]}"}} {stats[name]}')
+    lines.append('# TYPE quiz_master_cache_entries gauge')
+    lines.append(f'quiz_master_cache_entries{{backend="{stats["backend"]}"}} {stats["entries"]}')
+    return '\n'.join(lines) + '\n'
+
+@app.route('/admin/cache')
+@login_required
+def admin_cache_stats():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin privileges required.'}), 403
+    return jsonify(cache_stats())
+
 @app.route('/delete_quiz/<int:quiz_id>', methods=['POST'])
 @login_required
 def delete_quiz(quiz_id):
@@ -233,11 +460,11 @@ def delete_quiz(quiz_id):
     quiz = Quiz.query.get_or_404(quiz_id)
     try:
         # Delete all questions and attempts associated with this quiz
-        Question.query.filter_by(quiz_id=quiz_id).delete()
-        QuizAttempt.query.filter_by(quiz_id=quiz_id).delete()
-        db.session.delete(quiz)
-        db.session.commit()
-        flash('Quiz deleted successfully.', 'success')
+        job = delete_with_cascade('quiz', quiz_id, f'quiz "{quiz.remarks}"')
+        if job:
+            flash(f'Quiz "{quiz.remarks}" is being deleted in the background (job {job.id}).', 'info')
+        else:
+            flash('Quiz deleted successfully.', 'success')
     except:
         db.session.rollback()
         flash('An error occurred while deleting the quiz.', 'danger')
@@ -271,7 +498,9 @@ def add_question(quiz_id):
                     quiz_id=quiz_id
                 )
                 db.session.add(question)
+                bump_quiz_version(quiz)
                 db.session.commit()
+                invalidate(CATALOGUE, SUMMARY)
                 flash('Question added successfully.', 'success')
                 return redirect(url_for('manage_questions', quiz_id=quiz_id))
             except Exception as e:
@@ -302,8 +531,10 @@ def edit_question(question_id):
         question.option3 = form.option3.data
         question.option4 = form.option4.data
         question.correct_option = form.correct_option.data
+        bump_quiz_version(question.quiz)
         try:
             db.session.commit()
+            invalidate(CATALOGUE, SUMMARY)
             flash('Question updated successfully.', 'success')
             return redirect(url_for('manage_questions', quiz_id=question.quiz_id))
         except:
@@ -322,8 +553,11 @@ def delete_question(question_id):
     question = Question.query.get_or_404(question_id)
     quiz_id = question.quiz_id
     try:
+        bump_quiz_version(question.quiz)
+        QuestionStats.query.filter_by(question_id=question_id).delete()
         db.session.delete(question)
         db.session.commit()
+        invalidate(CATALOGUE, SUMMARY)
         flash('Question deleted successfully.', 'success')
     except:
         db.session.rollback()
@@ -337,76 +571,55 @@ def user_dashboard():
     if current_user.is_admin:
         return redirect(url_for('admin_dashboard'))
 
-    # Get quizzes with at least one question
-    quizzes = Quiz.query\
+    # Get quizzes with at least one question, with chapter, subject and question count in one query
+    quizzes = db.session.query(Quiz, db.func.count(Question.id))\
         .join(Chapter, Quiz.chapter_id == Chapter.id)\
         .join(Subject, Chapter.subject_id == Subject.id)\
         .join(Question, Quiz.id == Question.quiz_id)\
-        .group_by(Quiz.id)\
+        .options(contains_eager(Quiz.chapter).contains_eager(Chapter.subject))\
+        .group_by(Quiz.id, Chapter.id, Subject.id)\
         .having(db.func.count(Question.id) > 0)\
         .all()
 
-    # Get all attempts for trend chart
-    all_attempts = QuizAttempt.query\
-        .filter_by(user_id=current_user.id)\
-        .order_by(QuizAttempt.attempt_date.asc())\
-        .all()
-
-    # Get only 2 recent attempts for display
-    recent_attempts = QuizAttempt.query\
-        .filter_by(user_id=current_user.id)\
-        .order_by(QuizAttempt.attempt_date.desc())\
-        .limit(2)\
-        .all()
-
-    # Convert recent attempts to serializable format
-    recent_attempts_data = []
-    for attempt in recent_attempts:
-        quiz = Quiz.query.get(attempt.quiz_id)
-        recent_attempts_data.append({
-            'quiz_name': quiz.remarks if quiz else 'Unknown Quiz',
-            'score': attempt.score,
-            'total_questions': attempt.total_questions,
-            'attempt_date': attempt.attempt_date.strftime('%Y-%m-%d %H:%M:%S')
-        })
-
-    # Convert all attempts to serializable format for trend chart
-    trend_data = []
-    for attempt in all_attempts:
-        quiz = Quiz.query.get(attempt.quiz_id)
-        trend_data.append({
-            'quiz_name': quiz.remarks if quiz else 'Unknown Quiz',
-            'score': attempt.score,
-            'total_questions': attempt.total_questions,
-            'attempt_date': attempt.attempt_date.strftime('%Y-%m-%d'),
-            'percentage': round((attempt.score / attempt.total_questions * 100), 1)
-        })
-
-    # Calculate subject-wise performance using a single query
-    subject_stats = db.session.query(
-        Subject.name,
-        db.func.count(QuizAttempt.id).label('total_attempts'),
-        db.func.avg(db.func.cast(QuizAttempt.score * 100.0 / QuizAttempt.total_questions, db.Float)).label('avg_score')
-    ).join(Chapter, Subject.id == Chapter.subject_id)\
-     .join(Quiz, Chapter.id == Quiz.chapter_id)\
-     .join(QuizAttempt, Quiz.id == QuizAttempt.quiz_id)\
-     .filter(QuizAttempt.user_id == current_user.id)\
-     .group_by(Subject.id, Subject.name)\
-     .all()
+    # Recent results and a downsampled trend series come from one projected query
+    recent_attempts_data, trend_data, total_attempts = dashboard_history(current_user.id)
 
+    # Subject-wise performance comes from the per-user rollup
+    get_user_stats(current_user.id)
     stats = []
-    for subject in subject_stats:
+    for subject_stats, subject_name in get_subject_stats(current_user.id):
+        avg_score = subject_stats.percentage_sum / subject_stats.attempts if subject_stats.attempts else 0
         stats.append({
-            'subject': subject.name,
-            'attempts': subject.total_attempts,
-            'avg_score': round(subject.avg_score, 1) if subject.avg_score is not None else 0
+            'subject': subject_name,
+            'attempts': subject_stats.attempts,
+            'avg_score': round(avg_score, 1)
         })
 
     return render_template('user_dashboard.html', 
                          quizzes=quizzes, 
                          recent_attempts=recent_attempts_data,
                          subject_stats=stats,
-                         trend_data=trend_data)
+                         trend_data=trend_data,
+                         total_attempts=total_attempts,
+                         leaderboard=get_leaderboards().standings(user_id=current_user.id))
+
+@app.route('/leaderboards')
+@login_required
+def leaderboard_standings():
+    # Global board by default; ?quiz_id= selects one quiz's board
+    standings = get_leaderboards().standings(quiz_id=request.args.get('quiz_id', type=int),
+                                             user_id=current_user.id,
+                                             limit=request.args.get('limit', 10, type=int))
+    return jsonify(standings)
+
+@app.route('/user/trend')
+@login_required
+def user_trend():
+    # Full-resolution trend history, newest page first
+    points, next_before = trend_page(current_user.id,
+                                     before=request.args.get('before', type=int),
+                                     limit=request.args.get('limit', type=int))
+    return jsonify({'points': points, 'next_before': next_before})
 
 @app.route('/attempt_quiz/<int:quiz_id>', methods=['GET', 'POST'])
 @login_required
@@ -416,31 +629,56 @@ def attempt_quiz(quiz_id):
         return redirect(url_for('admin_dashboard'))
     
     quiz = Quiz.query.get_or_404(quiz_id)
+    if deletion_pending(quiz, current_user.id):
+        abort(404)
     if request.method == 'POST':
         try:
-            score = 0
-            total_questions = len(quiz.questions)
-            
-            for question in quiz.questions:
-                selected_option = request.form.get(f'question_{question.id}')
-                if selected_option:  # Check if an option was selected
-                    # Get the actual answer text based on the selected option
-                    selected_answer = getattr(question, selected_option, None)
-                    if selected_answer == question.correct_option:
-                        score += 1
+            # The server-side session decides whether time ran out
+            attempt_session = claim_session(request.form.get('attempt_session', type=int), current_user.id,
+                                            quiz_id, quiz.content_version, app.config['ATTEMPT_GRACE_SECONDS'])
+        except SessionMissing:
+            flash('This quiz attempt was not started or has already been submitted.', 'warning')
+            return redirect(url_for('user_dashboard'))
+        except SessionExpired:
+            flash('Time is up for this quiz attempt; the submission was not recorded.', 'danger')
+            return redirect(url_for('user_dashboard'))
+        except SessionStale:
+            flash('This quiz was changed while you were taking it, so the submission was not graded. '
+                  'Please start it again.', 'warning')
+            return redirect(url_for('user_dashboard'))
+        try:
+            # Grade against the cached answer key instead of reading every question
+            # Autosaved answers fill in anything the final form did not carry
+            answers = as_form(saved_answers(attempt_session))
+            answers.update((key, value) for key, value in request.form.items() if key.startswith('question_'))
+            answer_key = get_answer_key(quiz)
+            # The quiz is unchanged since the draw, so the seed rebuilds the questions shown
+            question_ids = session_layout(attempt_session, quiz)[0]
+            score = answer_key.grade(answers, question_ids)
+            total_questions = len(question_ids)
             
             quiz_attempt = QuizAttempt(
                 user_id=current_user.id,
                 quiz_id=quiz_id,
                 score=score,
                 total_questions=total_questions,
-                attempt_date=datetime.now()
+                attempt_date=datetime.now(),
+                responses=pack_responses(answer_key, form_picks(answers, question_ids))
             )
             db.session.add(quiz_attempt)
+            db.session.flush()
+            record_attempt(quiz_attempt, quiz.chapter.subject_id)
             db.session.commit()
+            forget_session(attempt_session.id)
+            leaderboards = get_leaderboards()
+            leaderboards.record(quiz_attempt)
             
             percentage = (score / total_questions * 100) if total_questions > 0 else 0
-            flash(f'Quiz submitted successfully! Your score: {score}/{total_questions} ({percentage:.1f}%)', 'success')
+            message = f'Quiz submitted successfully! Your score: {score}/{total_questions} ({percentage:.1f}%)'
+            standing = leaderboards.rank(current_user.id, quiz_id)
+            if standing:
+                message += f' You rank #{standing[0]} of {standing[2]} on this quiz.'
+            flash(message, 'success')
             return redirect(url_for('user_dashboard'))
             
         except Exception as e:
@@ -449,7 +687,68 @@ def attempt_quiz(quiz_id):
             flash('An error occurred while submitting your quiz. Please try again.', 'danger')
             return redirect(url_for('user_dashboard'))
     
-    return render_template('attempt_quiz.html', quiz=quiz)
+    attempt_session = start_session(current_user.id, quiz)
+    ensure_reaper(app)
+    remember_session(attempt_session)
+    question_ids, option_orders = session_layout(attempt_session, quiz)
+    # The page only carries this attempt's layout; question text comes from
+    # the shared, browser-cached payload at quiz_questions_payload
+    return render_template('attempt_quiz.html', quiz=quiz, attempt_session=attempt_session,
+                           question_ids=question_ids, option_orders=option_orders,
+                           remaining_seconds=remaining_seconds(attempt_session),
+                           saved_answers=saved_answers(attempt_session))
+
+@app.route('/api/v1/quizzes/<int:quiz_id>/questions')
+@login_required
+def quiz_questions_payload(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    # Questions only go to a candidate with a live attempt, and only the ones it drew
+    attempt_session = db.session.get(AttemptSession, request.args.get('attempt_session', 0, type=int))
+    if attempt_session is None or attempt_session.quiz_id != quiz_id:
+        return jsonify({'error': 'Unknown quiz session.'}), 404
+    if attempt_session.user_id != current_user.id:
+        return jsonify({'error': 'This quiz session belongs to someone else.'}), 403
+    if datetime.utcnow() > attempt_session.deadline + timedelta(seconds=app.config['ATTEMPT_GRACE_SECONDS']):
+        return jsonify({'error': 'Time is up for this quiz attempt.'}), 409
+    if is_stale(attempt_session, quiz.content_version):
+        return jsonify({'error': 'This quiz was changed; reload the page to start again.'}), 409
+    
+    question_ids, _ = session_layout(attempt_session, quiz)
+    # Attempts shown the whole pool share one cached body and ETag
+    whole_pool = set(question_ids) >= set(get_answer_key(quiz).masks)
+    etag = payload_etag(quiz.id, quiz.content_version, None if whole_pool else question_ids)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        # Serialized once per content version, then served as stored bytes
+        payload = get_quiz_payload(quiz)
+        response = app.response_class(payload.body if whole_pool else payload.subset(question_ids),
+                                      mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/attempt_quiz/<int:quiz_id>/autosave', methods=['POST'])
+@login_required
+def autosave_answers(quiz_id):
+    payload = request.get_json(silent=True) or {}
+    owner = session_owner(payload.get('attempt_session')) if isinstance(payload.get('attempt_session'), int) else None
+    if owner is None:
+        return jsonify({'error': 'Unknown quiz session.'}), 404
+    user_id, session_quiz_id, deadline = owner
+    if user_id != current_user.id or session_quiz_id != quiz_id:
+        return jsonify({'error': 'This quiz session belongs to someone else.'}), 403
+    if datetime.utcnow() > deadline + timedelta(seconds=app.config['ATTEMPT_GRACE_SECONDS']):
+        return jsonify({'error': 'Time is up for this quiz attempt.'}), 409
+    try:
+        answers = parse_answers(payload.get('answers'))
+    except AutosaveError as e:
+        return jsonify({'error': str(e)}), 400
+    # Buffered in memory and written with other sessions' saves on the next flush
+    buffer_answers(payload['attempt_session'], answers)
+    ensure_flusher(app)
+    return jsonify({'saved': len(answers),
+                    'remaining_seconds': max(int((deadline - datetime.utcnow()).total_seconds()), 0)}), 202
 
 @app.route('/user/scores')
 @login_required
@@ -466,24 +765,18 @@ def user_summary():
     if current_user.is_admin:
         return redirect(url_for('admin_dashboard'))
     
-    # Get all attempts by the user
-    attempts = QuizAttempt.query.filter_by(user_id=current_user.id).all()
-    
-    # Get unique attempted quiz IDs
-    attempted_quiz_ids = set(attempt.quiz_id for attempt in attempts)
-    total_unique_quizzes = len(attempted_quiz_ids)
-    
-    # Calculate overall statistics
-    if attempts:
-        total_score = sum(attempt.score for attempt in attempts)
-        total_questions = sum(attempt.total_questions for attempt in attempts)
-        average_score = (total_score / total_questions) * 100 if total_questions > 0 else 0
-        best_score = max((attempt.score / attempt.total_questions * 100) for attempt in attempts) if attempts else 0
+    # Overall, subject and month figures are read from the per-user rollups
+    user_stats = get_user_stats(current_user.id)
+    total_unique_quizzes = user_stats.unique_quizzes
+    if user_stats.total_questions > 0:
+        average_score = (user_stats.total_score / user_stats.total_questions) * 100
     else:
         average_score = 0
-        best_score = 0
+    best_score = user_stats.best_percentage
     
     # Get all available quizzes with their attempt status
+    attempted_quiz_ids = set(row.quiz_id for row in db.session.query(QuizAttempt.quiz_id)
+                             .filter_by(user_id=current_user.id).distinct())
     available_quizzes = []
     quizzes = Quiz.query.join(Chapter).join(Subject).all()
     for quiz in quizzes:
@@ -497,58 +790,21 @@ def user_summary():
     total_available_quizzes = len(quizzes)
     
     # Get subject-wise statistics
-    subject_stats = {}
     subject_labels = []
     subject_scores = []
-    
-    for attempt in attempts:
-        quiz = Quiz.query.join(Chapter).join(Subject).filter(Quiz.id == attempt.quiz_id).first()
-        if quiz:
-            subject_name = quiz.chapter.subject.name
-            if subject_name not in subject_stats:
-                subject_stats[subject_name] = {
-                    'attempts': 0,
-                    'total_score': 0,
-                    'total_questions': 0
-                }
-            stats = subject_stats[subject_name]
-            stats['attempts'] += 1
-            stats['total_score'] += attempt.score
-            stats['total_questions'] += attempt.total_questions
-    
-    # Calculate percentages and prepare chart data
-    for subject_name, stats in subject_stats.items():
-        percentage = (stats['total_score'] / stats['total_questions']) * 100 if stats['total_questions'] > 0 else 0
+    for subject_stats, subject_name in get_subject_stats(current_user.id):
+        percentage = (subject_stats.total_score / subject_stats.total_questions) * 100 if subject_stats.total_questions > 0 else 0
         subject_labels.append(subject_name)
         subject_scores.append(round(percentage, 2))
     
-    # Get month-wise attempt statistics
-    month_stats = {}
-    for attempt in attempts:
-        month_key = attempt.attempt_date.strftime('%Y-%m')
-        if month_key not in month_stats:
-            month_stats[month_key] = {
-                'month_name': attempt.attempt_date.strftime('%B %Y'),
-                'attempts': 0,
-                'total_score': 0,
-                'total_questions': 0,
-                'quizzes': set()
-            }
-        stats = month_stats[month_key]
-        stats['attempts'] += 1
-        stats['total_score'] += attempt.score
-        stats['total_questions'] += attempt.total_questions
-        stats['quizzes'].add(attempt.quiz_id)
-    
-    # Convert month stats to list and calculate percentages
+    # Get month-wise attempt statistics, newest month first
     month_wise_stats = []
-    for month_key in sorted(month_stats.keys(), reverse=True):
-        stats = month_stats[month_key]
-        percentage = (stats['total_score'] / stats['total_questions'] * 100) if stats['total_questions'] > 0 else 0
+    for stats in get_month_stats(current_user.id):
+        percentage = (stats.total_score / stats.total_questions * 100) if stats.total_questions > 0 else 0
         month_wise_stats.append({
-            'month': stats['month_name'],
-            'attempts': stats['attempts'],
-            'unique_quizzes': len(stats['quizzes']),
+            'month': month_name(stats.month),
+            'attempts': stats.attempts,
+            'unique_quizzes': stats.unique_quizzes,
             'score': round(percentage, 1)
         })
     
@@ -562,123 +818,83 @@ def user_summary():
                          available_quizzes=available_quizzes,
                          month_wise_stats=month_wise_stats)
 
+def summary_pdf_data(user_id, user_stats):
+    average_score = user_stats.total_score / user_stats.total_questions * 100 if user_stats.total_questions > 0 else 0
+    months = []
+    for stats in get_month_stats(user_id):
+        percentage = (stats.total_score / stats.total_questions * 100) if stats.total_questions > 0 else 0
+        months.append({
+            'month': month_name(stats.month),
+            'attempts': stats.attempts,
+            'unique_quizzes': stats.unique_quizzes,
+            'score': percentage
+        })
+    return {
+        'total_quizzes': user_stats.unique_quizzes,
+        'average_score': average_score,
+        'months': months
+    }
+
+def cached_summary_pdf():
+    # Returns (etag, path); path is None while a background worker builds the PDF
+    user_stats = get_user_stats(current_user.id)
+    cache_key = summary_cache_key(user_stats)
+    path = request_summary_pdf(
+        app.config['PDF_CACHE_DIR'],
+        current_user.id,
+        cache_key,
+        lambda: summary_pdf_data(current_user.id, user_stats),
+        max_workers=app.config['PDF_WORKERS'],
+        retry_seconds=app.config['PDF_RETRY_SECONDS']
+    )
+    return cache_key, path
+
 @app.route('/user/summary/download')
 @login_required
 def download_summary():
     if current_user.is_admin:
         return redirect(url_for('admin_dashboard'))
     
-    # Create a BytesIO buffer to receive PDF data
-    buffer = BytesIO()
-    
-    # Create the PDF object using ReportLab
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Add title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30
-    )
-    elements.append(Paragraph("Quiz Performance Summary", title_style))
-    elements.append(Spacer(1, 20))
-    
-    # Get user's quiz attempts
-    attempts = QuizAttempt.query.filter_by(user_id=current_user.id).all()
-    
-    # Calculate overall statistics
-    total_unique_quizzes = len(set(attempt.quiz_id for attempt in attempts))
-    if attempts:
-        total_score = sum(attempt.score for attempt in attempts)
-        total_questions = sum(attempt.total_questions for attempt in attempts)
-        average_score = (total_score / total_questions * 100) if total_questions > 0 else 0
-    else:
-        average_score = 0
-    
-    # Add overall statistics
-    elements.append(Paragraph("Overall Statistics", styles['Heading2']))
-    overall_data = [
-        ["Total Quizzes Attempted", str(total_unique_quizzes)],
-        ["Average Score", f"{average_score:.1f}%"]
-    ]
-    overall_table = Table(overall_data)
-    overall_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(overall_table)
-    elements.append(Spacer(1, 20))
-    
-    # Add month-wise statistics
-    elements.append(Paragraph("Month-wise Statistics", styles['Heading2']))
-    
-    month_stats = {}
-    for attempt in attempts:
-        month_key = attempt.attempt_date.strftime('%Y-%m')
-        if month_key not in month_stats:
-            month_stats[month_key] = {
-                'month_name': attempt.attempt_date.strftime('%B %Y'),
-                'attempts': 0,
-                'total_score': 0,
-                'total_questions': 0,
-                'quizzes': set()
-            }
-        stats = month_stats[month_key]
-        stats['attempts'] += 1
-        stats['total_score'] += attempt.score
-        stats['total_questions'] += attempt.total_questions
-        stats['quizzes'].add(attempt.quiz_id)
-    
-    # Create month-wise table data
-    month_data = [["Month", "Total Attempts", "Unique Quizzes", "Average Score"]]
-    for month_key in sorted(month_stats.keys(), reverse=True):
-        stats = month_stats[month_key]
-        percentage = (stats['total_score'] / stats['total_questions'] * 100) if stats['total_questions'] > 0 else 0
-        month_data.append([
-            stats['month_name'],
-            str(stats['attempts']),
-            str(len(stats['quizzes'])),
-            f"{percentage:.1f}%"
-        ])
-    
-    month_table = Table(month_data)
-    month_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ALIGN', (1, 1), (-1, -1), 'CENTER')
-    ]))
-    elements.append(month_table)
-    
-    # Build the PDF document
-    doc.build(elements)
-    
-    # Move to the beginning of the buffer
-    buffer.seek(0)
-    
-    # Return the PDF file
-    return send_file(
-        buffer,
+    try:
+        etag, path = cached_summary_pdf()
+    except SummaryPdfFailed as e:
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'status': 'failed', 'error': str(e)}), 503
+        return render_template('summary_pending.html', error=str(e)), 503
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
+    if path is None:
+        # Don't hold the request worker while ReportLab runs; the client polls instead
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'status': 'pending', 'poll': url_for('download_summary_status')}), 202
+        return render_template('summary_pending.html'), 202
+    
+    response = send_file(
+        path,
         download_name=f'quiz_summary_{datetime.now().strftime("%Y%m%d")}.pdf',
         as_attachment=True,
-        mimetype='application/pdf'
+        mimetype='application/pdf',
+        etag=etag,
+        conditional=True,
+        max_age=0
     )
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/user/summary/download/status')
+@login_required
+def download_summary_status():
+    if current_user.is_admin:
+        return jsonify({'error': 'Admins have no quiz summary.'}), 403
+    
+    try:
+        _, path = cached_summary_pdf()
+    except SummaryPdfFailed as e:
+        return jsonify({'ready': False, 'error': str(e)}), 503
+    return jsonify({'ready': path is not None, 'download': url_for('download_summary')})
 
 @app.route('/admin_summary')
 @login_required
@@ -687,84 +903,63 @@ def admin_summary():
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('user_dashboard'))
     
-    # Get all subjects and users
-    subjects = Subject.query.all()
-    users = User.query.filter_by(is_admin=False).all()
+    # Totals, per-quiz top scores and per-subject attempts come from a fixed
+    # number of grouped queries regardless of catalogue size
+    report = cached(SUMMARY, 'admin', admin_summary_report, ttl=app.config['SUMMARY_CACHE_TTL'])
     
-    # Calculate summary statistics
-    total_subjects = len(subjects)
-    total_chapters = sum(len(subject.chapters) for subject in subjects)
-    total_quizzes = sum(len(chapter.quizzes) for subject in subjects for chapter in subject.chapters)
-    total_questions = sum(len(quiz.questions) for subject in subjects for chapter in subject.chapters for quiz in chapter.quizzes)
-    total_users = len(users)
+    return render_template('admin_summary.html', 
+                         summary=report['summary'],
+                         top_scores=report['top_scores'],
+                         subject_attempts=report['subject_attempts'],
+                         subjects=cached(CATALOGUE, 'tree', catalogue_snapshot))
+
+@app.route('/admin/export/attempts')
+@login_required
+def export_attempts_download():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin privileges required.'}), 403
     
-    # Get top scores for each quiz
-    top_scores = []
-    quizzes = Quiz.query.all()
-    for quiz in quizzes:
-        # Get all attempts for this quiz
-        attempts = QuizAttempt.query.filter_by(quiz_id=quiz.id).all()
-        # Count unique users who attempted this quiz
-        unique_users = len(set(attempt.user_id for attempt in attempts))
-        
-        # Get the highest score for this quiz
-        best_attempt = QuizAttempt.query.filter_by(quiz_id=quiz.id)\
-            .order_by((QuizAttempt.score * 100.0 / QuizAttempt.total_questions).desc())\
-            .first()
-        
-        if best_attempt:
-            # Get the user who achieved this score
-            user = User.query.get(best_attempt.user_id)
-            percentage = (best_attempt.score / best_attempt.total_questions * 100)
-            
-            top_scores.append({
-                'quiz_name': quiz.remarks,
-                'chapter': quiz.chapter.name,
-                'subject': quiz.chapter.subject.name,
-                'user': user.full_name,
-                'score': best_attempt.score,
-                'total': best_attempt.total_questions,
-                'percentage': round(percentage, 1),
-                'date': best_attempt.attempt_date.strftime('%Y-%m-%d'),
-                'attempts': unique_users
-            })
-    
-    # Sort top scores by percentage in descending order
-    top_scores.sort(key=lambda x: x['percentage'], reverse=True)
-    
-    # Get subject-wise quiz attempts
-    subject_attempts = []
-    for subject in subjects:
-        # Count attempts for all quizzes in this subject
-        attempt_count = db.session.query(db.func.count(QuizAttempt.id))\
-            .join(Quiz, QuizAttempt.quiz_id == Quiz.id)\
-            .join(Chapter, Quiz.chapter_id == Chapter.id)\
-            .filter(Chapter.subject_id == subject.id)\
-            .scalar()
-        
-        if attempt_count > 0:
-            subject_attempts.append({
-                'subject_name': subject.name,
-                'total_attempts': attempt_count
-            })
-    
-    # Sort subject attempts by number of attempts in descending order
-    subject_attempts.sort(key=lambda x: x['total_attempts'], reverse=True)
-    
-    summary = {
-        'total_subjects': total_subjects,
-        'total_chapters': total_chapters,
-        'total_quizzes': total_quizzes,
-        'total_questions': total_questions,
-        'total_users': total_users
-    }
+    fmt = request.args.get('format', 'csv')
+    compress = request.args.get('gzip') in ('1', 'true', 'on')
+    try:
+        chunks = export_attempts(fmt, compress,
+                                 start=parse_export_date(request.args.get('start'), 'start'),
+                                 end=parse_export_date(request.args.get('end'), 'end'),
+                                 subject_id=request.args.get('subject_id', type=int),
+                                 batch_size=app.config['EXPORT_BATCH_SIZE'])
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Rows are encoded batch by batch while the client downloads
+    response = app.response_class(stream_with_context(chunks),
+                                  mimetype='application/gzip' if compress else EXPORT_CONTENT_TYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={export_filename(fmt, compress)}'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/admin/grade_batch', methods=['POST'])
+@login_required
+def grade_batch():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin privileges required.'}), 403
     
-    return render_template('admin_summary.html', 
-                         subjects=subjects,
-                         users=users,
-                         summary=summary,
-                         top_scores=top_scores,
-                         subject_attempts=subject_attempts)
+    upload = request.files.get('file')
+    if upload:
+        stream = upload.stream
+        fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        fmt = request.args.get('format') or detect_format(content_type=request.content_type)
+    chunk_size = request.args.get('chunk_size', DEFAULT_CHUNK_SIZE, type=int)
+    
+    try:
+        report = grade_binary_stream(stream, fmt, max(chunk_size, 1))
+    except SheetError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    app.logger.info(f"Batch grading: {report['inserted']}/{report['processed']} sheets inserted, "
+                    f"{report['error_count']} errors, {report['rows_per_second']} rows/s")
+    return jsonify(report)
 
 @app.route('/add_subject', methods=['GET', 'POST'])
 @login_required
@@ -782,6 +977,7 @@ def add_subject():
         db.session.add(subject)
         try:
             db.session.commit()
+            invalidate(CATALOGUE, SUMMARY)
             flash('Subject added successfully.', 'success')
             return redirect(url_for('admin_dashboard'))
         except:
@@ -805,6 +1001,7 @@ def edit_subject(subject_id):
         subject.description = form.description.data
         try:
             db.session.commit()
+            invalidate(CATALOGUE, SUMMARY)
             flash('Subject updated successfully.', 'success')
             return redirect(url_for('admin_dashboard'))
         except:
@@ -823,15 +1020,11 @@ def delete_subject(subject_id):
     subject = Subject.query.get_or_404(subject_id)
     try:
         # Delete all chapters and their associated quizzes and attempts
-        for chapter in subject.chapters:
-            for quiz in chapter.quizzes:
-                Question.query.filter_by(quiz_id=quiz.id).delete()
-                QuizAttempt.query.filter_by(quiz_id=quiz.id).delete()
-                db.session.delete(quiz)
-            db.session.delete(chapter)
-        db.session.delete(subject)
-        db.session.commit()
-        flash('Subject deleted successfully.', 'success')
+        job = delete_with_cascade('subject', subject_id, f'subject "{subject.name}"')
+        if job:
+            flash(f'Subject "{subject.name}" is being deleted in the background (job {job.id}).', 'info')
+        else:
+            flash('Subject deleted successfully.', 'success')
     except:
         db.session.rollback()
         flash('An error occurred while deleting the subject.', 'danger')
@@ -857,6 +1050,7 @@ def add_chapter(subject_id):
         db.session.add(chapter)
         try:
             db.session.commit()
+            invalidate(CATALOGUE, SUMMARY)
             flash('Chapter added successfully.', 'success')
             return redirect(url_for('admin_dashboard'))
         except:
@@ -880,6 +1074,7 @@ def edit_chapter(chapter_id):
         chapter.description = form.description.data
         try:
             db.session.commit()
+            invalidate(CATALOGUE, SUMMARY)
             flash('Chapter updated successfully.', 'success')
             return redirect(url_for('admin_dashboard'))
         except:
@@ -898,13 +1093,11 @@ def delete_chapter(chapter_id):
     chapter = Chapter.query.get_or_404(chapter_id)
     try:
         # Delete all quizzes and their associated questions and attempts
-        for quiz in chapter.quizzes:
-            Question.query.filter_by(quiz_id=quiz.id).delete()
-            QuizAttempt.query.filter_by(quiz_id=quiz.id).delete()
-            db.session.delete(quiz)
-        db.session.delete(chapter)
-        db.session.commit()
-        flash('Chapter deleted successfully.', 'success')
+        job = delete_with_cascade('chapter', chapter_id, f'chapter "{chapter.name}"')
+        if job:
+            flash(f'Chapter "{chapter.name}" is being deleted in the background (job {job.id}).', 'info')
+        else:
+            flash('Chapter deleted successfully.', 'success')
     except:
         db.session.rollback()
         flash('An error occurred while deleting the chapter.', 'danger')
@@ -930,20 +1123,21 @@ def profile():
             # Handle password change if requested
             if form.new_password.data:
                 # Verify current password
-                if current_user.password != hashlib.sha256(form.current_password.data.encode()).hexdigest():
+                if not verify_password(current_user.password, form.current_password.data):
                     flash('Current password is incorrect.', 'danger')
                     return render_template('profile.html', form=form, today_date=date.today().isoformat())
                 
                 # Update password
-                current_user.password = hashlib.sha256(form.new_password.data.encode()).hexdigest()
+                current_user.password = hash_password(form.new_password.data)
                 flash('Password updated successfully.', 'success')
             elif form.current_password.data:
                 # Verify current password for non-password changes
-                if current_user.password != hashlib.sha256(form.current_password.data.encode()).hexdigest():
+                if not verify_password(current_user.password, form.current_password.data):
                     flash('Current password is incorrect.', 'danger')
                     return render_template('profile.html', form=form, today_date=date.today().isoformat())
             
             db.session.commit()
+            forget_identity(current_user.id)
             flash('Profile updated successfully.', 'success')
             return redirect(url_for('profile'))
             
@@ -974,9 +1168,10 @@ def edit_user(user_id):
             user.dob = form.dob.data
             
             if form.new_password.data:
-                user.password = hashlib.sha256(form.new_password.data.encode()).hexdigest()
+                user.password = hash_password(form.new_password.data)
             
             db.session.commit()
+            forget_identity(user.id)
             flash('User updated successfully.', 'success')
             return redirect(url_for('admin_dashboard'))
         except Exception as e:
@@ -1000,10 +1195,11 @@ def delete_user(user_id):
     
     try:
         # Delete all quiz attempts associated with this user
-        QuizAttempt.query.filter_by(user_id=user_id).delete()
-        db.session.delete(user)
-        db.session.commit()
-        flash('User deleted successfully.', 'success')
+        job = delete_with_cascade('user', user_id, f'user {user.username}')
+        if job:
+            flash(f'User {user.username} is being deleted in the background (job {job.id}).', 'info')
+        else:
+            flash('User deleted successfully.', 'success')
     except Exception as e:
         db.session.rollback()
         app.logger.error(f'User deletion error: {str(e)}')
@@ -1011,6 +1207,115 @@ def delete_user(user_id):
     
     return redirect(url_for('admin_dashboard'))
 
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Apply pending schema migrations to the configured database."""
+    version = upgrade_database(app.logger)
+    print(f'Database schema is at version {version}.')
+
+@app.cli.command('create-admin')
+@click.option('--username', default='admin@example.com', show_default=True)
+@click.option('--password', default='admin123', show_default=True)
+def create_admin_command(username, password):
+    """Create the administrator account if it does not exist yet."""
+    if seed_admin(username, password):
+        print(f'Created admin user {username}.')
+    else:
+        print(f'Admin user {username} already exists.')
+
+@app.cli.command('collect-static')
+@click.option('--offline', is_flag=True, help='Use already vendored files instead of downloading missing ones.')
+def collect_static_command(offline):
+    """Vendor, bundle, minify and fingerprint static assets into static/dist/."""
+    manifest = build_assets(app.static_folder, offline=offline)
+    missing = [name for name in VENDOR if name not in manifest]
+    if missing:
+        raise click.ClickException(f'Not vendored: {", ".join(missing)}. Copy the pinned files into '
+                                   f'{app.static_folder} and commit them before deploying.')
+    print(f'Built {len(manifest)} assets; restart the app to serve them.')
+
+@app.cli.command('resume-deletions')
+def resume_deletions_command():
+    """Finish cascade deletions whose worker stopped before they were done."""
+    for pending in pending_deletions():
+        print(f'Resuming deletion of {pending.kind} {pending.target_id} at stage {pending.stage}')
+        run_inline(f'delete_{pending.kind}', f'Resume deleting {pending.kind} {pending.target_id}', cascade_delete,
+                   pending.kind, pending.target_id, batch_size=app.config['DELETE_BATCH_SIZE'])
+    print('No deletions left to resume.')
+
+@app.cli.command('reap-sessions')
+def reap_sessions_command():
+    """Delete quiz attempt sessions whose deadline has passed."""
+    reaped = reap_expired_sessions(app.config['ATTEMPT_GRACE_SECONDS'])
+    print(f'Deleted {reaped} expired quiz sessions.')
+
+@app.cli.command('grade-batch')
+@click.argument('sheets', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, help='Sheets per transaction.')
+def grade_batch_command(sheets, fmt, chunk_size):
+    """Grade a CSV/JSONL file of answer sheets and insert the attempts."""
+    try:
+        report = grade_stream(sheets, fmt or detect_format(sheets.name), chunk_size)
+    except SheetError as e:
+        raise click.ClickException(str(e))
+    for error in report['errors']:
+        print(f"line {error['line']}: {error['error']}")
+    print(f"Processed {report['processed']} sheets, inserted {report['inserted']} attempts, "
+          f"{report['error_count']} errors in {report['seconds']}s ({report['rows_per_second']} rows/s).")
+
+@app.cli.command('import-questions')
+@click.argument('questions', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--quiz', 'quiz_id', type=int, help='Target quiz; otherwise each question names its own.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl', 'json', 'md']), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=IMPORT_CHUNK_SIZE, show_default=True, help='Questions per transaction.')
+@click.option('--dry-run', is_flag=True, help='Validate only; insert nothing.')
+def import_questions_command(questions, quiz_id, fmt, chunk_size, dry_run):
+    """Validate and bulk-insert questions from a CSV, JSON(L) or Markdown file."""
+    try:
+        report = import_stream(questions, fmt or detect_question_format(questions.name), quiz_id, chunk_size, dry_run)
+    except QuestionImportError as e:
+        raise click.ClickException(str(e))
+    for error in report['errors']:
+        print(f"line {error['line']}: {error['error']}")
+    action = 'would insert' if dry_run else 'inserted'
+    print(f"Processed {report['processed']} questions, {action} {report['valid'] if dry_run else report['inserted']}, "
+          f"{report['error_count']} errors in {report['seconds']}s ({report['rows_per_second']} rows/s).")
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute every user's statistics rollup from the attempt history."""
+    rebuild_user_stats()
+    db.session.commit()
+    print(f'Rebuilt statistics for {UserStats.query.count()} users.')
+
+@app.cli.command('export-attempts')
+@click.argument('output', type=click.File('wb'), default='-')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--start', help='First attempt date to include (YYYY-MM-DD).')
+@click.option('--end', help='Last attempt date to include (YYYY-MM-DD).')
+@click.option('--subject', 'subject_id', type=int, help='Only attempts on quizzes of this subject id.')
+def export_attempts_command(output, fmt, compress, start, end, subject_id):
+    """Stream every quiz attempt with its user, quiz, chapter and subject to OUTPUT."""
+    try:
+        chunks = export_attempts(fmt, compress, start=parse_export_date(start, '--start'),
+                                 end=parse_export_date(end, '--end'), subject_id=subject_id,
+                                 batch_size=app.config['EXPORT_BATCH_SIZE'])
+    except ExportError as e:
+        raise click.UsageError(str(e))
+    for chunk in chunks:
+        output.write(chunk)
+
+@app.cli.command('analyse-items')
+@click.option('--quiz', 'quiz_ids', type=int, multiple=True, help='Limit the run to these quiz ids.')
+def analyse_items_command(quiz_ids):
+    """Recompute per-question difficulty, discrimination and distractor counts."""
+    job = run_inline('analyse_items', 'Analyse questions', analyse_items, list(quiz_ids) or None,
+                     batch_size=app.config['ANALYSIS_BATCH_SIZE'])
+    print(f'Analysed {job.progress.get("questions", 0)} questions from '
+          f'{job.progress.get("attempts_processed", 0)} attempts.')
+
 @app.context_processor
 def inject_user():
     return dict(current_user=current_user)
@@ -1044,8 +1349,11 @@ if __name__ == '__main__':
     # Set the configuration based on command line argument
     app.config['SHOW_ERROR_DETAILS'] = args.debug_errors
     
-    # Create the database tables
+    # The development server prepares its own database; deployments run
+    # `flask db-upgrade` and `flask create-admin` once instead
     with app.app_context():
-        db.create_all()
+        upgrade_database(app.logger)
+        seed_admin()
     
+    app.logger.info('Quiz Master startup')
     app.run(debug=True)
\ No newline at end of file
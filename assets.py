@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import urllib.request
+from flask import current_app, request, send_from_directory
+
+# Stylesheets served together are concatenated into one bundle per page type
+BUNDLES = {
+    'bundles/site.css': ['css/custom.css'],
+    'bundles/admin.css': ['css/custom.css', 'css/admin.css'],
+}
+
+# Third-party files committed under static/ so pages work without internet access;
+# the URL pins the release they were copied from
+VENDOR = {
+    'vendor/chart.umd.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.js',
+}
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 12
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Accept-Encoding name and file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+def bundle_source(static_folder, name):
+    parts = []
+    for source in BUNDLES[name]:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            parts.append(f.read())
+    return '\n'.join(parts)
+
+
+def vendor_assets(static_folder, log=print):
+    """Download vendored files that are not in static/ yet; returns the names still missing."""
+    missing = []
+    for name, url in VENDOR.items():
+        path = os.path.join(static_folder, name)
+        if os.path.exists(path):
+            continue
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                data = response.read()
+        except OSError as e:
+            log(f'Could not download {name} from {url}: {e}')
+            missing.append(name)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        log(f'Vendored {name} ({len(data)} bytes)')
+    return missing
+
+
+def fingerprinted(name, data):
+    stem, ext = os.path.splitext(name)
+    return f'{DIST_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def write_variants(path, data):
+    """Write the file plus any precompressed copy that is actually smaller."""
+    with open(path, 'wb') as f:
+        f.write(data)
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+        variants['.br'] = brotli.compress(data, quality=11)
+    except ImportError:
+        pass
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+
+
+def build_assets(static_folder, offline=False, log=print):
+    """Vendor, bundle, minify and fingerprint static assets into static/dist/.
+
+    Returns the manifest mapping each logical name to its hashed file.
+    """
+    if not offline:
+        vendor_assets(static_folder, log)
+    outputs = {name: minify_css(bundle_source(static_folder, name)).encode('utf-8') for name in BUNDLES}
+    for name in VENDOR:
+        path = os.path.join(static_folder, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                outputs[name] = f.read()
+        else:
+            log(f'Skipping {name}: not vendored yet')
+
+    dist = os.path.join(static_folder, DIST_DIR)
+    # Start clean so files from earlier builds do not pile up
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    for name, data in outputs.items():
+        target = fingerprinted(name, data)
+        path = os.path.join(static_folder, target)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_variants(path, data)
+        manifest[name] = target
+        log(f'{name} -> {target} ({len(data)} bytes)')
+    with open(os.path.join(dist, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def app_assets(app):
+    # The manifest is read on first use so importing the app touches no files
+    assets = app.extensions['assets']
+    if assets is None:
+        manifest = load_manifest(app.static_folder)
+        assets = app.extensions['assets'] = {'manifest': manifest, 'hashed': set(manifest.values())}
+    return assets
+
+
+def serve_static(filename):
+    """Static view that knows about fingerprinted, bundled and vendored files."""
+    app = current_app
+    static_folder = app.static_folder
+    if filename in app_assets(app)['hashed']:
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, suffix in ENCODINGS:
+            if request.accept_encodings[encoding] and os.path.exists(os.path.join(static_folder, filename + suffix)):
+                response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(static_folder, filename, mimetype=mimetype)
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
+    if filename in BUNDLES:
+        # No build yet (development): concatenate the sources on the fly
+        response = app.response_class(bundle_source(static_folder, filename), mimetype='text/css')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    # A vendored file that was never committed is a 404 like any other
+    # missing file, never a redirect to the CDN
+    return app.send_static_file(filename)
+
+
+def init_assets(app):
+    """Resolve url_for('static') to fingerprinted files listed in the build manifest."""
+    app.extensions['assets'] = None
+    app.view_functions['static'] = serve_static
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == 'static':
+            manifest = app_assets(app)['manifest']
+            if values.get('filename') in manifest:
+                values['filename'] = manifest[values['filename']]
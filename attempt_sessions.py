@@ -0,0 +1,157 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, AttemptSession
+from grading import get_answer_key
+from question_pools import new_seed, attempt_layout
+
+# Allowance for network latency and the page's own auto-submit delay
+DEFAULT_GRACE_SECONDS = 30
+REAP_BATCH_SIZE = 5000
+
+_reaper = None
+_reaper_lock = threading.Lock()
+
+
+class SessionExpired(Exception):
+    pass
+
+
+class SessionMissing(Exception):
+    pass
+
+
+class SessionStale(Exception):
+    """The quiz changed after the session drew its questions."""
+
+
+def remaining_seconds(session, now=None):
+    now = now or datetime.utcnow()
+    return max(int((session.deadline - now).total_seconds()), 0)
+
+
+def is_stale(session, content_version):
+    # Sessions opened before draws were versioned are taken as current
+    return session.content_version is not None and session.content_version != content_version
+
+
+def draw(session, quiz):
+    session.seed = new_seed()
+    session.content_version = quiz.content_version
+    session.answers = None
+
+
+def session_layout(session, quiz):
+    """(question ids, option orders or None) rebuilt from the session's seed.
+
+    The draw is only reproducible while the quiz is at the content version
+    the session recorded; callers check is_stale first.
+    """
+    return attempt_layout(quiz, get_answer_key(quiz), session.seed)
+
+
+def start_session(user_id, quiz):
+    """The user's live session for quiz, starting a fresh one if none is running.
+
+    Reloading the page keeps the original deadline and questions. A session
+    whose deadline has passed is restarted with a new draw, and one whose
+    quiz changed since its draw draws again within its original deadline.
+    """
+    now = datetime.utcnow()
+    deadline = now + timedelta(minutes=quiz.time_duration)
+    session = AttemptSession.query.filter_by(user_id=user_id, quiz_id=quiz.id).first()
+    if session is not None:
+        if session.deadline > now:
+            if is_stale(session, quiz.content_version):
+                draw(session, quiz)
+                db.session.commit()
+            return session
+        session.started_at = now
+        session.deadline = deadline
+        draw(session, quiz)
+        db.session.commit()
+        return session
+    session = AttemptSession(user_id=user_id, quiz_id=quiz.id, started_at=now, deadline=deadline)
+    draw(session, quiz)
+    db.session.add(session)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another tab opened the quiz at the same moment; use its session
+        db.session.rollback()
+        session = AttemptSession.query.filter_by(user_id=user_id, quiz_id=quiz.id).one()
+    return session
+
+
+def claim_session(session_id, user_id, quiz_id, content_version, grace_seconds=DEFAULT_GRACE_SECONDS):
+    """Validate a submission against its session and mark the session for deletion.
+
+    The deletion is left for the caller's commit, so the attempt and the end of
+    its session are stored together. A late submission, or one drawn from an
+    older version of the quiz, ends the session without being graded.
+    """
+    session = AttemptSession.query.get(session_id) if session_id else None
+    if session is None or session.user_id != user_id or session.quiz_id != quiz_id:
+        raise SessionMissing()
+    # A DELETE statement rather than db.session.delete(): the ORM only warns
+    # when the row is already gone (submitted twice, or its quiz is being
+    # deleted), and the statement also takes the write lock up front
+    deleted = db.session.execute(db.delete(AttemptSession).where(AttemptSession.id == session.id)
+                                 .execution_options(synchronize_session=False)).rowcount
+    if not deleted:
+        db.session.rollback()
+        raise SessionMissing()
+    # Keep the loaded row readable after the caller's commit, which would
+    # otherwise expire it and fail to reload it
+    db.session.expunge(session)
+    if datetime.utcnow() > session.deadline + timedelta(seconds=grace_seconds):
+        db.session.commit()
+        raise SessionExpired()
+    if is_stale(session, content_version):
+        db.session.commit()
+        raise SessionStale()
+    return session
+
+
+def reap_expired_sessions(grace_seconds=DEFAULT_GRACE_SECONDS, batch_size=REAP_BATCH_SIZE):
+    """Delete abandoned sessions past their deadline in short batches."""
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    reaped = 0
+    while True:
+        batch = db.select(AttemptSession.id).where(AttemptSession.deadline < cutoff).limit(batch_size)
+        result = db.session.execute(db.delete(AttemptSession).where(AttemptSession.id.in_(batch))
+                                    .execution_options(synchronize_session=False))
+        db.session.commit()
+        reaped += result.rowcount
+        if result.rowcount < batch_size:
+            return reaped
+
+
+def ensure_reaper(app):
+    """Start this process's reaper thread the first time a session is created."""
+    global _reaper
+    if _reaper is not None:
+        return
+    with _reaper_lock:
+        if _reaper is not None:
+            return
+        interval = app.config['SESSION_REAP_INTERVAL']
+        grace = app.config['ATTEMPT_GRACE_SECONDS']
+
+        def run():
+            while True:
+                time.sleep(interval)
+                with app.app_context():
+                    try:
+                        reaped = reap_expired_sessions(grace)
+                        if reaped:
+                            app.logger.info(f'Reaped {reaped} expired quiz sessions')
+                    except Exception as e:
+                        db.session.rollback()
+                        app.logger.error(f'Session reaper failed: {str(e)}')
+                    finally:
+                        db.session.remove()
+
+        _reaper = threading.Thread(target=run, name='session-reaper', daemon=True)
+        _reaper.start()
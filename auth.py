@@ -0,0 +1,111 @@
+import base64
+import hashlib
+import hmac
+import os
+from flask import current_app
+from sqlalchemy.orm import make_transient_to_detached
+from models import db, User
+from cache import MemoryCache, MISSING
+
+SCHEME = 'scrypt'
+# scrypt CPU/memory cost; benchmarks/bench_password_cost.py picks a value for the hardware
+DEFAULT_COST = 2 ** 14
+BLOCK_SIZE = 8
+PARALLELISM = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# Columns kept in the identity cache; enough to rebuild the User without a SELECT
+USER_COLUMNS = ('id', 'username', 'password', 'full_name', 'qualification', 'dob', 'is_admin')
+
+_identities = None
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 2 ** 20, dklen=KEY_BYTES)
+
+
+def password_cost():
+    return current_app.config.get('PASSWORD_HASH_COST', DEFAULT_COST)
+
+
+def hash_password(password, cost=None):
+    """Salted scrypt hash as 'scrypt$n$r$p$salt$key'."""
+    n = cost or password_cost()
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, n, BLOCK_SIZE, PARALLELISM)
+    return f'{SCHEME}${n}${BLOCK_SIZE}${PARALLELISM}${_b64(salt)}${_b64(key)}'
+
+
+def is_legacy_hash(stored):
+    # Accounts created before salted hashing hold a bare SHA-256 hex digest
+    return not stored.startswith(f'{SCHEME}$')
+
+
+def verify_password(stored, password):
+    if not stored:
+        return False
+    if is_legacy_hash(stored):
+        return hmac.compare_digest(stored, hashlib.sha256(password.encode()).hexdigest())
+    try:
+        _, n, r, p, salt, key = stored.split('$')
+        expected = base64.b64decode(key)
+        actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(expected, actual)
+
+
+def needs_rehash(stored):
+    if is_legacy_hash(stored):
+        return True
+    _, n, r, p, _, _ = stored.split('$')
+    return (int(n), int(r), int(p)) != (password_cost(), BLOCK_SIZE, PARALLELISM)
+
+
+def check_login(user, password):
+    """Verify a login and upgrade the stored hash if it is legacy or outdated."""
+    if user is None or not verify_password(user.password, password):
+        return False
+    if needs_rehash(user.password):
+        user.password = hash_password(password)
+        db.session.commit()
+        forget_identity(user.id)
+    return True
+
+
+def identity_cache():
+    global _identities
+    if _identities is None:
+        _identities = MemoryCache(max_entries=current_app.config.get('IDENTITY_CACHE_SIZE', 4096),
+                                  default_ttl=current_app.config.get('IDENTITY_CACHE_TTL', 30))
+    return _identities
+
+
+def load_identity(user_id):
+    """The session user, attached to the current session without reading the user table.
+
+    Entries live for IDENTITY_CACHE_TTL seconds; changes made in this process
+    call forget_identity(), other workers see them once the entry expires.
+    """
+    cache = identity_cache()
+    values = cache.get(user_id)
+    if values is MISSING:
+        user = User.query.get(user_id)
+        if user is None:
+            return None
+        cache.set(user_id, {column: getattr(user, column) for column in USER_COLUMNS})
+        return user
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def forget_identity(user_id):
+    if _identities is not None:
+        _identities.delete(user_id)
@@ -0,0 +1,148 @@
+import atexit
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from models import db, AttemptSession
+from grading import OPTION_FIELDS
+
+# Upper bound on answers accepted per save, well above any real quiz
+MAX_ANSWERS = 2000
+
+# session_id -> (user_id, quiz_id, deadline) for sessions seen by this process
+_sessions = {}
+# session_id -> latest full answer map, awaiting the next flush
+_pending = {}
+_lock = threading.Lock()
+_flusher = None
+
+
+class AutosaveError(ValueError):
+    pass
+
+
+def parse_answers(raw):
+    """Normalise {question id: 'optionN' or N} into {question id: N}."""
+    if not isinstance(raw, dict):
+        raise AutosaveError('answers must be an object keyed by question id.')
+    if len(raw) > MAX_ANSWERS:
+        raise AutosaveError('Too many answers.')
+    answers = {}
+    for key, value in raw.items():
+        key = str(key)
+        if key.startswith('question_'):
+            key = key[len('question_'):]
+        if isinstance(value, str) and value in OPTION_FIELDS:
+            value = OPTION_FIELDS.index(value) + 1
+        if not key.isdigit() or value not in (1, 2, 3, 4):
+            raise AutosaveError(f'Invalid answer for question {key!r}.')
+        answers[int(key)] = value
+    return answers
+
+
+def as_form(answers):
+    """The {'question_<id>': 'optionN'} mapping AnswerKey.grade() expects."""
+    return {f'question_{question_id}': OPTION_FIELDS[number - 1] for question_id, number in answers.items()}
+
+
+def remember_session(session):
+    with _lock:
+        _sessions[session.id] = (session.user_id, session.quiz_id, session.deadline)
+
+
+def session_owner(session_id):
+    """(user_id, quiz_id, deadline) of a live session, reading the database only once per process."""
+    with _lock:
+        known = _sessions.get(session_id)
+    if known is not None:
+        return known
+    session = AttemptSession.query.get(session_id)
+    if session is None:
+        return None
+    remember_session(session)
+    return session.user_id, session.quiz_id, session.deadline
+
+
+def buffer_answers(session_id, answers):
+    # The client always sends every answer, so the newest map replaces the old
+    with _lock:
+        _pending[session_id] = answers
+
+
+def saved_answers(session):
+    """Latest answers for a session: this process's unflushed buffer, else the stored copy."""
+    with _lock:
+        pending = _pending.get(session.id)
+    if pending is not None:
+        return dict(pending)
+    if not session.answers:
+        return {}
+    return {int(question_id): number for question_id, number in json.loads(session.answers).items()}
+
+
+def forget_session(session_id):
+    with _lock:
+        _sessions.pop(session_id, None)
+        _pending.pop(session_id, None)
+
+
+def flush_pending(grace_seconds=0):
+    """Write every buffered answer map in one transaction; returns the number of sessions saved."""
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+        # Drop ownership records of sessions that can no longer be submitted
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        for session_id in [sid for sid, (_, _, deadline) in _sessions.items() if deadline < cutoff]:
+            del _sessions[session_id]
+    if not batch:
+        return 0
+    saved_at = datetime.utcnow()
+    try:
+        db.session.execute(
+            db.update(AttemptSession.__table__)
+            .where(AttemptSession.__table__.c.id == db.bindparam('session_id'))
+            .values(answers=db.bindparam('answers'), saved_at=db.bindparam('saved_at')),
+            [{'session_id': session_id, 'answers': json.dumps(answers, separators=(',', ':')),
+              'saved_at': saved_at} for session_id, answers in batch.items()]
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # Put the batch back unless a newer save arrived meanwhile
+        with _lock:
+            for session_id, answers in batch.items():
+                _pending.setdefault(session_id, answers)
+        raise
+    return len(batch)
+
+
+def ensure_flusher(app):
+    """Start this process's flush thread the first time an answer is buffered."""
+    global _flusher
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is not None:
+            return
+        interval = app.config['AUTOSAVE_FLUSH_INTERVAL']
+        grace = app.config['ATTEMPT_GRACE_SECONDS']
+
+        def flush():
+            with app.app_context():
+                try:
+                    flush_pending(grace)
+                except Exception as e:
+                    app.logger.error(f'Autosave flush failed: {str(e)}')
+                finally:
+                    db.session.remove()
+
+        def run():
+            while True:
+                time.sleep(interval)
+                flush()
+
+        _flusher = threading.Thread(target=run, name='autosave-flusher', daemon=True)
+        _flusher.start()
+        # Whatever is still buffered at shutdown is written once more
+        atexit.register(flush)
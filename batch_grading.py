@@ -0,0 +1,231 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from models import db, User, Quiz, QuizAttempt
+from grading import get_answer_key
+from item_analysis import pack_responses
+from stats import rebuild_user_stats
+from cache import invalidate, SUMMARY
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+class SheetError(ValueError):
+    pass
+
+
+def parse_option(value):
+    # Answer sheets number options 1-4; blanks mean the question was skipped
+    if value is None or value == '':
+        return None
+    try:
+        option = int(value)
+    except (TypeError, ValueError):
+        raise SheetError(f'invalid option {value!r}')
+    if not 1 <= option <= 4:
+        raise SheetError(f'option {option} is out of range 1-4')
+    return option - 1
+
+
+def parse_answers(answers):
+    """Positional list of option indexes, or a {question_id: option index} dict."""
+    if isinstance(answers, str):
+        return [parse_option(value.strip()) for value in answers.split(';')] if answers else []
+    if isinstance(answers, list):
+        return [parse_option(value) for value in answers]
+    if isinstance(answers, dict):
+        try:
+            return {int(question_id): parse_option(value) for question_id, value in answers.items()}
+        except ValueError:
+            raise SheetError('answer keys must be question ids')
+    raise SheetError('answers must be a list, an object or a ;-separated string')
+
+
+def parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise SheetError(f'invalid attempt_date {value!r}')
+
+
+def read_sheets(stream, fmt):
+    """Yield (line number, record or SheetError) from a CSV or JSONL text stream.
+
+    CSV needs a header with user, quiz and answers columns (answers as
+    ';'-separated option numbers in question order) and may add attempt_date.
+    JSONL lines are objects with the same keys; answers may also be a list or
+    an object keyed by question id.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        missing = {'user', 'quiz', 'answers'} - set(reader.fieldnames or [])
+        if missing:
+            raise SheetError(f'CSV header is missing {", ".join(sorted(missing))}')
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, SheetError(f'invalid JSON: {e}')
+                continue
+            if not isinstance(record, dict):
+                yield line_no, SheetError('each line must be a JSON object')
+                continue
+            yield line_no, record
+    else:
+        raise SheetError(f'unsupported format {fmt!r}')
+
+
+def detect_format(filename=None, content_type=None):
+    name = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    return 'csv'
+
+
+def sheet_picks(answer_key, answers):
+    """(question id, option index or None) for every question, in answer key order."""
+    masks = answer_key.masks
+    if isinstance(answers, dict):
+        unknown = set(answers) - set(masks)
+        if unknown:
+            raise SheetError(f'questions {sorted(unknown)} are not part of quiz {answer_key.quiz_id}')
+        return [(question_id, answers.get(question_id)) for question_id in masks]
+    if len(answers) > len(masks):
+        raise SheetError(f'{len(answers)} answers for {len(masks)} questions')
+    answers = list(answers) + [None] * (len(masks) - len(answers))
+    return list(zip(masks, answers))
+
+
+def grade_sheet(answer_key, picks):
+    masks = answer_key.masks
+    return sum(1 for question_id, pick in picks if pick is not None and masks[question_id] >> pick & 1)
+
+
+class BatchGrader:
+    """Grades answer sheets and bulk-inserts QuizAttempt rows in chunked transactions."""
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.quizzes = {}
+        self.processed = 0
+        self.inserted = 0
+        self.error_count = 0
+        self.errors = []
+        self.user_ids = set()  # Users whose rollups are rebuilt once every chunk is in
+
+    def add_error(self, line_no, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_no, 'error': message})
+
+    def quiz(self, quiz_id):
+        if quiz_id not in self.quizzes:
+            self.quizzes[quiz_id] = Quiz.query.get(quiz_id)
+        return self.quizzes[quiz_id]
+
+    def resolve_users(self, chunk):
+        # One query per chunk maps both numeric ids and usernames to user ids
+        keys = {str(record.get('user', '')).strip() for _, record in chunk}
+        ids = {int(key) for key in keys if key.isdigit()}
+        names = keys - {str(i) for i in ids}
+        rows = db.session.query(User.id, User.username, User.is_admin).filter(
+            db.or_(User.id.in_(ids), User.username.in_(names))).all()
+        resolved = {}
+        for row in rows:
+            if not row.is_admin:
+                resolved[str(row.id)] = row.id
+                resolved[row.username] = row.id
+        return resolved
+
+    def grade_chunk(self, chunk):
+        users = self.resolve_users(chunk)
+        now = datetime.now()
+        rows = []
+        graded_lines = []
+        for line_no, record in chunk:
+            try:
+                user_id = users.get(str(record.get('user', '')).strip())
+                if user_id is None:
+                    raise SheetError(f'unknown user {record.get("user")!r}')
+                try:
+                    quiz = self.quiz(int(record.get('quiz')))
+                except (TypeError, ValueError):
+                    raise SheetError(f'invalid quiz {record.get("quiz")!r}')
+                if quiz is None:
+                    raise SheetError(f'unknown quiz {record.get("quiz")!r}')
+                answer_key = get_answer_key(quiz)
+                if not answer_key.total_questions:
+                    raise SheetError(f'quiz {quiz.id} has no questions')
+                picks = sheet_picks(answer_key, parse_answers(record.get('answers')))
+                rows.append({
+                    'user_id': user_id,
+                    'quiz_id': quiz.id,
+                    'score': grade_sheet(answer_key, picks),
+                    'total_questions': answer_key.total_questions,
+                    'attempt_date': parse_date(record.get('attempt_date')) or now,
+                    'responses': pack_responses(answer_key, picks)
+                })
+                graded_lines.append(line_no)
+            except SheetError as e:
+                self.add_error(line_no, str(e))
+
+        if rows:
+            try:
+                db.session.execute(db.insert(QuizAttempt), rows)
+                db.session.commit()
+                self.inserted += len(rows)
+                self.user_ids.update(row['user_id'] for row in rows)
+            except Exception as e:
+                db.session.rollback()
+                self.quizzes.clear()
+                for line_no in graded_lines:
+                    self.add_error(line_no, f'chunk rolled back: {e}')
+
+    def run(self, sheets):
+        """Grade every (line number, record) pair and return a summary report."""
+        started = time.perf_counter()
+        chunk = []
+        for line_no, record in sheets:
+            self.processed += 1
+            if isinstance(record, SheetError):
+                self.add_error(line_no, str(record))
+                continue
+            chunk.append((line_no, record))
+            if len(chunk) >= self.chunk_size:
+                self.grade_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.grade_chunk(chunk)
+        if self.user_ids:
+            rebuild_user_stats(self.user_ids)
+            db.session.commit()
+        if self.inserted:
+            invalidate(SUMMARY)
+        elapsed = time.perf_counter() - started
+        return {
+            'processed': self.processed,
+            'inserted': self.inserted,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(self.processed / elapsed, 1) if elapsed > 0 else None
+        }
+
+
+def grade_stream(stream, fmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    return BatchGrader(chunk_size).run(read_sheets(stream, fmt))
+
+
+def grade_binary_stream(stream, fmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    return grade_stream(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''), fmt, chunk_size)
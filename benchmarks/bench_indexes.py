@@ -0,0 +1,101 @@
+"""Seed a large synthetic SQLite database and time the hot queries with and
+without the indexes declared in models.py.
+
+    python benchmarks/bench_indexes.py --attempts 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from synthetic_data import add_arguments, generate
+from models import Chapter, Quiz, Question, QuizAttempt
+
+INDEXED_TABLES = (Chapter.__table__, Quiz.__table__, Question.__table__, QuizAttempt.__table__)
+
+QUERIES = {
+    'dashboard attempts for user': (
+        'SELECT id, quiz_id, score, total_questions, attempt_date FROM quiz_attempt '
+        'WHERE user_id = :user_id ORDER BY attempt_date DESC LIMIT 50'
+    ),
+    'best attempt for quiz': (
+        'SELECT id, user_id, score FROM quiz_attempt '
+        'WHERE quiz_id = :quiz_id ORDER BY score DESC LIMIT 1'
+    ),
+    'attempts in date range': (
+        'SELECT COUNT(*) FROM quiz_attempt WHERE attempt_date >= :start AND attempt_date < :end'
+    ),
+    'questions for quiz': 'SELECT id FROM question WHERE quiz_id = :quiz_id',
+    'quizzes for chapter': 'SELECT id FROM quiz WHERE chapter_id = :chapter_id',
+    'chapters for subject': 'SELECT id FROM chapter WHERE subject_id = :subject_id',
+}
+
+
+def time_queries(engine, args, quiz_count, chapter_count):
+    rng = random.Random(args.seed + 1)
+    # A week inside the generated attempt history
+    end = datetime.now() - timedelta(days=30)
+    results = {}
+    with engine.connect() as connection:
+        for name, sql in QUERIES.items():
+            statement = text(sql)
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                params = {
+                    # Id 1 is the admin account
+                    'user_id': rng.randint(2, args.users + 1),
+                    'quiz_id': rng.randint(1, quiz_count),
+                    'chapter_id': rng.randint(1, chapter_count),
+                    'subject_id': rng.randint(1, args.subjects),
+                    'start': end - timedelta(days=7),
+                    'end': end
+                }
+                connection.execute(statement, params).fetchall()
+            results[name] = (time.perf_counter() - started) / args.repeat * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark query latency before and after indexing')
+    add_arguments(parser)
+    parser.set_defaults(users=10000, subjects=20, chapters=10, quizzes=10, attempts=200000)
+    parser.add_argument('--repeat', type=int, default=50, help='Executions per query')
+    parser.add_argument('--database', help='SQLite file to create (default: temporary file)')
+    args = parser.parse_args()
+
+    path = args.database or os.path.join(tempfile.mkdtemp(), 'bench_indexes.db')
+    counts = generate(path, args.users, args.subjects, args.chapters, args.quizzes, args.questions, args.attempts,
+                      seed=args.seed, responses=args.responses, profile=args.profile)
+    quiz_count, chapter_count = counts['quizzes'], counts['chapters']
+    engine = create_engine(f'sqlite:///{path}')
+
+    # Drop the secondary indexes to get the "before" numbers
+    with engine.begin() as connection:
+        for table in INDEXED_TABLES:
+            for index in table.indexes:
+                index.drop(connection, checkfirst=True)
+
+    before = time_queries(engine, args, quiz_count, chapter_count)
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        for table in INDEXED_TABLES:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+        connection.exec_driver_sql('ANALYZE')
+    print(f'Built indexes in {time.perf_counter() - started:.1f}s')
+
+    after = time_queries(engine, args, quiz_count, chapter_count)
+
+    print(f'\n{"query":<32}{"before ms":>12}{"after ms":>12}{"speedup":>10}')
+    for name in QUERIES:
+        speedup = before[name] / after[name] if after[name] else float('inf')
+        print(f'{name:<32}{before[name]:>12.3f}{after[name]:>12.3f}{speedup:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
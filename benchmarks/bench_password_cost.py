@@ -0,0 +1,88 @@
+"""Time scrypt at increasing costs and recommend PASSWORD_HASH_COST for a
+login latency budget at a target login rate.
+
+    python benchmarks/bench_password_cost.py --budget-ms 250 --qps 20 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth import hash_password, verify_password
+
+# Keep logins from saturating the hashing workers so queueing stays bounded
+MAX_UTILISATION = 0.7
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def time_verifications(stored, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        verify_password(stored, 'correct horse battery staple')
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def throughput(stored, workers, seconds):
+    # hashlib.scrypt releases the GIL, so threads measure real parallel capacity
+    def run(_):
+        count = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            verify_password(stored, 'correct horse battery staple')
+            count += 1
+        return count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        total = sum(pool.map(run, range(workers)))
+    return total / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pick a scrypt cost for the login latency budget')
+    parser.add_argument('--budget-ms', type=float, default=250, help='p95 login latency budget')
+    parser.add_argument('--qps', type=float, default=20, help='target peak logins per second')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='cores available for hashing')
+    parser.add_argument('--min-log2', type=int, default=12)
+    parser.add_argument('--max-log2', type=int, default=18)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=2.0, help='duration of each throughput run')
+    args = parser.parse_args()
+
+    print(f'Budget {args.budget_ms:.0f} ms p95 at {args.qps:g} logins/s on {args.workers} workers\n')
+    print(f'{"cost":>8}{"p50 ms":>10}{"p95 ms":>10}{"logins/s":>11}{"util":>8}{"est p95 ms":>12}  fits')
+    recommended = None
+    for log2 in range(args.min_log2, args.max_log2 + 1):
+        cost = 2 ** log2
+        stored = hash_password('correct horse battery staple', cost=cost)
+        samples = time_verifications(stored, args.repeat)
+        p50 = percentile(samples, 0.5) * 1000
+        p95 = percentile(samples, 0.95) * 1000
+        capacity = throughput(stored, args.workers, args.seconds)
+        utilisation = args.qps / capacity
+        # M/M/1-style inflation of the service time as the workers fill up
+        estimated = p95 / (1 - utilisation) if utilisation < 1 else float('inf')
+        fits = utilisation <= MAX_UTILISATION and estimated <= args.budget_ms
+        if fits:
+            recommended = cost
+        print(f'{cost:>8}{p50:>10.1f}{p95:>10.1f}{capacity:>11.1f}{utilisation:>8.2f}{estimated:>12.1f}  {"yes" if fits else "no"}')
+        if utilisation >= 1:
+            break
+
+    if recommended:
+        print(f'\nRecommended: PASSWORD_HASH_COST={recommended}')
+    else:
+        print('\nNo tested cost fits; add hashing capacity or relax the budget.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""End-to-end route benchmark: drive login, the user dashboard, quiz attempts,
+the user and admin summaries and the summary PDF download through the Flask
+test client against a synthetic database, and report per-route latency
+percentiles, throughput and SQL statement counts as a JSON baseline.
+
+    python benchmarks/bench_routes.py --attempts 1000000 --output baseline.json
+    python benchmarks/bench_routes.py --database /tmp/quiz_1m.db --compare baseline.json
+
+--database reuses a file made by synthetic_data.py (it is generated first if
+missing); runs work on a copy, so the dataset is the same every time.
+--compare exits with status 1 when a route's p95 latency or SQL count
+regressed beyond --tolerance.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from synthetic_data import PASSWORD, add_arguments, configure_environment, generate, percentile, username
+
+# Relative frequency of each user action; taking a quiz is two requests
+ACTIONS = {
+    'login': 1,
+    'user_dashboard': 4,
+    'take_quiz': 2,
+    'user_summary': 2,
+    'download_summary': 1,
+    'admin_summary': 1,
+}
+ROUTES = ('login', 'user_dashboard', 'attempt_quiz', 'attempt_quiz_submit', 'user_summary', 'download_summary',
+          'download_summary_pending', 'admin_summary')
+DATASET_TABLES = {'users': 'user', 'subjects': 'subject', 'chapters': 'chapter', 'quizzes': 'quiz',
+                  'questions': 'question', 'attempts': 'quiz_attempt'}
+SESSION_FIELD = re.compile(r'name="attempt_session" value="(\d+)"')
+QUESTION_IDS = re.compile(r'const questionIds = (\[[^\]]*\]);')
+# p95 may be noisy at small sample sizes; a SQL count change never is
+SQL_SLACK = 0.5
+# How often and for how long a queued summary PDF is polled before giving up
+PDF_POLL_SECONDS = 0.2
+PDF_WAIT_SECONDS = 60
+
+
+class Recorder:
+    """Per-route latencies, SQL counts and statuses, plus a per-thread statement counter."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.routes = {route: {'latencies': [], 'sql': [], 'statuses': {}} for route in ROUTES}
+        self.enabled = False
+
+    def count_statement(self, *args):
+        # Test client requests run on the calling thread, so background
+        # workers (PDF builds, autosave flushes) are not attributed to them
+        self.local.statements = getattr(self.local, 'statements', 0) + 1
+
+    def request(self, route, call, pending_route=None):
+        """Time call(); a 202 response is recorded under pending_route when given."""
+        self.local.statements = 0
+        started = time.perf_counter()
+        response = call()
+        elapsed = time.perf_counter() - started
+        if response.status_code == 202 and pending_route:
+            route = pending_route
+        if self.enabled:
+            with self.lock:
+                samples = self.routes[route]
+                samples['latencies'].append(elapsed)
+                samples['sql'].append(self.local.statements)
+                samples['statuses'][response.status_code] = samples['statuses'].get(response.status_code, 0) + 1
+        return response
+
+
+class Driver:
+    def __init__(self, app, recorder, users, quiz_ids, rng):
+        self.app = app
+        self.recorder = recorder
+        self.users = users
+        self.quiz_ids = quiz_ids
+        self.rng = rng
+        self.client = app.test_client()
+        self.admin = app.test_client()
+        self.admin.post('/login', data={'username': 'admin@example.com', 'password': 'admin123'})
+        self.login()
+
+    def login(self):
+        data = {'username': username(self.rng.randrange(self.users)), 'password': PASSWORD}
+        response = self.recorder.request('login', lambda: self.client.post('/login', data=data))
+        if response.status_code != 302:
+            raise RuntimeError(f'Login as {data["username"]} failed with status {response.status_code}')
+
+    def user_dashboard(self):
+        self.recorder.request('user_dashboard', lambda: self.client.get('/user_dashboard'))
+
+    def take_quiz(self):
+        quiz_id = self.rng.choice(self.quiz_ids)
+        page = self.recorder.request('attempt_quiz', lambda: self.client.get(f'/attempt_quiz/{quiz_id}'))
+        text = page.get_data(as_text=True)
+        session = SESSION_FIELD.search(text)
+        question_ids = QUESTION_IDS.search(text)
+        answers = {f'question_{question_id}': f'option{self.rng.randint(1, 4)}'
+                   for question_id in (json.loads(question_ids.group(1)) if question_ids else [])}
+        if session:
+            answers['attempt_session'] = session.group(1)
+        self.recorder.request('attempt_quiz_submit', lambda: self.client.post(f'/attempt_quiz/{quiz_id}', data=answers))
+
+    def user_summary(self):
+        self.recorder.request('user_summary', lambda: self.client.get('/user/summary'))
+
+    def download_summary(self):
+        # 202 while the PDF is built in the background, 200 once cached; poll
+        # like the pending page does so the served file is timed too
+        deadline = time.monotonic() + PDF_WAIT_SECONDS
+        while True:
+            response = self.recorder.request('download_summary', lambda: self.client.get('/user/summary/download'),
+                                             pending_route='download_summary_pending')
+            if response.status_code != 202 or time.monotonic() > deadline:
+                return
+            time.sleep(PDF_POLL_SECONDS)
+
+    def admin_summary(self):
+        self.recorder.request('admin_summary', lambda: self.admin.get('/admin_summary'))
+
+    def run(self, actions):
+        names = list(ACTIONS)
+        weights = [ACTIONS[name] for name in names]
+        for _ in range(actions):
+            getattr(self, self.rng.choices(names, weights)[0])()
+
+
+def summarize(recorder, seconds):
+    routes = {}
+    for route, samples in recorder.routes.items():
+        latencies = samples['latencies']
+        if not latencies:
+            continue
+        routes[route] = {
+            'requests': len(latencies),
+            'requests_per_second': round(len(latencies) / seconds, 2),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'sql_mean': round(sum(samples['sql']) / len(samples['sql']), 2),
+            'sql_max': max(samples['sql']),
+            'statuses': {str(status): count for status, count in sorted(samples['statuses'].items())}
+        }
+    return routes
+
+
+def run_benchmark(args, database_path, dataset):
+    configure_environment(database_path, args.profile)
+    from sqlalchemy import event
+    from app import app
+    from models import db, User, Quiz
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    recorder = Recorder()
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', recorder.count_statement)
+        users = User.query.filter(User.username.like(username('%'))).count()
+        quiz_ids = [row.id for row in db.session.query(Quiz.id)]
+        db.session.remove()
+    if not users or not quiz_ids:
+        raise SystemExit(f'{database_path} has no synthetic users or quizzes; generate it with synthetic_data.py')
+
+    drivers = [Driver(app, recorder, users, quiz_ids, random.Random(args.seed + index))
+               for index in range(args.threads)]
+    # Unrecorded warm-up fills the per-process caches the way a live worker would
+    for driver in drivers:
+        driver.run(args.warmup)
+    recorder.enabled = True
+
+    per_thread = args.actions // args.threads
+    threads = [threading.Thread(target=driver.run, args=(per_thread,)) for driver in drivers]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    routes = summarize(recorder, seconds)
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'database_profile': args.profile
+        },
+        'dataset': dataset,
+        'workload': {'threads': args.threads, 'actions': per_thread * args.threads, 'warmup': args.warmup,
+                     'seed': args.seed, 'mix': ACTIONS},
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(sum(route['requests'] for route in routes.values()) / seconds, 2),
+        'routes': routes
+    }
+
+
+def dataset_counts(database_path):
+    connection = sqlite3.connect(database_path)
+    try:
+        return {name: connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for name, table in DATASET_TABLES.items()}
+    finally:
+        connection.close()
+
+
+def print_report(result):
+    print(f'\n{result["workload"]["actions"]} actions on {result["workload"]["threads"]} threads in '
+          f'{result["seconds"]:.1f}s ({result["requests_per_second"]:.1f} req/s)\n')
+    print(f'{"route":<26}{"requests":>9}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"SQL":>7}{"max":>5}'
+          f'  statuses')
+    for route, row in result['routes'].items():
+        statuses = ' '.join(f'{status}:{count}' for status, count in row['statuses'].items())
+        print(f'{route:<26}{row["requests"]:>9}{row["requests_per_second"]:>9.1f}{row["p50_ms"]:>9.1f}'
+              f'{row["p95_ms"]:>9.1f}{row["p99_ms"]:>9.1f}{row["sql_mean"]:>7.1f}{row["sql_max"]:>5}  {statuses}')
+
+
+def compare(result, baseline, tolerance):
+    """Print each route against the baseline; returns the routes that regressed."""
+    regressions = []
+    print(f'\n{"route":<26}{"p95 before":>11}{"p95 now":>9}{"change":>8}{"SQL before":>11}{"SQL now":>9}')
+    for route, row in result['routes'].items():
+        old = baseline['routes'].get(route)
+        if old is None:
+            print(f'{route:<26}{"-":>11}{row["p95_ms"]:>9.1f}{"new":>8}{"-":>11}{row["sql_mean"]:>9.1f}')
+            continue
+        change = row['p95_ms'] / old['p95_ms'] - 1 if old['p95_ms'] else 0.0
+        regressed = change > tolerance or row['sql_mean'] > old['sql_mean'] + SQL_SLACK
+        print(f'{route:<26}{old["p95_ms"]:>11.1f}{row["p95_ms"]:>9.1f}{change:>+8.0%}{old["sql_mean"]:>11.1f}'
+              f'{row["sql_mean"]:>9.1f}{"  REGRESSED" if regressed else ""}')
+        if regressed:
+            regressions.append(route)
+    if baseline.get('dataset') != result['dataset']:
+        print('\nNote: the baseline was recorded against a different dataset.')
+    if baseline.get('workload', {}).get('threads') != result['workload']['threads']:
+        print('Note: the baseline used a different number of threads.')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-route latency, throughput and SQL baseline')
+    parser.add_argument('--database', help='Synthetic database to reuse (default: generate into a temporary file)')
+    add_arguments(parser)
+    parser.add_argument('--threads', type=int, default=1, help='Concurrent simulated users')
+    parser.add_argument('--actions', type=int, default=2000, help='Recorded user actions across all threads')
+    parser.add_argument('--warmup', type=int, default=50, help='Unrecorded actions per thread first')
+    parser.add_argument('--output', help='Write the JSON baseline here')
+    parser.add_argument('--compare', help='Baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='Allowed relative p95 increase')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_routes_')
+    # Keep PDF renders and other per-run files out of the working tree
+    os.environ.setdefault('PDF_CACHE_DIR', os.path.join(workdir, 'pdf_cache'))
+    os.environ.setdefault('CACHE_PATH', os.path.join(workdir, 'cache.sqlite3'))
+    database_path = args.database or os.path.join(workdir, 'bench_routes.db')
+    if not os.path.exists(database_path):
+        # In its own process: generate() imports app bound to database_path,
+        # and this process must import it bound to the working copy instead
+        setup = multiprocessing.get_context('spawn').Process(target=generate, args=(
+            database_path, args.users, args.subjects, args.chapters, args.quizzes, args.questions, args.attempts,
+            args.seed, args.responses, args.profile))
+        setup.start()
+        setup.join()
+        if setup.exitcode:
+            raise SystemExit(f'Generating {database_path} failed')
+
+    # Submissions add attempts, so each run works on a copy and the dataset stays fixed
+    working_copy = os.path.join(workdir, 'run.db')
+    shutil.copyfile(database_path, working_copy)
+    result = run_benchmark(args, working_copy, dataset_counts(database_path))
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f'\nBaseline written to {args.output}')
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print(f'\nRegressed: {", ".join(regressions)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Measure cold-start latency: importing app.py in a fresh interpreter and
+serving its first request, as a new worker process would.
+
+    python benchmarks/bench_startup.py --runs 10 --path /login
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside each fresh interpreter; prints one JSON line of timings
+PROBE = '''
+import json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+before = set(os.listdir('.'))
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get({path!r})
+served = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'status': response.status_code,
+    'created': sorted(set(os.listdir('.')) - before),
+    'reportlab_loaded': 'reportlab' in sys.modules
+}}))
+'''
+
+SETUP = '''
+import sys
+sys.path.insert(0, {root!r})
+from app import app, seed_admin
+from migrations import upgrade_database
+with app.app_context():
+    upgrade_database()
+    seed_admin()
+'''
+
+
+def run_python(code, workdir, env):
+    result = subprocess.run([sys.executable, '-c', code], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark import-to-first-request latency')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/login', help='route requested after import')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{os.path.join(workdir, "bench.db")}')
+        # The schema is prepared once, as `flask db-upgrade` would in a deployment
+        run_python(SETUP.format(root=ROOT), workdir, env)
+
+        samples = []
+        for _ in range(args.runs):
+            probe_dir = tempfile.mkdtemp(dir=workdir)
+            samples.append(json.loads(run_python(PROBE.format(root=ROOT, path=args.path), probe_dir, env)))
+
+    print(f'{args.runs} cold starts, first request GET {args.path} -> {samples[0]["status"]}\n')
+    print(f'{"phase":<20}{"median ms":>12}{"min ms":>10}{"max ms":>10}')
+    for key, label in (('import_ms', 'import app'), ('first_request_ms', 'first request')):
+        values = [sample[key] for sample in samples]
+        print(f'{label:<20}{statistics.median(values):>12.1f}{min(values):>10.1f}{max(values):>10.1f}')
+    totals = [sample['import_ms'] + sample['first_request_ms'] for sample in samples]
+    print(f'{"total":<20}{statistics.median(totals):>12.1f}{min(totals):>10.1f}{max(totals):>10.1f}')
+
+    created = sorted({name for sample in samples for name in sample['created']})
+    print(f'\nFiles created in the working directory: {", ".join(created) if created else "none"}')
+    print(f'ReportLab imported: {"yes" if any(sample["reportlab_loaded"] for sample in samples) else "no"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Load-test quiz submissions and dashboard reads against a local SQLite file
+under each DATABASE_PROFILE and report throughput and "database is locked"
+errors.
+
+    python benchmarks/load_sqlite.py --processes 4 --threads 8 --seconds 20
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import re
+import tempfile
+import time
+
+from synthetic_data import PASSWORD, configure_environment, generate, percentile, username
+
+SESSION_FIELD = re.compile(r'name="attempt_session" value="(\d+)"')
+
+
+def seed(database_path, profile, users, quizzes, questions):
+    # One subject and chapter holding every quiz; no attempts yet
+    generate(database_path, users=users, subjects=1, chapters=1, quizzes=quizzes, questions=questions,
+             attempts=0, profile=profile, log=lambda message: None)
+
+
+def worker(database_path, profile, worker_index, threads, users, seconds, write_ratio, results):
+    import threading
+    configure_environment(database_path, profile)
+    from sqlalchemy import event
+    from app import app
+    from models import db, Quiz, Question
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    lock_errors = []
+
+    def count_lock_errors(context):
+        if 'database is locked' in str(context.original_exception):
+            lock_errors.append(1)
+
+    with app.app_context():
+        event.listen(db.engine, 'handle_error', count_lock_errors)
+        quiz_questions = {}
+        for quiz_id, question_id in db.session.query(Quiz.id, Question.id).join(Question, Question.quiz_id == Quiz.id):
+            quiz_questions.setdefault(quiz_id, []).append(question_id)
+        db.session.remove()
+
+    totals = {'submissions': 0, 'reads': 0, 'failures': 0, 'latencies': []}
+    totals_lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def run(thread_index):
+        rng = random.Random(worker_index * 1000 + thread_index)
+        client = app.test_client()
+        user_index = (worker_index * threads + thread_index) % users
+        client.post('/login', data={'username': username(user_index), 'password': PASSWORD})
+        submissions = reads = failures = 0
+        latencies = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if rng.random() < write_ratio:
+                quiz_id = rng.choice(list(quiz_questions))
+                answers = {f'question_{question_id}': f'option{rng.randint(1, 4)}'
+                           for question_id in quiz_questions[quiz_id]}
+                # Opening the quiz starts the server-side session the POST must claim
+                page = client.get(f'/attempt_quiz/{quiz_id}').get_data(as_text=True)
+                match = SESSION_FIELD.search(page)
+                if match:
+                    answers['attempt_session'] = match.group(1)
+                response = client.post(f'/attempt_quiz/{quiz_id}', data=answers)
+                submissions += 1
+            else:
+                response = client.get('/user_dashboard')
+                reads += 1
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                failures += 1
+        with totals_lock:
+            totals['submissions'] += submissions
+            totals['reads'] += reads
+            totals['failures'] += failures
+            totals['latencies'].extend(latencies)
+
+    pool = [threading.Thread(target=run, args=(index,)) for index in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    totals['lock_errors'] = len(lock_errors)
+    results.put(totals)
+
+
+def run_profile(profile, args, workdir):
+    context = multiprocessing.get_context('spawn')
+    database_path = os.path.join(workdir, f'load_{profile}.db')
+    setup = context.Process(target=seed, args=(database_path, profile, args.users, args.quizzes, args.questions))
+    setup.start()
+    setup.join()
+
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(database_path, profile, index, args.threads, args.users,
+                                                      args.seconds, args.write_ratio, results))
+                 for index in range(args.processes)]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = [value for result in collected for value in result['latencies']]
+    submissions = sum(result['submissions'] for result in collected)
+    reads = sum(result['reads'] for result in collected)
+    return {
+        'profile': profile,
+        'requests_per_second': (submissions + reads) / args.seconds,
+        'submissions_per_second': submissions / args.seconds,
+        'reads_per_second': reads / args.seconds,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'lock_errors': sum(result['lock_errors'] for result in collected),
+        'failures': sum(result['failures'] for result in collected)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent submission/read load test per database profile')
+    parser.add_argument('--profiles', nargs='+', default=['default', 'production'])
+    parser.add_argument('--processes', type=int, default=4, help='worker processes, like gunicorn workers')
+    parser.add_argument('--threads', type=int, default=8, help='client threads per process')
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--write-ratio', type=float, default=0.5, help='share of requests that submit a quiz')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--quizzes', type=int, default=20)
+    parser.add_argument('--questions', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        rows = [run_profile(profile, args, workdir) for profile in args.profiles]
+
+    print(f'{args.processes} processes x {args.threads} threads for {args.seconds:g}s, '
+          f'{args.write_ratio:.0%} submissions\n')
+    print(f'{"profile":<12}{"req/s":>9}{"submit/s":>10}{"read/s":>9}{"p50 ms":>9}{"p95 ms":>9}'
+          f'{"locked":>8}{"5xx":>6}')
+    for row in rows:
+        print(f'{row["profile"]:<12}{row["requests_per_second"]:>9.1f}{row["submissions_per_second"]:>10.1f}'
+              f'{row["reads_per_second"]:>9.1f}{row["p50_ms"]:>9.1f}{row["p95_ms"]:>9.1f}'
+              f'{row["lock_errors"]:>8}{row["failures"]:>6}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Generate a reproducible synthetic Quiz Master database: users, subjects,
+chapters, quizzes, questions and attempts (with per-question responses and
+rebuilt statistics rollups) at any scale.
+
+    python benchmarks/synthetic_data.py --database /tmp/quiz_1m.db --attempts 1000000
+
+Every generated user logs in with PASSWORD; the admin account is the usual
+admin@example.com / admin123.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = 'benchmark-password'
+# Cheap hashes so seeding and logins do not dominate benchmark runs
+PASSWORD_COST = 1024
+CHUNK_SIZE = 20000
+# Attempt dates are spread over this many days before the generation time
+HISTORY_DAYS = 365
+
+
+def username(index):
+    return f'bench{index}@example.com'
+
+
+def configure_environment(database_path, profile='default'):
+    # app.py reads these at import time
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(database_path)}'
+    os.environ['DATABASE_PROFILE'] = profile
+    os.environ['PASSWORD_HASH_COST'] = str(PASSWORD_COST)
+
+
+def insert_chunked(db, model, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + CHUNK_SIZE])
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def generate(database_path, users=1000, subjects=10, chapters=5, quizzes=5, questions=10, attempts=100000,
+             seed=42, responses=True, profile='default', log=print):
+    """Create database_path from scratch and fill it; returns the row counts."""
+    if os.path.exists(database_path):
+        os.remove(database_path)
+    configure_environment(database_path, profile)
+    from app import app, seed_admin
+    from auth import hash_password
+    from grading import OPTION_FIELDS
+    from item_analysis import RESPONSE, CORRECT_BIT
+    from migrations import upgrade_database
+    from models import db, User, Subject, Chapter, Quiz, Question, QuizAttempt
+    from stats import rebuild_user_stats
+
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    started = time.perf_counter()
+    with app.app_context():
+        upgrade_database()
+        seed_admin()
+        password = hash_password(PASSWORD)
+        insert_chunked(db, User, [{
+            'username': username(index), 'password': password, 'full_name': f'Bench User {index}',
+            'qualification': 'Benchmark', 'dob': datetime(2000, 1, 1).date(), 'is_admin': False
+        } for index in range(users)])
+        insert_chunked(db, Subject, [{'name': f'Subject {index}', 'description': f'Synthetic subject {index}'}
+                                     for index in range(subjects)])
+        subject_ids = [row.id for row in db.session.query(Subject.id).order_by(Subject.id)]
+        insert_chunked(db, Chapter, [{'name': f'Chapter {index}', 'description': '', 'subject_id': subject_id}
+                                     for subject_id in subject_ids for index in range(chapters)])
+        chapter_ids = [row.id for row in db.session.query(Chapter.id).order_by(Chapter.id)]
+        insert_chunked(db, Quiz, [{'chapter_id': chapter_id, 'time_duration': 30, 'remarks': f'Quiz {index}'}
+                                  for chapter_id in chapter_ids for index in range(quizzes)])
+        quiz_ids = [row.id for row in db.session.query(Quiz.id).order_by(Quiz.id)]
+        question_rows = []
+        for quiz_id in quiz_ids:
+            for number in range(questions):
+                options = [f'Answer {letter} to question {number}' for letter in 'ABCD']
+                question_rows.append({
+                    'quiz_id': quiz_id, 'question_statement': f'Synthetic question {number} of quiz {quiz_id}?',
+                    'option1': options[0], 'option2': options[1], 'option3': options[2], 'option4': options[3],
+                    'correct_option': rng.choice(options)
+                })
+        insert_chunked(db, Question, question_rows)
+        db.session.commit()
+        log(f'Catalogue: {len(subject_ids)} subjects, {len(chapter_ids)} chapters, {len(quiz_ids)} quizzes, '
+            f'{len(question_rows)} questions')
+
+        # Correct option index per question, grouped by quiz
+        keys = {}
+        for row in db.session.query(Question.id, Question.quiz_id, *(getattr(Question, name) for name in OPTION_FIELDS),
+                                    Question.correct_option).order_by(Question.id):
+            keys.setdefault(row.quiz_id, []).append((row.id, list(row[2:6]).index(row.correct_option)))
+        user_ids = [row.id for row in db.session.query(User.id).filter(User.is_admin.is_(False))]
+        # Abler users answer correctly more often, so item statistics look realistic
+        ability = {user_id: rng.uniform(0.3, 0.95) for user_id in user_ids}
+        history = HISTORY_DAYS * 24 * 3600
+
+        rows = []
+        for index in range(attempts):
+            user_id = rng.choice(user_ids)
+            quiz_id = rng.choice(quiz_ids)
+            score = 0
+            packed = bytearray()
+            for question_id, correct in keys[quiz_id]:
+                roll = rng.random()
+                if roll < ability[user_id]:
+                    pick = correct
+                elif roll < 0.97:
+                    pick = rng.choice([option for option in range(4) if option != correct])
+                else:
+                    pick = None
+                if pick == correct:
+                    score += 1
+                if responses:
+                    code = 0 if pick is None else (pick + 1) | (CORRECT_BIT if pick == correct else 0)
+                    packed += RESPONSE.pack(question_id, code)
+            rows.append({
+                'user_id': user_id, 'quiz_id': quiz_id, 'score': score, 'total_questions': len(keys[quiz_id]),
+                'attempt_date': now - timedelta(seconds=rng.randint(0, history)),
+                'responses': bytes(packed) if responses else None
+            })
+            if len(rows) == CHUNK_SIZE:
+                insert_chunked(db, QuizAttempt, rows)
+                db.session.commit()
+                rows = []
+                log(f'  {index + 1} attempts')
+        insert_chunked(db, QuizAttempt, rows)
+        db.session.commit()
+
+        rebuild_user_stats()
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+    counts = {'users': users, 'subjects': len(subject_ids), 'chapters': len(chapter_ids), 'quizzes': len(quiz_ids),
+              'questions': len(question_rows), 'attempts': attempts}
+    log(f'Generated {attempts} attempts into {database_path} in {time.perf_counter() - started:.1f}s')
+    return counts
+
+
+def add_arguments(parser):
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--subjects', type=int, default=10)
+    parser.add_argument('--chapters', type=int, default=5, help='Chapters per subject')
+    parser.add_argument('--quizzes', type=int, default=5, help='Quizzes per chapter')
+    parser.add_argument('--questions', type=int, default=10, help='Questions per quiz')
+    parser.add_argument('--attempts', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-responses', dest='responses', action='store_false',
+                        help='Leave per-question responses empty (faster, smaller)')
+    parser.add_argument('--profile', default='default', help='DATABASE_PROFILE to open the database with')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Quiz Master database')
+    parser.add_argument('--database', required=True, help='SQLite file to create (replaced if it exists)')
+    add_arguments(parser)
+    args = parser.parse_args()
+    generate(args.database, args.users, args.subjects, args.chapters, args.quizzes, args.questions, args.attempts,
+             args.seed, args.responses, args.profile)
+
+
+if __name__ == '__main__':
+    main()
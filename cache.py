@@ -0,0 +1,283 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g
+from models import db, ChangeCounter
+
+# Namespaces of cached views; keys are '<namespace>:<generation>:<name>'
+CATALOGUE = 'catalogue'
+SUMMARY = 'summary'
+NAMESPACES = (CATALOGUE, SUMMARY)
+
+MISSING = object()
+
+
+class CacheStats:
+    """Per-process counters for tuning cache sizes and TTLs."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def add(self, name, amount=1):
+        # Request threads share one backend, and += is not atomic
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def to_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
+class NullCache:
+    """Backend that never stores anything, for CACHE_BACKEND=none."""
+    name = 'none'
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key):
+        self.stats.add('misses')
+        return MISSING
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def delete_prefix(self, prefix):
+        self.stats.add('invalidations')
+
+    def clear(self):
+        pass
+
+    def size(self):
+        return 0
+
+
+class MemoryCache:
+    """In-process LRU cache whose entries also expire after a TTL."""
+    name = 'memory'
+
+    def __init__(self, max_entries=256, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.add('misses')
+                return MISSING
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats.add('expirations')
+                self.stats.add('misses')
+                return MISSING
+            self._entries.move_to_end(key)
+            self.stats.add('hits')
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl if ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.add('evictions')
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+            self.stats.add('invalidations')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Cache in a local SQLite file shared by every worker process on the host.
+
+    Values are pickled. Reads never write, so instead of strict LRU the
+    oldest entries by store time are evicted once max_entries is exceeded.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries=1024, default_ttl=300):
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._local = threading.local()
+
+    def _connection(self):
+        # Opened per thread on first use, so creating the backend touches no files
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS cache_entries ('
+                    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, stored_at REAL NOT NULL)'
+                )
+                connection.execute('CREATE INDEX IF NOT EXISTS ix_cache_entries_stored_at ON cache_entries (stored_at)')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            self.stats.add('misses')
+            return MISSING
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            with self._connection() as connection:
+                connection.execute('DELETE FROM cache_entries WHERE key = ? AND expires_at = ?', (key, expires_at))
+            self.stats.add('expirations')
+            self.stats.add('misses')
+            return MISSING
+        self.stats.add('hits')
+        return pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + ttl if ttl else None, now)
+            )
+            connection.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (now,))
+            excess = connection.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0] - self.max_entries
+            if excess > 0:
+                connection.execute(
+                    'DELETE FROM cache_entries WHERE key IN '
+                    '(SELECT key FROM cache_entries ORDER BY stored_at LIMIT ?)', (excess,)
+                )
+                self.stats.add('evictions', excess)
+
+    def delete(self, key):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+
+    def delete_prefix(self, prefix):
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        with self._connection() as connection:
+            connection.execute("DELETE FROM cache_entries WHERE key LIKE ? ESCAPE '\\'", (escaped + '%',))
+        self.stats.add('invalidations')
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM cache_entries')
+
+    def size(self):
+        return self._connection().execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+
+
+def create_cache(config):
+    backend = config.get('CACHE_BACKEND', 'memory')
+    ttl = config.get('CACHE_DEFAULT_TTL', 300)
+    max_entries = config.get('CACHE_MAX_ENTRIES', 256)
+    if backend == 'memory':
+        return MemoryCache(max_entries, ttl)
+    if backend == 'sqlite':
+        return SQLiteCache(config.get('CACHE_PATH', 'cache.sqlite3'), max_entries, ttl)
+    if backend == 'none':
+        return NullCache()
+    raise ValueError(f'Unknown cache backend {backend!r}')
+
+
+def init_cache(app):
+    app.extensions['cache'] = create_cache(app.config)
+    return app.extensions['cache']
+
+
+def get_cache():
+    return current_app.extensions['cache']
+
+
+def counter_name(namespace):
+    return f'cache:{namespace}'
+
+
+def generations():
+    """Shared generation of every namespace, read once per request.
+
+    invalidate() bumps these in the database, so a write in one worker
+    changes the keys every other worker looks up, even though their
+    in-memory entries are never deleted.
+    """
+    if 'cache_generations' not in g:
+        names = {counter_name(namespace): namespace for namespace in NAMESPACES}
+        rows = db.session.query(ChangeCounter.name, ChangeCounter.value).filter(ChangeCounter.name.in_(names))
+        g.cache_generations = dict.fromkeys(NAMESPACES, 0)
+        g.cache_generations.update((names[name], value) for name, value in rows)
+    return g.cache_generations
+
+
+def cached(namespace, name, loader, ttl=None):
+    """Read-through lookup: return the cached value or store what loader() returns."""
+    cache = get_cache()
+    # Nothing is stored without a backend, so skip the generation read
+    generation = 0 if isinstance(cache, NullCache) else generations()[namespace]
+    key = f'{namespace}:{generation}:{name}'
+    value = cache.get(key)
+    if value is MISSING:
+        value = loader()
+        cache.set(key, value, ttl)
+    return value
+
+
+def invalidate(*namespaces):
+    """Drop cached views after a committed write, in this worker and every other."""
+    # Its own transaction: callers have already committed the write itself
+    with db.engine.begin() as connection:
+        for namespace in namespaces:
+            bumped = connection.execute(db.update(ChangeCounter).where(ChangeCounter.name == counter_name(namespace))
+                                        .values(value=ChangeCounter.value + 1)).rowcount
+            if not bumped:
+                connection.execute(db.insert(ChangeCounter).values(name=counter_name(namespace), value=1))
+    g.pop('cache_generations', None)
+    cache = get_cache()
+    for namespace in namespaces:
+        cache.delete_prefix(f'{namespace}:')
+
+
+def cache_stats():
+    cache = get_cache()
+    return dict(cache.stats.to_dict(), backend=cache.name, entries=cache.size())
@@ -0,0 +1,48 @@
+from sqlalchemy.orm import selectinload
+from models import Subject, Chapter, Quiz, Question
+
+# How far down Subject -> Chapter -> Quiz -> Question a page needs the tree
+CHAPTERS = 1
+QUIZZES = 2
+QUESTIONS = 3
+
+
+def catalogue_options(depth=QUESTIONS, full_questions=False):
+    """Loader options that fetch the catalogue tree with one SELECT ... IN per level."""
+    chain = selectinload(Subject.chapters)
+    if depth >= QUIZZES:
+        chain = chain.selectinload(Chapter.quizzes)
+    if depth >= QUESTIONS:
+        chain = chain.selectinload(Quiz.questions)
+        if not full_questions:
+            # Listing pages only count questions, so skip the text columns
+            chain = chain.load_only(Question.id, Question.quiz_id)
+    return chain
+
+
+def load_catalogue(depth=QUESTIONS, full_questions=False):
+    """All subjects with their subtree preloaded to the given depth."""
+    return Subject.query\
+        .options(catalogue_options(depth, full_questions))\
+        .order_by(Subject.id)\
+        .all()
+
+
+def catalogue_snapshot():
+    """Plain-data copy of the catalogue tree with question counts, safe to cache."""
+    return [{
+        'id': subject.id,
+        'name': subject.name,
+        'description': subject.description,
+        'chapters': [{
+            'id': chapter.id,
+            'name': chapter.name,
+            'description': chapter.description,
+            'quizzes': [{
+                'id': quiz.id,
+                'remarks': quiz.remarks,
+                'time_duration': quiz.time_duration,
+                'question_count': len(quiz.questions)
+            } for quiz in chapter.quizzes]
+        } for chapter in subject.chapters]
+    } for subject in load_catalogue(depth=QUESTIONS)]
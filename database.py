@@ -0,0 +1,55 @@
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from models import db
+
+# 'default' leaves SQLite in its stock rollback-journal mode; 'production'
+# switches to WAL so readers never block on a committing writer
+PROFILES = ('default', 'production')
+
+
+def sqlite_pragmas(config):
+    """PRAGMA statements run on every new connection under the production profile."""
+    return [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        # Negative cache_size is in KiB rather than pages
+        ('cache_size', -config['SQLITE_CACHE_SIZE_KB']),
+        ('temp_store', 'MEMORY'),
+    ]
+
+
+def init_database(app):
+    """Apply DATABASE_PROFILE to the engine options, then initialise Flask-SQLAlchemy."""
+    profile = app.config['DATABASE_PROFILE']
+    if profile not in PROFILES:
+        raise ValueError(f'Unknown DATABASE_PROFILE {profile!r}')
+    production = profile == 'production' and app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite')
+
+    if production:
+        options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+        connect_args = options.setdefault('connect_args', {})
+        # Pooled connections move between server threads
+        connect_args['check_same_thread'] = False
+        connect_args['timeout'] = app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000
+        options.update(
+            poolclass=QueuePool,
+            pool_size=app.config['DB_POOL_SIZE'],
+            max_overflow=app.config['DB_MAX_OVERFLOW'],
+            pool_timeout=app.config['DB_POOL_TIMEOUT']
+        )
+    db.init_app(app)
+
+    if production:
+        pragmas = sqlite_pragmas(app.config)
+
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+            cursor.close()
+
+        # Creating the engine opens no connection, so import stays free of I/O
+        with app.app_context():
+            event.listen(db.engine, 'connect', apply_pragmas)
@@ -0,0 +1,218 @@
+import json
+from sqlalchemy.exc import IntegrityError
+from models import db, User, Subject, Chapter, Quiz, Question, QuizAttempt, AttemptSession, QuestionStats, UserSubjectStats, PendingDeletion
+from grading import invalidate_answer_key
+from quiz_payload import invalidate_quiz_payload
+from stats import rebuild_user_stats, users_with_attempts, delete_user_stats
+from cache import invalidate, CATALOGUE, SUMMARY
+from auth import forget_identity
+from leaderboards import invalidate_leaderboards
+
+DEFAULT_BATCH_SIZE = 5000
+# Children first, the target row last, rollups once everything is gone
+STAGES = ('attempts', 'questions', 'catalogue', 'statistics')
+# Quiz ids bound per IN (...) once the quiz rows themselves are gone
+ID_CHUNK_SIZE = 500
+
+
+def quiz_ids_select(kind, target_id):
+    """SELECT of the quiz ids a subject, chapter or quiz deletion covers."""
+    if kind == 'quiz':
+        return db.select(Quiz.id).where(Quiz.id == target_id)
+    if kind == 'chapter':
+        return db.select(Quiz.id).where(Quiz.chapter_id == target_id)
+    if kind == 'subject':
+        chapter_ids = db.select(Chapter.id).where(Chapter.subject_id == target_id)
+        return db.select(Quiz.id).where(Quiz.chapter_id.in_(chapter_ids))
+    raise ValueError(f'Unknown deletion target {kind!r}')
+
+
+def attempt_condition(kind, target_id):
+    if kind == 'user':
+        return QuizAttempt.user_id == target_id
+    return QuizAttempt.quiz_id.in_(quiz_ids_select(kind, target_id))
+
+
+def attempts_in_scope(kind, target_id):
+    return db.session.query(db.func.count(QuizAttempt.id))\
+        .filter(attempt_condition(kind, target_id))\
+        .scalar()
+
+
+def chunked(ids, size=ID_CHUNK_SIZE):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def delete_in_batches(model, condition, batch_size, on_batch=None):
+    """DELETE matching rows batch_size at a time, committing after every batch.
+
+    Short transactions let quiz submissions take the SQLite write lock in
+    between batches instead of waiting for the whole cascade.
+    """
+    deleted = 0
+    while True:
+        batch = db.select(model.id).where(condition).limit(batch_size)
+        result = db.session.execute(
+            db.delete(model).where(model.id.in_(batch)).execution_options(synchronize_session=False))
+        db.session.commit()
+        deleted += result.rowcount
+        if on_batch:
+            on_batch(deleted)
+        if result.rowcount < batch_size:
+            return deleted
+
+
+def remove_target(kind, target_id, quiz_ids):
+    """Delete the target row itself and any quiz sessions left in scope (caller commits)."""
+    delete_sessions(kind, target_id, quiz_ids)
+    if kind == 'user':
+        delete_user_stats(target_id)
+        db.session.execute(db.delete(User).where(User.id == target_id)
+                           .execution_options(synchronize_session=False))
+        return
+    for chunk in chunked(quiz_ids):
+        db.session.execute(db.delete(Quiz).where(Quiz.id.in_(chunk))
+                           .execution_options(synchronize_session=False))
+    if kind == 'subject':
+        db.session.query(UserSubjectStats).filter(UserSubjectStats.subject_id == target_id).delete()
+        db.session.execute(db.delete(Chapter).where(Chapter.subject_id == target_id)
+                           .execution_options(synchronize_session=False))
+        db.session.execute(db.delete(Subject).where(Subject.id == target_id)
+                           .execution_options(synchronize_session=False))
+    elif kind == 'chapter':
+        db.session.execute(db.delete(Chapter).where(Chapter.id == target_id)
+                           .execution_options(synchronize_session=False))
+
+
+def delete_each(model, conditions, batch_size, on_batch=None):
+    """delete_in_batches over several conditions, reporting one running total."""
+    deleted = 0
+    for condition in conditions:
+        done = deleted
+        deleted += delete_in_batches(model, condition, batch_size,
+                                     on_batch and (lambda count: on_batch(done + count)))
+    return deleted
+
+
+def delete_sessions(kind, target_id, quiz_ids):
+    if kind == 'user':
+        db.session.execute(db.delete(AttemptSession).where(AttemptSession.user_id == target_id)
+                           .execution_options(synchronize_session=False))
+        return
+    for chunk in chunked(quiz_ids):
+        db.session.execute(db.delete(AttemptSession).where(AttemptSession.quiz_id.in_(chunk))
+                           .execution_options(synchronize_session=False))
+
+
+def begin_deletion(kind, target_id):
+    """Record the cascade and end the live quiz sessions in scope, in one transaction."""
+    if kind == 'user':
+        quiz_ids = []
+        affected_users = set()
+    else:
+        quiz_ids = [row[0] for row in db.session.execute(quiz_ids_select(kind, target_id))]
+        affected_users = users_with_attempts(quiz_ids)
+    pending = PendingDeletion(kind=kind, target_id=target_id, stage=STAGES[0], quiz_ids=json.dumps(quiz_ids),
+                              user_ids=json.dumps(sorted(affected_users)))
+    db.session.add(pending)
+    delete_sessions(kind, target_id, quiz_ids)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Already being deleted; pick up the recorded cascade instead
+        db.session.rollback()
+        pending = PendingDeletion.query.filter_by(kind=kind, target_id=target_id).one()
+    return pending
+
+
+def deletion_pending(quiz, user_id):
+    """Whether quiz or user_id is covered by a cascade that has not finished."""
+    covered = (('quiz', quiz.id), ('chapter', quiz.chapter_id), ('subject', quiz.chapter.subject_id),
+               ('user', user_id))
+    return db.session.query(PendingDeletion.query.filter(db.or_(*(
+        db.and_(PendingDeletion.kind == kind, PendingDeletion.target_id == target) for kind, target in covered
+    ))).exists()).scalar()
+
+
+def enter_stage(pending, stage):
+    pending.stage = stage
+    db.session.commit()
+
+
+def cascade_delete(job, kind, target_id, batch_size=DEFAULT_BATCH_SIZE):
+    """Delete a subject, chapter, quiz or user with everything hanging off it.
+
+    The cascade is recorded in pending_deletion together with the end of the
+    live quiz sessions in scope, so nothing it covers can be started or
+    submitted while it runs (see deletion_pending). Attempts and questions
+    then go batch by batch, the target row last, and the affected users'
+    rollups are rebuilt at the end. The current stage is stored as it
+    starts, so a cascade whose worker died is finished by
+    `flask resume-deletions`, or by deleting the same target again. Progress is reported through
+    job.update() as each stage advances.
+    """
+    pending = PendingDeletion.query.filter_by(kind=kind, target_id=target_id).first() \
+        or begin_deletion(kind, target_id)
+    quiz_ids = json.loads(pending.quiz_ids)
+    affected_users = json.loads(pending.user_ids)
+    remaining = STAGES[STAGES.index(pending.stage):]
+    if kind == 'user':
+        attempt_filters = [QuizAttempt.user_id == target_id]
+    else:
+        attempt_filters = [QuizAttempt.quiz_id.in_(chunk) for chunk in chunked(quiz_ids)]
+
+    if 'attempts' in remaining:
+        enter_stage(pending, 'attempts')
+        job.update(stage='attempts', attempts_deleted=0,
+                   attempts_total=sum(db.session.query(db.func.count(QuizAttempt.id)).filter(condition).scalar()
+                                      for condition in attempt_filters))
+        delete_each(QuizAttempt, attempt_filters, batch_size, lambda deleted: job.update(attempts_deleted=deleted))
+        # Rankings cannot drop attempts incrementally
+        invalidate_leaderboards()
+        db.session.commit()
+
+    if 'questions' in remaining and quiz_ids:
+        enter_stage(pending, 'questions')
+        for chunk in chunked(quiz_ids):
+            db.session.execute(db.delete(QuestionStats).where(QuestionStats.quiz_id.in_(chunk))
+                               .execution_options(synchronize_session=False))
+        db.session.commit()
+        question_filters = [Question.quiz_id.in_(chunk) for chunk in chunked(quiz_ids)]
+        job.update(stage='questions',
+                   questions_total=sum(db.session.query(db.func.count(Question.id)).filter(condition).scalar()
+                                       for condition in question_filters),
+                   questions_deleted=0)
+        delete_each(Question, question_filters, batch_size, lambda deleted: job.update(questions_deleted=deleted))
+
+    if 'catalogue' in remaining:
+        enter_stage(pending, 'catalogue')
+        job.update(stage='catalogue')
+        remove_target(kind, target_id, quiz_ids)
+        db.session.commit()
+        db.session.expire_all()
+        for quiz_id in quiz_ids:
+            invalidate_answer_key(quiz_id)
+            invalidate_quiz_payload(quiz_id)
+        invalidate(CATALOGUE, SUMMARY)
+        if kind == 'user':
+            forget_identity(target_id)
+
+    if affected_users:
+        enter_stage(pending, 'statistics')
+        job.update(stage='statistics', users_total=len(affected_users), users_rebuilt=0)
+        for start in range(0, len(affected_users), batch_size):
+            chunk = affected_users[start:start + batch_size]
+            rebuild_user_stats(chunk)
+            db.session.commit()
+            job.update(users_rebuilt=start + len(chunk))
+        invalidate(SUMMARY)
+
+    db.session.execute(db.delete(PendingDeletion).where(PendingDeletion.id == pending.id)
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+    job.update(stage='done')
+
+
+def pending_deletions():
+    return PendingDeletion.query.order_by(PendingDeletion.id).all()
@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from models import db, User, Subject, Chapter, Quiz, QuizAttempt
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 5000
+COLUMNS = ('attempt_id', 'attempt_date', 'user_id', 'username', 'full_name', 'subject_id', 'subject',
+           'chapter_id', 'chapter', 'quiz_id', 'quiz', 'score', 'total_questions', 'percentage')
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+# Spreadsheets evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_date(value, name):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ExportError(f'{name} must be a date like 2024-09-01')
+
+
+def export_query(start=None, end=None, subject_id=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Attempts joined with their user, quiz, chapter and subject, in id order.
+
+    start and end are inclusive dates. Rows are fetched batch_size at a time
+    from the open cursor, so only one batch is ever held in memory.
+    """
+    query = db.session.query(
+        QuizAttempt.id, QuizAttempt.attempt_date, User.id, User.username, User.full_name,
+        Subject.id, Subject.name, Chapter.id, Chapter.name, Quiz.id, Quiz.remarks,
+        QuizAttempt.score, QuizAttempt.total_questions
+    ).join(User, User.id == QuizAttempt.user_id)\
+        .join(Quiz, Quiz.id == QuizAttempt.quiz_id)\
+        .join(Chapter, Chapter.id == Quiz.chapter_id)\
+        .join(Subject, Subject.id == Chapter.subject_id)
+    if start:
+        query = query.filter(QuizAttempt.attempt_date >= datetime.combine(start, datetime.min.time()))
+    if end:
+        query = query.filter(QuizAttempt.attempt_date < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if subject_id:
+        query = query.filter(Chapter.subject_id == subject_id)
+    return query.order_by(QuizAttempt.id).yield_per(batch_size)
+
+
+def export_row(row):
+    values = list(row)
+    if values[1] is not None:
+        values[1] = values[1].isoformat(sep=' ', timespec='seconds')
+    score, total_questions = values[11], values[12]
+    values.append(round(score / total_questions * 100, 2) if total_questions else None)
+    return values
+
+
+def csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(rows, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([csv_cell(value) for value in export_row(row)])
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_chunks(rows, batch_size):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(COLUMNS, export_row(row))), separators=(',', ':')))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(chunks):
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_attempts(fmt='csv', compress=False, start=None, end=None, subject_id=None,
+                    batch_size=DEFAULT_BATCH_SIZE):
+    """Generator of encoded byte chunks, one per batch of attempts."""
+    if fmt not in FORMATS:
+        raise ExportError(f'format must be one of {", ".join(FORMATS)}')
+    rows = export_query(start, end, subject_id, batch_size)
+    encode = csv_chunks if fmt == 'csv' else jsonl_chunks
+    chunks = (chunk.encode('utf-8') for chunk in encode(rows, batch_size))
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(fmt, compress, today=None):
+    name = f'quiz_attempts_{(today or date.today()).strftime("%Y%m%d")}.{fmt}'
+    return name + '.gz' if compress else name
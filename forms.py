@@ -66,6 +66,12 @@ class QuizForm(FlaskForm):
                               DataRequired(message="Quiz title is required."),
                               Length(min=3, max=200, message="Quiz title must be between 3 and 200 characters.")
                           ])
+    questions_per_attempt = IntegerField('Questions per Attempt',
+                                         validators=[
+                                             Optional(),
+                                             NumberRange(min=1, message="Draw at least one question per attempt.")
+                                         ])
+    shuffle = BooleanField('Shuffle question and option order for each attempt')
 
 class QuestionForm(FlaskForm):
     question_statement = TextAreaField('Question', validators=[
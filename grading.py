@@ -0,0 +1,82 @@
+import threading
+from models import db, Question
+
+OPTION_FIELDS = ('option1', 'option2', 'option3', 'option4')
+OPTION_INDEX = {name: index for index, name in enumerate(OPTION_FIELDS)}
+
+# quiz_id -> AnswerKey, shared by every request thread of this process
+_answer_keys = {}
+_compile_lock = threading.Lock()
+
+
+class AnswerKey:
+    """Compiled grading data for one version of a quiz.
+
+    ``masks`` maps question id to a bitmask of the option indexes that count as
+    correct (bit 0 is option1), in question id order.
+    """
+    __slots__ = ('quiz_id', 'version', 'masks')
+
+    def __init__(self, quiz_id, version, masks):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.masks = masks
+
+    @property
+    def total_questions(self):
+        return len(self.masks)
+
+    def grade(self, answers, question_ids=None):
+        # answers maps 'question_<id>' to the selected option name, like request.form;
+        # question_ids limits grading to the questions an attempt actually drew
+        score = 0
+        for question_id in self.masks if question_ids is None else question_ids:
+            mask = self.masks.get(question_id, 0)
+            index = OPTION_INDEX.get(answers.get(f'question_{question_id}'))
+            if index is not None and mask >> index & 1:
+                score += 1
+        return score
+
+
+def correct_option_mask(options, correct_option):
+    # correct_option normally holds the answer text; questions saved through
+    # edit_question hold the option field name instead
+    mask = 0
+    for index, text in enumerate(options):
+        if text == correct_option:
+            mask |= 1 << index
+    if not mask and correct_option in OPTION_INDEX:
+        mask = 1 << OPTION_INDEX[correct_option]
+    return mask
+
+
+def compile_answer_key(quiz_id, version):
+    rows = db.session.query(
+        Question.id, Question.option1, Question.option2, Question.option3, Question.option4,
+        Question.correct_option
+    ).filter(Question.quiz_id == quiz_id).order_by(Question.id).all()
+    masks = {row.id: correct_option_mask(row[1:5], row.correct_option) for row in rows}
+    return AnswerKey(quiz_id, version, masks)
+
+
+def get_answer_key(quiz):
+    """The cached answer key for the quiz, recompiled when its content version moves."""
+    key = _answer_keys.get(quiz.id)
+    if key is not None and key.version == quiz.content_version:
+        return key
+    with _compile_lock:
+        key = _answer_keys.get(quiz.id)
+        if key is None or key.version != quiz.content_version:
+            key = compile_answer_key(quiz.id, quiz.content_version)
+            _answer_keys[quiz.id] = key
+    return key
+
+
+def bump_quiz_version(quiz):
+    """Mark the quiz's questions as changed so every process recompiles its key."""
+    quiz.content_version = (quiz.content_version or 1) + 1
+    invalidate_answer_key(quiz.id)
+
+
+def invalidate_answer_key(quiz_id):
+    _answer_keys.pop(quiz_id, None)
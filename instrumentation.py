@@ -0,0 +1,186 @@
+import cProfile
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# (metric name, help text, per-request sample key)
+METRICS = (
+    ('quiz_master_request_duration_seconds', 'Request wall time in seconds.', 'wall'),
+    ('quiz_master_request_sql_statements', 'SQL statements executed per request.', 'sql_count'),
+    ('quiz_master_request_sql_seconds', 'Time spent in SQL per request in seconds.', 'sql_time'),
+    ('quiz_master_request_sql_rows', 'Rows fetched or affected by SQL per request.', 'sql_rows'),
+)
+
+_listeners_installed = False
+
+
+class RollingSummary:
+    """Lifetime count/sum plus the most recent samples for percentile estimates."""
+    __slots__ = ('count', 'total', 'samples')
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] for q in QUANTILES}
+
+
+class MetricsRegistry:
+    def __init__(self, window):
+        self.window = window
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, status, sample):
+        with self.lock:
+            metrics = self.endpoints.get(endpoint)
+            if metrics is None:
+                metrics = {key: RollingSummary(self.window) for _, _, key in METRICS}
+                metrics['errors'] = 0
+                self.endpoints[endpoint] = metrics
+            for _, _, key in METRICS:
+                metrics[key].add(sample[key])
+            if status >= 500:
+                metrics['errors'] += 1
+
+    def prometheus_text(self):
+        """Render every endpoint's summaries in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            for name, help_text, key in METRICS:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} summary')
+                for endpoint, metrics in endpoints:
+                    summary = metrics[key]
+                    for quantile, value in summary.quantiles().items():
+                        lines.append(f'{name}{{endpoint="{endpoint}",quantile="{quantile}"}} {value:.6g}')
+                    lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {summary.total:.6g}')
+                    lines.append(f'{name}_count{{endpoint="{endpoint}"}} {summary.count}')
+            lines.append('# HELP quiz_master_request_errors_total Requests that ended with a 5xx status.')
+            lines.append('# TYPE quiz_master_request_errors_total counter')
+            for endpoint, metrics in endpoints:
+                lines.append(f'quiz_master_request_errors_total{{endpoint="{endpoint}"}} {metrics["errors"]}')
+        return '\n'.join(lines) + '\n'
+
+
+class CountingCursor(sqlite3.Cursor):
+    # Counts rows as SQLAlchemy fetches them so SELECT results can be measured
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            _add_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        _add_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        _add_rows(len(rows))
+        return rows
+
+
+class CountingConnection(sqlite3.Connection):
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+
+def _request_sample():
+    if has_request_context():
+        return g.get('_instrumentation')
+    return None
+
+
+def _add_rows(count):
+    sample = _request_sample()
+    if sample is not None:
+        sample['sql_rows'] += count
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sample = _request_sample()
+    if sample is not None:
+        sample['sql_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sample = _request_sample()
+    if sample is not None and sample.get('sql_started') is not None:
+        sample['sql_count'] += 1
+        sample['sql_time'] += time.perf_counter() - sample.pop('sql_started')
+        # DML reports affected rows; SELECTs are counted by CountingCursor
+        if cursor.rowcount and cursor.rowcount > 0:
+            sample['sql_rows'] += cursor.rowcount
+
+
+def init_instrumentation(app):
+    """Attach request hooks and SQL listeners; call before db.init_app(app)."""
+    global _listeners_installed
+    registry = MetricsRegistry(app.config.get('METRICS_WINDOW', 1024))
+    app.extensions['instrumentation'] = registry
+
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+        options.setdefault('connect_args', {})['factory'] = CountingConnection
+
+    if not _listeners_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listeners_installed = True
+
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+    slow_seconds = app.config.get('PROFILE_SLOW_MS', 500) / 1000.0
+    profile_dir = app.config.get('PROFILE_DIR', 'profiles')
+
+    @app.before_request
+    def start_request_sample():
+        g._instrumentation = {'started': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0, 'sql_rows': 0}
+        if sample_rate and random.random() < sample_rate:
+            g._profiler = cProfile.Profile()
+            g._profiler.enable()
+
+    @app.teardown_request
+    def finish_request_sample(error=None):
+        sample = g.pop('_instrumentation', None)
+        if sample is None:
+            return
+        sample['wall'] = time.perf_counter() - sample['started']
+        status = g.pop('_response_status', 500 if error else 200)
+        registry.record(request.endpoint or 'unmatched', status, sample)
+
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            if sample['wall'] >= slow_seconds:
+                os.makedirs(profile_dir, exist_ok=True)
+                name = f'{request.endpoint or "unmatched"}_{datetime.now():%Y%m%d%H%M%S%f}_{sample["wall"] * 1000:.0f}ms.prof'
+                profiler.dump_stats(os.path.join(profile_dir, name))
+
+    @app.after_request
+    def remember_status(response):
+        g._response_status = response.status_code
+        return response
+
+    return registry
@@ -0,0 +1,161 @@
+import math
+import struct
+from datetime import datetime
+from models import db, Question, QuizAttempt, QuestionStats
+from grading import OPTION_FIELDS, OPTION_INDEX
+
+# One record per question shown: question id, then the pick (0 = skipped,
+# 1-4 = option number) with the high bit set when the pick was correct
+RESPONSE = struct.Struct('<IB')
+CORRECT_BIT = 0x80
+DEFAULT_BATCH_SIZE = 5000
+
+
+def form_picks(answers, question_ids):
+    """(question id, option index or None) pairs from 'question_<id>' form answers."""
+    return [(question_id, OPTION_INDEX.get(answers.get(f'question_{question_id}')))
+            for question_id in question_ids]
+
+
+def pack_responses(answer_key, picks):
+    """Encode (question id, option index or None) pairs, marking the correct ones."""
+    packed = bytearray()
+    for question_id, pick in picks:
+        code = 0
+        if pick is not None:
+            code = pick + 1
+            if answer_key.masks.get(question_id, 0) >> pick & 1:
+                code |= CORRECT_BIT
+        packed += RESPONSE.pack(question_id, code)
+    return bytes(packed)
+
+
+def unpack_responses(packed):
+    """Yield (question id, option number or 0 when skipped, correct) per question shown."""
+    for question_id, code in RESPONSE.iter_unpack(packed):
+        yield question_id, code & ~CORRECT_BIT, bool(code & CORRECT_BIT)
+
+
+class ItemTally:
+    """Running sums for one question across every attempt that showed it.
+
+    Discrimination correlates the question's 0/1 score with the share of the
+    attempt's other questions answered correctly, so the item does not
+    inflate its own coefficient and attempts drawn from a pool compare fairly.
+    """
+    __slots__ = ('quiz_id', 'responses', 'correct', 'picks',
+                 'rest_n', 'rest_correct', 'rest_sum', 'rest_squares', 'rest_sum_correct')
+
+    def __init__(self, quiz_id):
+        self.quiz_id = quiz_id
+        self.responses = 0
+        self.correct = 0
+        self.picks = [0] * (len(OPTION_FIELDS) + 1)
+        self.rest_n = 0
+        self.rest_correct = 0
+        self.rest_sum = 0.0
+        self.rest_squares = 0.0
+        self.rest_sum_correct = 0.0
+
+    def add(self, pick, correct, rest):
+        self.responses += 1
+        self.picks[pick] += 1
+        if correct:
+            self.correct += 1
+        if rest is not None:
+            self.rest_n += 1
+            self.rest_sum += rest
+            self.rest_squares += rest * rest
+            if correct:
+                self.rest_correct += 1
+                self.rest_sum_correct += rest
+
+    def difficulty(self):
+        return self.correct / self.responses if self.responses else None
+
+    def discrimination(self):
+        n = self.rest_n
+        if n < 2:
+            return None
+        p = self.rest_correct / n
+        mean = self.rest_sum / n
+        item_variance = p * (1 - p)
+        rest_variance = self.rest_squares / n - mean * mean
+        if item_variance <= 0 or rest_variance <= 1e-12:
+            return None
+        covariance = self.rest_sum_correct / n - p * mean
+        return covariance / math.sqrt(item_variance * rest_variance)
+
+    def row(self, question_id, computed_at):
+        return {
+            'question_id': question_id,
+            'quiz_id': self.quiz_id,
+            'responses': self.responses,
+            'correct': self.correct,
+            'skipped': self.picks[0],
+            **{name: self.picks[number] for number, name in enumerate(OPTION_FIELDS, 1)},
+            'difficulty': self.difficulty(),
+            'discrimination': self.discrimination(),
+            'computed_at': computed_at
+        }
+
+
+def tally_attempts(rows, on_progress=None, progress_every=DEFAULT_BATCH_SIZE):
+    """Fold (quiz id, packed responses) rows into {question id: ItemTally}."""
+    tallies = {}
+    processed = 0
+    for quiz_id, packed in rows:
+        records = list(unpack_responses(packed))
+        score = sum(1 for _, _, correct in records if correct)
+        others = len(records) - 1
+        for question_id, pick, correct in records:
+            tally = tallies.get(question_id)
+            if tally is None:
+                tally = tallies[question_id] = ItemTally(quiz_id)
+            tally.add(pick, correct, (score - correct) / others if others else None)
+        processed += 1
+        if on_progress and processed % progress_every == 0:
+            on_progress(processed)
+    if on_progress:
+        on_progress(processed)
+    return tallies
+
+
+def analyse_items(job, quiz_ids=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Recompute question_stats from the stored responses of every attempt.
+
+    Attempts stream from the database batch_size rows at a time, so memory
+    grows with the number of questions rather than the number of attempts.
+    quiz_ids limits the run to those quizzes; their old rows are replaced.
+    """
+    query = db.session.query(QuizAttempt.quiz_id, QuizAttempt.responses)\
+        .filter(QuizAttempt.responses.isnot(None))
+    if quiz_ids is not None:
+        query = query.filter(QuizAttempt.quiz_id.in_(quiz_ids))
+    job.update(stage='attempts', attempts_processed=0)
+    tallies = tally_attempts(query.yield_per(batch_size),
+                             lambda processed: job.update(attempts_processed=processed), batch_size)
+
+    # Questions deleted since their attempts were taken have nothing to show
+    live = db.session.query(Question.id)
+    if quiz_ids is not None:
+        live = live.filter(Question.quiz_id.in_(quiz_ids))
+    live = {question_id for (question_id,) in live}
+    tallies = {question_id: tally for question_id, tally in tallies.items() if question_id in live}
+    job.update(stage='saving', questions=len(tallies))
+    computed_at = datetime.utcnow()
+    stale = db.delete(QuestionStats)
+    if quiz_ids is not None:
+        stale = stale.where(QuestionStats.quiz_id.in_(quiz_ids))
+    db.session.execute(stale.execution_options(synchronize_session=False))
+    rows = [tally.row(question_id, computed_at) for question_id, tally in tallies.items()]
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(db.insert(QuestionStats), rows[start:start + batch_size])
+    db.session.commit()
+    job.update(stage='done')
+    return len(rows)
+
+
+def question_stats(quiz_id):
+    """{question id: QuestionStats} for one quiz's last analysis run."""
+    return {row.question_id: row for row in QuestionStats.query.filter_by(quiz_id=quiz_id)}
@@ -0,0 +1,92 @@
+import threading
+import uuid
+from datetime import datetime
+from flask import current_app
+from models import db
+
+# Finished jobs are forgotten once this many newer ones exist
+MAX_TRACKED_JOBS = 100
+
+_jobs = {}
+_lock = threading.Lock()
+
+
+class Job:
+    """Progress record for a unit of background work in this process."""
+
+    def __init__(self, kind, description):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.description = description
+        self.status = 'queued'
+        self.progress = {}
+        self.error = None
+        self.created_at = datetime.now()
+        self.finished_at = None
+
+    def update(self, **progress):
+        self.progress.update(progress)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'description': self.description,
+            'status': self.status,
+            'progress': dict(self.progress),
+            'error': self.error,
+            'created_at': self.created_at.isoformat(timespec='seconds'),
+            'finished_at': self.finished_at.isoformat(timespec='seconds') if self.finished_at else None
+        }
+
+
+def _track(job):
+    with _lock:
+        _jobs[job.id] = job
+        finished = [j for j in _jobs.values() if j.status in ('finished', 'failed')]
+        finished.sort(key=lambda j: j.created_at)
+        for old in finished[:max(len(_jobs) - MAX_TRACKED_JOBS, 0)]:
+            del _jobs[old.id]
+
+
+def start_job(kind, description, func, *args, **kwargs):
+    """Run func(job, *args, **kwargs) on a daemon thread inside an app context."""
+    app = current_app._get_current_object()
+    job = Job(kind, description)
+    _track(job)
+
+    def run():
+        with app.app_context():
+            job.status = 'running'
+            try:
+                func(job, *args, **kwargs)
+                job.status = 'finished'
+            except Exception as e:
+                db.session.rollback()
+                job.status = 'failed'
+                job.error = str(e)
+                app.logger.error(f'Background job {job.kind} {job.id} failed: {str(e)}')
+            finally:
+                job.finished_at = datetime.now()
+                db.session.remove()
+
+    threading.Thread(target=run, name=f'job-{kind}', daemon=True).start()
+    return job
+
+
+def run_inline(kind, description, func, *args, **kwargs):
+    """Run a job function synchronously with an untracked progress record."""
+    job = Job(kind, description)
+    job.status = 'running'
+    func(job, *args, **kwargs)
+    job.status = 'finished'
+    return job
+
+
+def get_job(job_id):
+    return _jobs.get(job_id)
+
+
+def list_jobs():
+    with _lock:
+        return sorted(_jobs.values(), key=lambda j: j.created_at, reverse=True)
@@ -0,0 +1,270 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from flask import current_app
+from models import db, User, QuizAttempt, ChangeCounter
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+# ChangeCounter row bumped whenever attempts are deleted
+GENERATION = 'leaderboards'
+
+
+class Leaderboard:
+    """Users ordered best-first by a value, with O(log n) rank lookups.
+
+    Entries are (-value, tiebreak, user_id) tuples kept sorted in a list;
+    a smaller tiebreak wins between equal values. Users with equal values
+    share a rank. An update finds its slot in O(log n) but inserting and
+    removing shift the list, which is O(n); that is a pointer memmove and
+    stays cheap up to around a million entries per board.
+    """
+
+    def __init__(self, entries=()):
+        self._keys = {}
+        for key in entries:
+            self._keys[key[2]] = key
+        self._entries = sorted(self._keys.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def value(self, user_id):
+        key = self._keys.get(user_id)
+        return -key[0] if key else None
+
+    def update(self, user_id, value, tiebreak=0):
+        """Store value for user_id unless their current entry is at least as good."""
+        key = (-value, tiebreak, user_id)
+        old = self._keys.get(user_id)
+        if old is not None:
+            if old <= key:
+                return False
+            del self._entries[bisect_left(self._entries, old)]
+        self._keys[user_id] = key
+        insort(self._entries, key)
+        return True
+
+    def set(self, user_id, value):
+        # Unconditional replace, for running totals that can go either way
+        old = self._keys.pop(user_id, None)
+        if old is not None:
+            del self._entries[bisect_left(self._entries, old)]
+        self.update(user_id, value)
+
+    def top(self, limit):
+        """[(rank, user_id, value)] for the best limit users."""
+        top = []
+        for key in self._entries[:limit]:
+            top.append((bisect_left(self._entries, (key[0],)) + 1, key[2], -key[0]))
+        return top
+
+    def rank(self, user_id):
+        """(rank, percentile) of a user, or None if they have no entry.
+
+        percentile is the share of other users with a strictly lower value.
+        """
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        better = bisect_left(self._entries, (key[0],))
+        worse = len(self._entries) - bisect_right(self._entries, (key[0], float('inf')))
+        others = len(self._entries) - 1
+        return better + 1, (worse / others * 100) if others else 100.0
+
+
+def percentage(score, total_questions):
+    return score * 100 / total_questions if total_questions else 0
+
+
+class LeaderboardRegistry:
+    """Per-quiz boards of each user's best attempt, plus a global board.
+
+    The global value is the sum of a user's best percentages over every quiz
+    they attempted. Boards are built from quiz_attempt on first use, updated
+    in place as this process records attempts, and caught up with attempts
+    committed by other processes at most sync_interval seconds later.
+    Deletions cannot be folded in, so any process that deletes attempts
+    bumps a shared generation (invalidate_leaderboards) and every process
+    rebuilds on its next sync. Only one thread per process rebuilds, in the
+    background, while requests keep reading the previous boards; only the
+    very first build in a process makes readers wait.
+    """
+
+    def __init__(self, sync_interval=5):
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        # Held for the duration of a rebuild, so at most one runs at a time
+        self._rebuild_lock = threading.Lock()
+        self._rebuilder = None
+        self._quizzes = None
+        self._global = None
+        self._last_attempt_id = 0
+        self._generation = None
+        self._synced_at = 0
+
+    def _fold(self, attempt_id, user_id, quiz_id, score, total_questions):
+        board = self._quizzes.get(quiz_id)
+        if board is None:
+            board = self._quizzes[quiz_id] = Leaderboard()
+        value = percentage(score, total_questions)
+        previous = board.value(user_id) or 0
+        # Re-folding an attempt is a no-op, so sync may overlap record()
+        if board.update(user_id, value, attempt_id):
+            self._global.set(user_id, (self._global.value(user_id) or 0) + value - previous)
+
+    def rebuild(self, generation=None):
+        """Load every user's best attempt per quiz in one ranked query."""
+        if generation is None:
+            generation = current_generation()
+        last_attempt_id = db.session.query(db.func.max(QuizAttempt.id)).scalar() or 0
+        ranked = db.session.query(
+            QuizAttempt.id.label('id'),
+            QuizAttempt.user_id.label('user_id'),
+            QuizAttempt.quiz_id.label('quiz_id'),
+            QuizAttempt.score.label('score'),
+            QuizAttempt.total_questions.label('total_questions'),
+            db.func.row_number().over(
+                partition_by=(QuizAttempt.quiz_id, QuizAttempt.user_id),
+                order_by=((QuizAttempt.score * 100.0 / db.func.nullif(QuizAttempt.total_questions, 0)).desc(),
+                          QuizAttempt.id.asc())
+            ).label('position')
+        ).filter(QuizAttempt.id <= last_attempt_id).subquery()
+        rows = db.session.query(ranked.c.id, ranked.c.user_id, ranked.c.quiz_id, ranked.c.score,
+                                ranked.c.total_questions).filter(ranked.c.position == 1)
+
+        entries = {}
+        totals = {}
+        for attempt_id, user_id, quiz_id, score, total_questions in rows:
+            value = percentage(score, total_questions)
+            entries.setdefault(quiz_id, []).append((-value, attempt_id, user_id))
+            totals[user_id] = totals.get(user_id, 0) + value
+        with self._lock:
+            self._quizzes = {quiz_id: Leaderboard(keys) for quiz_id, keys in entries.items()}
+            self._global = Leaderboard((-total, 0, user_id) for user_id, total in totals.items())
+            self._last_attempt_id = last_attempt_id
+            self._generation = generation
+            self._synced_at = time.monotonic()
+
+    def sync(self):
+        """Build the boards if needed, then fold in attempts newer than the last sync.
+
+        A deletion anywhere since the boards were built forces a rebuild.
+        """
+        if self._quizzes is None:
+            # Nothing to serve yet: one thread builds and the others wait for it
+            with self._rebuild_lock:
+                if self._quizzes is None:
+                    self.rebuild()
+            return
+        if time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        generation = current_generation()
+        if generation != self._generation:
+            self._rebuild_in_background(generation)
+            return
+        rows = db.session.query(QuizAttempt.id, QuizAttempt.user_id, QuizAttempt.quiz_id,
+                                QuizAttempt.score, QuizAttempt.total_questions)\
+            .filter(QuizAttempt.id > self._last_attempt_id)\
+            .order_by(QuizAttempt.id)\
+            .all()
+        with self._lock:
+            if self._quizzes is None:
+                return
+            for row in rows:
+                self._fold(*row)
+                self._last_attempt_id = max(self._last_attempt_id, row[0])
+            self._synced_at = time.monotonic()
+
+    def _rebuild_in_background(self, generation):
+        if not self._rebuild_lock.acquire(blocking=False):
+            return
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    try:
+                        self.rebuild(generation)
+                    except Exception as e:
+                        db.session.rollback()
+                        app.logger.error(f'Leaderboard rebuild failed: {str(e)}')
+                    finally:
+                        db.session.remove()
+            finally:
+                self._rebuild_lock.release()
+
+        self._rebuilder = threading.Thread(target=run, name='leaderboard-rebuild', daemon=True)
+        self._rebuilder.start()
+
+    def record(self, attempt):
+        """Fold a committed attempt in straight away."""
+        with self._lock:
+            if self._quizzes is not None:
+                self._fold(attempt.id, attempt.user_id, attempt.quiz_id, attempt.score, attempt.total_questions)
+
+    def reset(self):
+        # Deletions cannot be undone incrementally; the next sync rebuilds
+        # while these boards keep being served
+        with self._lock:
+            self._generation = None
+            self._synced_at = 0
+
+    def _board(self, quiz_id):
+        if self._quizzes is None:
+            return Leaderboard()
+        if quiz_id is None:
+            return self._global
+        return self._quizzes.get(quiz_id) or Leaderboard()
+
+    def rank(self, user_id, quiz_id=None):
+        """(rank, percentile, participants) of a user, or None if they are not ranked."""
+        self.sync()
+        with self._lock:
+            board = self._board(quiz_id)
+            mine = board.rank(user_id)
+            return (*mine, len(board)) if mine else None
+
+    def standings(self, quiz_id=None, user_id=None, limit=DEFAULT_LIMIT):
+        """Top entries with user names, plus the given user's own rank and percentile.
+
+        quiz_id None selects the global board.
+        """
+        self.sync()
+        with self._lock:
+            board = self._board(quiz_id)
+            top = board.top(min(max(limit, 1), MAX_LIMIT))
+            mine = board.rank(user_id) if user_id is not None else None
+            value = board.value(user_id) if user_id is not None else None
+            participants = len(board)
+        names = dict(db.session.query(User.id, User.full_name).filter(User.id.in_([row[1] for row in top])))
+        return {
+            'participants': participants,
+            'top': [{'rank': rank, 'user_id': uid, 'name': names.get(uid), 'value': round(value, 1)}
+                    for rank, uid, value in top],
+            'me': {'rank': mine[0], 'percentile': round(mine[1], 1), 'value': round(value, 1)} if mine else None
+        }
+
+
+def current_generation():
+    return db.session.query(ChangeCounter.value).filter_by(name=GENERATION).scalar() or 0
+
+
+def invalidate_leaderboards():
+    """Make every process rebuild its boards after attempts were deleted (caller commits)."""
+    bumped = db.session.execute(db.update(ChangeCounter).where(ChangeCounter.name == GENERATION)
+                                .values(value=ChangeCounter.value + 1)).rowcount
+    if not bumped:
+        db.session.add(ChangeCounter(name=GENERATION, value=1))
+    _registry.reset()
+
+
+_registry = LeaderboardRegistry()
+
+
+def init_leaderboards(app):
+    _registry.sync_interval = app.config['LEADERBOARD_SYNC_INTERVAL']
+
+
+def get_leaderboards():
+    return _registry
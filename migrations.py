@@ -0,0 +1,121 @@
+from datetime import datetime
+from sqlalchemy import inspect
+from models import db, Chapter, Quiz, Question, QuizAttempt, AttemptSession, QuestionStats, ChangeCounter, PendingDeletion, SchemaVersion
+from search import create_user_search_index, create_prefix_indexes
+
+# Ordered list of (version, description, function). Every migration receives an
+# open connection and must be safe to run against a database whose tables were
+# already created by db.create_all() from the current models.
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return register
+
+
+def add_column_if_missing(connection, table_name, column):
+    columns = {col['name'] for col in inspect(connection).get_columns(table_name)}
+    if column.name not in columns:
+        column_type = column.type.compile(dialect=connection.dialect)
+        ddl = f'ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}'
+        if column.server_default is not None:
+            ddl += f' DEFAULT {column.server_default.arg}'
+            if not column.nullable:
+                ddl += ' NOT NULL'
+        connection.exec_driver_sql(ddl)
+
+
+def create_indexes(connection, table):
+    for index in table.indexes:
+        index.create(connection, checkfirst=True)
+
+
+@migration(1, 'Initial schema')
+def create_initial_schema(connection):
+    db.metadata.create_all(connection)
+
+
+@migration(2, 'Indexes on foreign keys and attempt reporting columns')
+def add_foreign_key_indexes(connection):
+    for model in (Chapter, Quiz, Question, QuizAttempt):
+        create_indexes(connection, model.__table__)
+
+
+@migration(3, 'Quiz content version for answer key caching')
+def add_quiz_content_version(connection):
+    add_column_if_missing(connection, 'quiz', Quiz.__table__.c.content_version)
+
+
+@migration(4, 'Full-text index for admin user search')
+def add_user_search_index(connection):
+    create_user_search_index(connection)
+
+
+@migration(5, 'Server-side quiz attempt sessions')
+def add_attempt_sessions(connection):
+    AttemptSession.__table__.create(connection, checkfirst=True)
+
+
+@migration(6, 'Autosaved answers on attempt sessions')
+def add_attempt_session_answers(connection):
+    add_column_if_missing(connection, 'attempt_session', AttemptSession.__table__.c.answers)
+    add_column_if_missing(connection, 'attempt_session', AttemptSession.__table__.c.saved_at)
+
+
+@migration(7, 'Question pools and per-attempt shuffles')
+def add_question_pools(connection):
+    add_column_if_missing(connection, 'quiz', Quiz.__table__.c.questions_per_attempt)
+    add_column_if_missing(connection, 'quiz', Quiz.__table__.c.shuffle)
+    add_column_if_missing(connection, 'attempt_session', AttemptSession.__table__.c.seed)
+
+
+@migration(8, 'Per-question responses and item analysis')
+def add_item_analysis(connection):
+    add_column_if_missing(connection, 'quiz_attempt', QuizAttempt.__table__.c.responses)
+    QuestionStats.__table__.create(connection, checkfirst=True)
+
+
+@migration(9, 'Quiz content version of attempt session draws')
+def add_session_content_versions(connection):
+    add_column_if_missing(connection, 'attempt_session', AttemptSession.__table__.c.content_version)
+
+
+@migration(10, 'Change counters for cross-process invalidation')
+def add_change_counters(connection):
+    ChangeCounter.__table__.create(connection, checkfirst=True)
+
+
+@migration(11, 'Resumable cascade deletions')
+def add_pending_deletions(connection):
+    PendingDeletion.__table__.create(connection, checkfirst=True)
+
+
+@migration(12, 'Case-insensitive indexes for prefix search')
+def add_prefix_search_indexes(connection):
+    create_prefix_indexes(connection)
+
+
+def current_version(connection):
+    SchemaVersion.__table__.create(connection, checkfirst=True)
+    version = connection.execute(db.select(db.func.max(SchemaVersion.version))).scalar()
+    return version or 0
+
+
+def upgrade_database(logger=None):
+    """Apply pending migrations in order and return the resulting schema version."""
+    with db.engine.begin() as connection:
+        version = current_version(connection)
+        for target, description, func in MIGRATIONS:
+            if target <= version:
+                continue
+            if logger:
+                logger.info(f'Applying schema migration {target}: {description}')
+            func(connection)
+            connection.execute(db.insert(SchemaVersion).values(
+                version=target, description=description, applied_at=datetime.utcnow()))
+            version = target
+    return version
@@ -27,14 +27,17 @@ class Chapter(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
     description = db.Column(db.Text)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False, index=True)
     quizzes = db.relationship('Quiz', backref='chapter', lazy=True)
 
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False, index=True)
     time_duration = db.Column(db.Integer, nullable=False)  # Duration in minutes
     remarks = db.Column(db.Text, nullable=False, default='')  # Make remarks non-nullable with default
+    content_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bumped whenever the quiz or its questions change
+    questions_per_attempt = db.Column(db.Integer)  # Questions drawn from the pool per attempt; NULL uses all
+    shuffle = db.Column(db.Boolean, nullable=False, default=False, server_default='0')  # Per-attempt question and option order
     questions = db.relationship('Question', backref='quiz', lazy=True)
     attempts = db.relationship('QuizAttempt', backref='quiz', lazy=True)
 
@@ -45,7 +48,7 @@ class Quiz(db.Model):
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     question_statement = db.Column(db.Text, nullable=False)
     option1 = db.Column(db.String(150), nullable=False)
     option2 = db.Column(db.String(150), nullable=False)
@@ -55,9 +58,101 @@ class Question(db.Model):
 
 class QuizAttempt(db.Model):
     __tablename__ = 'quiz_attempt'
+    __table_args__ = (
+        db.Index('ix_quiz_attempt_user_id_attempt_date', 'user_id', 'attempt_date'),
+        db.Index('ix_quiz_attempt_quiz_id_score', 'quiz_id', 'score'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     score = db.Column(db.Integer, nullable=False)
     total_questions = db.Column(db.Integer, nullable=False)
-    attempt_date = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    attempt_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    responses = db.Column(db.LargeBinary)  # Packed per-question picks; see item_analysis.pack_responses
+
+class UserStats(db.Model):
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total_attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    total_questions = db.Column(db.Integer, nullable=False, default=0)
+    unique_quizzes = db.Column(db.Integer, nullable=False, default=0)
+    best_percentage = db.Column(db.Float, nullable=False, default=0)
+    last_attempt_id = db.Column(db.Integer)
+
+class UserSubjectStats(db.Model):
+    __tablename__ = 'user_subject_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    total_questions = db.Column(db.Integer, nullable=False, default=0)
+    percentage_sum = db.Column(db.Float, nullable=False, default=0)  # Sum of per-attempt percentages
+
+class UserMonthStats(db.Model):
+    __tablename__ = 'user_month_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    total_questions = db.Column(db.Integer, nullable=False, default=0)
+    unique_quizzes = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AttemptSession(db.Model):
+    # One live row per user and quiz between opening a quiz and submitting it
+    __tablename__ = 'attempt_session'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'quiz_id', name='uq_attempt_session_user_id_quiz_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)  # UTC
+    deadline = db.Column(db.DateTime, nullable=False, index=True)  # UTC
+    seed = db.Column(db.Integer)  # Reproduces the drawn questions and their order
+    content_version = db.Column(db.Integer)  # Quiz content_version the seed was drawn against
+    answers = db.Column(db.Text)  # Autosaved JSON {question_id: option number}
+    saved_at = db.Column(db.DateTime)  # UTC time of the last autosave flush
+
+class QuestionStats(db.Model):
+    # Item analysis results, recomputed in bulk by item_analysis.analyse_items
+    __tablename__ = 'question_stats'
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
+    responses = db.Column(db.Integer, nullable=False, default=0)  # Attempts that were shown the question
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    option1 = db.Column(db.Integer, nullable=False, default=0)  # Times each option was picked
+    option2 = db.Column(db.Integer, nullable=False, default=0)
+    option3 = db.Column(db.Integer, nullable=False, default=0)
+    option4 = db.Column(db.Integer, nullable=False, default=0)
+    difficulty = db.Column(db.Float)  # Share answered correctly
+    discrimination = db.Column(db.Float)  # Point-biserial against the rest of the attempt
+    computed_at = db.Column(db.DateTime, nullable=False)  # UTC
+
+class ChangeCounter(db.Model):
+    # Bumped on changes other processes cannot replay incrementally, such as deletions
+    __tablename__ = 'change_counter'
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class PendingDeletion(db.Model):
+    # A cascade delete in progress, so `flask resume-deletions` can finish it after a crash
+    __tablename__ = 'pending_deletion'
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'target_id', name='uq_pending_deletion_kind_target_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # subject, chapter, quiz or user
+    target_id = db.Column(db.Integer, nullable=False)
+    stage = db.Column(db.String(20), nullable=False)  # First stage not yet finished; see deletion.STAGES
+    quiz_ids = db.Column(db.Text, nullable=False)  # JSON ids of the quizzes in scope
+    user_ids = db.Column(db.Text, nullable=False)  # JSON ids of users whose rollups are rebuilt at the end
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # UTC
+
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_version'
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
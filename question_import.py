@@ -0,0 +1,277 @@
+import csv
+import io
+import json
+import re
+import time
+from werkzeug.datastructures import MultiDict
+from forms import QuestionForm
+from models import db, Quiz, Question
+from grading import OPTION_FIELDS, bump_quiz_version
+from cache import invalidate, CATALOGUE, SUMMARY
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ('csv', 'jsonl', 'json', 'md')
+
+QUIZ_HEADING = re.compile(r'^#\s+Quiz\s+(\d+)\s*$', re.I)
+QUESTION_HEADING = re.compile(r'^##\s+(.*)$')
+OPTION_LINE = re.compile(r'^[-*]\s+\[([ xX])\]\s+(.*)$')
+
+
+class QuestionImportError(ValueError):
+    pass
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    fields = set(reader.fieldnames or [])
+    missing = {'question_statement', 'option1', 'option2', 'option3', 'option4', 'correct_option'} - fields
+    if 'question' in fields:
+        missing.discard('question_statement')
+    if missing:
+        raise QuestionImportError(f'CSV header is missing {", ".join(sorted(missing))}')
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(stream):
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, QuestionImportError(f'invalid JSON: {e}')
+            continue
+        yield line_no, record
+
+
+def read_json(stream):
+    # A JSON document has to be parsed whole; use JSON Lines for very large banks
+    try:
+        records = json.load(stream)
+    except ValueError as e:
+        raise QuestionImportError(f'invalid JSON: {e}')
+    if isinstance(records, dict):
+        records = records.get('questions')
+    if not isinstance(records, list):
+        raise QuestionImportError('JSON must be a list of questions or an object with a "questions" list')
+    for index, record in enumerate(records, 1):
+        yield index, record
+
+
+def read_markdown(stream):
+    """Yield questions written as
+
+        # Quiz 12                 (optional; applies to the questions below it)
+        ## What is 2 + 2?
+        - [ ] 3
+        - [x] 4
+        - [ ] 5
+        - [ ] 22
+
+    The statement may continue on lines between the heading and the options.
+    """
+    quiz = None
+    record = None
+    for line_no, line in enumerate(stream, 1):
+        line = line.rstrip('\n')
+        stripped = line.strip()
+        heading = QUIZ_HEADING.match(stripped)
+        if heading:
+            if record:
+                yield record.pop('line'), record
+                record = None
+            quiz = heading.group(1)
+            continue
+        heading = QUESTION_HEADING.match(stripped)
+        if heading:
+            if record:
+                yield record.pop('line'), record
+            record = {'line': line_no, 'question_statement': heading.group(1).strip(), 'options': [], 'correct': []}
+            if quiz is not None:
+                record['quiz'] = quiz
+            continue
+        if record is None or not stripped:
+            continue
+        option = OPTION_LINE.match(stripped)
+        if option:
+            if option.group(1) != ' ':
+                record['correct'].append(len(record['options']))
+            record['options'].append(option.group(2).strip())
+        elif not record['options']:
+            record['question_statement'] += '\n' + stripped
+    if record:
+        yield record.pop('line'), record
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl, 'json': read_json, 'md': read_markdown}
+
+
+def detect_format(filename=None, content_type=None):
+    name = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type:
+        return 'jsonl'
+    if name.endswith('.json') or content_type == 'application/json':
+        return 'json'
+    if name.endswith(('.md', '.markdown')) or 'markdown' in content_type:
+        return 'md'
+    return 'csv'
+
+
+def as_form_data(record):
+    """Map a CSV row, JSON object or Markdown question onto QuestionForm's fields."""
+    if not isinstance(record, dict):
+        raise QuestionImportError('each question must be an object')
+    data = {'question_statement': record.get('question_statement', record.get('question'))}
+    options = record.get('options')
+    if isinstance(options, list):
+        if len(options) != len(OPTION_FIELDS):
+            raise QuestionImportError(f'expected {len(OPTION_FIELDS)} options, got {len(options)}')
+        data.update(zip(OPTION_FIELDS, options))
+    else:
+        data.update((name, record.get(name)) for name in OPTION_FIELDS)
+    correct = record.get('correct')
+    if isinstance(correct, list):
+        # Markdown checkboxes
+        if len(correct) != 1:
+            raise QuestionImportError('mark exactly one option as correct')
+        data['correct_option'] = OPTION_FIELDS[correct[0]]
+    else:
+        data['correct_option'] = correct_field(record.get('correct_option'), data)
+    return {name: '' if value is None else str(value).strip() for name, value in data.items()}
+
+
+def correct_field(value, data):
+    # Accepts option1-option4, 1-4, A-D or the text of one of the options
+    value = '' if value is None else str(value).strip()
+    if value in OPTION_FIELDS:
+        return value
+    if value in ('1', '2', '3', '4'):
+        return OPTION_FIELDS[int(value) - 1]
+    if len(value) == 1 and value.upper() in 'ABCD':
+        return OPTION_FIELDS['ABCD'.index(value.upper())]
+    for name in OPTION_FIELDS:
+        if value and str(data.get(name) or '').strip() == value:
+            return name
+    return value
+
+
+class QuestionImporter:
+    """Validates questions with QuestionForm and bulk-inserts them in chunked transactions."""
+
+    def __init__(self, quiz_id=None, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+        # quiz_id fixes the target quiz; otherwise every record names its own
+        self.quiz_id = quiz_id
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.quizzes = {}
+        self.form = None
+        self.processed = 0
+        self.valid = 0
+        self.inserted = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line_no, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_no, 'error': message})
+
+    def quiz(self, record):
+        value = record.get('quiz', record.get('quiz_id')) if isinstance(record, dict) else None
+        if self.quiz_id is not None:
+            if value not in (None, '') and str(value).strip() != str(self.quiz_id):
+                raise QuestionImportError(f'question belongs to quiz {value}, not quiz {self.quiz_id}')
+            value = self.quiz_id
+        try:
+            quiz_id = int(value)
+        except (TypeError, ValueError):
+            raise QuestionImportError(f'invalid quiz {value!r}')
+        if quiz_id not in self.quizzes:
+            self.quizzes[quiz_id] = db.session.query(Quiz.id).filter_by(id=quiz_id).scalar() is not None
+        if not self.quizzes[quiz_id]:
+            raise QuestionImportError(f'unknown quiz {quiz_id}')
+        return quiz_id
+
+    def validate(self, record):
+        quiz_id = self.quiz(record)
+        data = MultiDict(as_form_data(record))
+        form = self.form
+        if form is None:
+            form = self.form = QuestionForm(formdata=data, meta={'csrf': False})
+        else:
+            # Binding the form's fields costs more than validating them, so one form is reused
+            form.process(data)
+        if not form.validate():
+            raise QuestionImportError('; '.join(f'{name}: {message}' for name, messages in form.errors.items()
+                                        for message in messages))
+        return {
+            'quiz_id': quiz_id,
+            'question_statement': form.question_statement.data,
+            'option1': form.option1.data,
+            'option2': form.option2.data,
+            'option3': form.option3.data,
+            'option4': form.option4.data,
+            # Stored as the answer text, like add_question does
+            'correct_option': getattr(form, form.correct_option.data).data
+        }
+
+    def insert_chunk(self, rows, lines):
+        if self.dry_run or not rows:
+            return
+        try:
+            db.session.execute(db.insert(Question), rows)
+            for quiz in Quiz.query.filter(Quiz.id.in_({row['quiz_id'] for row in rows})):
+                bump_quiz_version(quiz)
+            db.session.commit()
+            self.inserted += len(rows)
+        except Exception as e:
+            db.session.rollback()
+            for line_no in lines:
+                self.add_error(line_no, f'chunk rolled back: {e}')
+
+    def run(self, records):
+        """Validate every (line number, record) pair, insert the valid ones and return a report."""
+        started = time.perf_counter()
+        rows, lines = [], []
+        for line_no, record in records:
+            self.processed += 1
+            try:
+                if isinstance(record, QuestionImportError):
+                    raise record
+                rows.append(self.validate(record))
+                lines.append(line_no)
+                self.valid += 1
+            except QuestionImportError as e:
+                self.add_error(line_no, str(e))
+                continue
+            if len(rows) >= self.chunk_size:
+                self.insert_chunk(rows, lines)
+                rows, lines = [], []
+        self.insert_chunk(rows, lines)
+        if self.inserted:
+            invalidate(CATALOGUE, SUMMARY)
+        elapsed = time.perf_counter() - started
+        return {
+            'dry_run': self.dry_run,
+            'processed': self.processed,
+            'valid': self.valid,
+            'inserted': self.inserted,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(self.processed / elapsed, 1) if elapsed > 0 else None
+        }
+
+
+def import_stream(stream, fmt, quiz_id=None, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    if fmt not in READERS:
+        raise QuestionImportError(f'unsupported format {fmt!r}')
+    return QuestionImporter(quiz_id, chunk_size, dry_run).run(READERS[fmt](stream))
+
+
+def import_binary_stream(stream, fmt, quiz_id=None, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    return import_stream(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''), fmt, quiz_id, chunk_size,
+                         dry_run)
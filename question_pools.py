@@ -0,0 +1,34 @@
+import random
+from grading import OPTION_FIELDS
+
+SEED_BITS = 31
+
+
+def new_seed():
+    return random.SystemRandom().getrandbits(SEED_BITS)
+
+
+def attempt_layout(quiz, answer_key, seed):
+    """Question ids and per-question option orders for one attempt.
+
+    The pool is the answer key's cached id list, so drawing never touches
+    the question table. A drawn subset keeps pool order unless the quiz
+    shuffles. Sessions store only the seed and the quiz content version it
+    was drawn against (see attempt_sessions.start_session), since the same
+    seed draws differently once the pool changes.
+    """
+    question_ids = list(answer_key.masks)
+    if seed is None:
+        return question_ids, None
+    rng = random.Random(seed)
+    draw = quiz.questions_per_attempt
+    if draw and draw < len(question_ids):
+        drawn = set(rng.sample(question_ids, draw))
+        question_ids = [question_id for question_id in question_ids if question_id in drawn]
+    if quiz.shuffle:
+        rng.shuffle(question_ids)
+    if not quiz.shuffle:
+        return question_ids, None
+    option_orders = [rng.sample(OPTION_FIELDS, len(OPTION_FIELDS)) for _ in question_ids]
+    return question_ids, option_orders
+
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import threading
+from models import db, Question
+from grading import OPTION_FIELDS
+
+# Bumped when the payload's shape changes, so old ETags stop matching
+PAYLOAD_FORMAT = 1
+
+_payloads = {}
+_build_lock = threading.Lock()
+
+
+class QuizPayload:
+    """Serialized question payload for one content version of a quiz."""
+    __slots__ = ('quiz_id', 'version', 'etag', 'document', 'body')
+
+    def __init__(self, quiz_id, version, document):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.etag = payload_etag(quiz_id, version)
+        self.document = document
+        self.body = serialize(document)
+
+    def subset(self, question_ids):
+        """Body with only the given questions, for attempts that drew part of the pool."""
+        wanted = set(question_ids)
+        return serialize(dict(self.document,
+                              questions=[question for question in self.document['questions']
+                                         if question['id'] in wanted]))
+
+
+def serialize(document):
+    return json.dumps(document, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def payload_etag(quiz_id, version, question_ids=None):
+    etag = f'quiz-{quiz_id}-{version}-f{PAYLOAD_FORMAT}'
+    if question_ids is not None:
+        drawn = ','.join(str(question_id) for question_id in sorted(question_ids))
+        etag += '-' + hashlib.sha1(drawn.encode('ascii')).hexdigest()[:12]
+    return etag
+
+
+def build_quiz_payload(quiz):
+    # Question statements and options only; correct answers never leave the server
+    rows = db.session.query(
+        Question.id, Question.question_statement, Question.option1, Question.option2,
+        Question.option3, Question.option4
+    ).filter(Question.quiz_id == quiz.id).order_by(Question.id).all()
+    payload = {
+        'format': PAYLOAD_FORMAT,
+        'quiz': {
+            'id': quiz.id,
+            'title': quiz.remarks,
+            'time_duration': quiz.time_duration,
+            'content_version': quiz.content_version
+        },
+        'option_fields': list(OPTION_FIELDS),
+        'questions': [{'id': row.id, 'statement': row.question_statement, 'options': list(row[2:6])}
+                      for row in rows]
+    }
+    return QuizPayload(quiz.id, quiz.content_version, payload)
+
+
+def get_quiz_payload(quiz):
+    """The quiz's payload bytes, serialized once per content version in this process."""
+    payload = _payloads.get(quiz.id)
+    if payload is not None and payload.version == quiz.content_version:
+        return payload
+    with _build_lock:
+        # Requests that queued behind the first build reuse its bytes
+        payload = _payloads.get(quiz.id)
+        if payload is None or payload.version != quiz.content_version:
+            payload = build_quiz_payload(quiz)
+            _payloads[quiz.id] = payload
+    return payload
+
+
+def invalidate_quiz_payload(quiz_id):
+    _payloads.pop(quiz_id, None)
@@ -0,0 +1,107 @@
+from models import db, User, Subject, Chapter, Quiz, Question, QuizAttempt
+
+
+def attempt_percentage():
+    # Score as a percentage, NULL for attempts on quizzes without questions
+    return QuizAttempt.score * 100.0 / db.func.nullif(QuizAttempt.total_questions, 0)
+
+
+def catalogue_totals():
+    """Counts for the admin overview cards, fetched in a single statement."""
+    row = db.session.query(
+        db.session.query(db.func.count(Subject.id)).scalar_subquery().label('total_subjects'),
+        db.session.query(db.func.count(Chapter.id)).scalar_subquery().label('total_chapters'),
+        db.session.query(db.func.count(Quiz.id)).scalar_subquery().label('total_quizzes'),
+        db.session.query(db.func.count(Question.id)).scalar_subquery().label('total_questions'),
+        db.session.query(db.func.count(User.id))
+            .filter(User.is_admin.isnot(True))
+            .scalar_subquery().label('total_users')
+    ).one()
+
+    return {
+        'total_subjects': row.total_subjects,
+        'total_chapters': row.total_chapters,
+        'total_quizzes': row.total_quizzes,
+        'total_questions': row.total_questions,
+        'total_users': row.total_users
+    }
+
+
+def top_scores_per_quiz():
+    """Best attempt of every attempted quiz along with its unique attempter count."""
+    # Rank attempts inside each quiz; ties go to the earliest attempt
+    ranked = db.session.query(
+        QuizAttempt.quiz_id.label('quiz_id'),
+        QuizAttempt.user_id.label('user_id'),
+        QuizAttempt.score.label('score'),
+        QuizAttempt.total_questions.label('total_questions'),
+        QuizAttempt.attempt_date.label('attempt_date'),
+        db.func.row_number().over(
+            partition_by=QuizAttempt.quiz_id,
+            order_by=(attempt_percentage().desc(), QuizAttempt.id.asc())
+        ).label('position')
+    ).subquery()
+
+    attempters = db.session.query(
+        QuizAttempt.quiz_id.label('quiz_id'),
+        db.func.count(db.distinct(QuizAttempt.user_id)).label('unique_users')
+    ).group_by(QuizAttempt.quiz_id).subquery()
+
+    rows = db.session.query(
+        Quiz.remarks,
+        Chapter.name.label('chapter_name'),
+        Subject.name.label('subject_name'),
+        User.full_name,
+        ranked.c.score,
+        ranked.c.total_questions,
+        ranked.c.attempt_date,
+        attempters.c.unique_users
+    ).join(ranked, ranked.c.quiz_id == Quiz.id)\
+     .join(attempters, attempters.c.quiz_id == Quiz.id)\
+     .join(Chapter, Quiz.chapter_id == Chapter.id)\
+     .join(Subject, Chapter.subject_id == Subject.id)\
+     .join(User, ranked.c.user_id == User.id)\
+     .filter(ranked.c.position == 1)\
+     .all()
+
+    top_scores = []
+    for row in rows:
+        percentage = (row.score / row.total_questions * 100) if row.total_questions else 0
+        top_scores.append({
+            'quiz_name': row.remarks,
+            'chapter': row.chapter_name,
+            'subject': row.subject_name,
+            'user': row.full_name,
+            'score': row.score,
+            'total': row.total_questions,
+            'percentage': round(percentage, 1),
+            'date': row.attempt_date.strftime('%Y-%m-%d'),
+            'attempts': row.unique_users
+        })
+
+    top_scores.sort(key=lambda x: x['percentage'], reverse=True)
+    return top_scores
+
+
+def attempts_per_subject():
+    """Attempt totals for every subject that has at least one attempt."""
+    rows = db.session.query(
+        Subject.name,
+        db.func.count(QuizAttempt.id).label('total_attempts')
+    ).join(Chapter, Subject.id == Chapter.subject_id)\
+     .join(Quiz, Chapter.id == Quiz.chapter_id)\
+     .join(QuizAttempt, Quiz.id == QuizAttempt.quiz_id)\
+     .group_by(Subject.id, Subject.name)\
+     .order_by(db.func.count(QuizAttempt.id).desc())\
+     .all()
+
+    return [{'subject_name': row.name, 'total_attempts': row.total_attempts} for row in rows]
+
+
+def admin_summary_report():
+    """Everything admin_summary renders, in a constant number of queries."""
+    return {
+        'summary': catalogue_totals(),
+        'top_scores': top_scores_per_quiz(),
+        'subject_attempts': attempts_per_subject()
+    }
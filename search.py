@@ -0,0 +1,158 @@
+import sqlite3
+from sqlalchemy.orm import selectinload
+from models import db, User, Subject, Chapter, UserStats
+from stats import rebuild_user_stats
+
+USER_SEARCH_TABLE = 'user_search'
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# The trigram tokenizer cannot match terms shorter than three characters
+MIN_FTS_TERM = 3
+# NOCASE indexes let SQLite answer case-insensitive LIKE 'term%' with a range seek
+PREFIX_INDEXES = (
+    ('ix_user_username_nocase', 'user', 'username'),
+    ('ix_user_full_name_nocase', 'user', 'full_name'),
+    ('ix_user_qualification_nocase', 'user', 'qualification'),
+    ('ix_subject_name_nocase', 'subject', 'name'),
+    ('ix_subject_description_nocase', 'subject', 'description'),
+    ('ix_chapter_name_nocase', 'chapter', 'name'),
+)
+
+_user_search_enabled = None
+
+
+def fts5_trigram_supported():
+    try:
+        connection = sqlite3.connect(':memory:')
+        try:
+            connection.execute("CREATE VIRTUAL TABLE probe USING fts5(value, tokenize='trigram')")
+        finally:
+            connection.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def create_user_search_index(connection):
+    """Create the FTS5 index over user names and keep it in sync with triggers.
+
+    Does nothing (and searches fall back to LIKE) on databases other than
+    SQLite or SQLite builds without FTS5's trigram tokenizer.
+    """
+    if connection.dialect.name != 'sqlite' or not fts5_trigram_supported():
+        return False
+    connection.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {USER_SEARCH_TABLE} USING fts5("
+        "username, full_name, qualification, content='user', content_rowid='id', tokenize='trigram')"
+    )
+    columns = 'username, full_name, qualification'
+    new_values = 'new.username, new.full_name, new.qualification'
+    old_values = 'old.username, old.full_name, old.qualification'
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {USER_SEARCH_TABLE}_ai AFTER INSERT ON user BEGIN "
+        f"INSERT INTO {USER_SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    )
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {USER_SEARCH_TABLE}_ad AFTER DELETE ON user BEGIN "
+        f"INSERT INTO {USER_SEARCH_TABLE}({USER_SEARCH_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values}); END"
+    )
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {USER_SEARCH_TABLE}_au AFTER UPDATE ON user BEGIN "
+        f"INSERT INTO {USER_SEARCH_TABLE}({USER_SEARCH_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {USER_SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    )
+    connection.exec_driver_sql(f"INSERT INTO {USER_SEARCH_TABLE}({USER_SEARCH_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def create_prefix_indexes(connection):
+    """Create the NOCASE indexes behind prefix searches (SQLite only)."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for name, table, column in PREFIX_INDEXES:
+        connection.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS {name} ON "{table}" ({column} COLLATE NOCASE)')
+
+
+def user_search_enabled():
+    global _user_search_enabled
+    if _user_search_enabled is None:
+        _user_search_enabled = db.engine.dialect.name == 'sqlite' and db.session.execute(
+            db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': USER_SEARCH_TABLE}
+        ).first() is not None
+    return _user_search_enabled
+
+
+def like_pattern(term, prefix_only=False):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'{escaped}%' if prefix_only else f'%{escaped}%'
+
+
+def prefix_match(column, term):
+    # SQLite's LIKE is already case-insensitive and only uses the NOCASE indexes
+    # when the column is compared as is; ilike would wrap it in lower()
+    pattern = like_pattern(term, prefix_only=True)
+    if db.engine.dialect.name == 'sqlite':
+        return column.like(pattern, escape='\\')
+    return column.ilike(pattern, escape='\\')
+
+
+def page_size(limit):
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_page(query, id_column, after, limit):
+    # Seek past the last id of the previous page instead of using OFFSET
+    if after:
+        query = query.filter(id_column > after)
+    rows = query.order_by(id_column).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+
+def search_users(term, after=None, limit=None):
+    """One page of non-admin users matching term, with their attempt rollups."""
+    limit = page_size(limit)
+    term = (term or '').strip()
+    query = User.query.filter(User.is_admin.isnot(True))
+    if term and len(term) >= MIN_FTS_TERM and user_search_enabled():
+        phrase = '"' + term.replace('"', '""') + '"'
+        matches = db.text(f'SELECT rowid FROM {USER_SEARCH_TABLE} WHERE {USER_SEARCH_TABLE} MATCH :phrase')\
+            .bindparams(phrase=phrase)
+        query = query.filter(User.id.in_(matches))
+    elif term:
+        # Short terms, and every term without FTS5, match as prefixes; one
+        # indexed SELECT per column keeps the planner on the NOCASE indexes
+        matches = db.union(*(
+            db.select(User.id).where(prefix_match(column, term))
+            for column in (User.username, User.full_name, User.qualification)
+        ))
+        query = query.filter(User.id.in_(matches))
+    users, has_more = keyset_page(query, User.id, after, limit)
+
+    user_ids = [user.id for user in users]
+    stats = {row.user_id: row for row in UserStats.query.filter(UserStats.user_id.in_(user_ids))}
+    missing = [user_id for user_id in user_ids if user_id not in stats]
+    if missing:
+        rebuild_user_stats(missing)
+        db.session.commit()
+        stats = {row.user_id: row for row in UserStats.query.filter(UserStats.user_id.in_(user_ids))}
+    return [(user, stats.get(user.id)) for user in users], has_more
+
+
+def search_subjects(term, after=None, limit=None):
+    """One page of subjects whose name, description or a chapter name starts with term."""
+    limit = page_size(limit)
+    term = (term or '').strip()
+    query = Subject.query.options(selectinload(Subject.chapters))
+    if term:
+        matches = db.union(
+            db.select(Subject.id).where(prefix_match(Subject.name, term)),
+            db.select(Subject.id).where(prefix_match(Subject.description, term)),
+            db.select(Chapter.subject_id).where(prefix_match(Chapter.name, term))
+        )
+        query = query.filter(Subject.id.in_(matches))
+    return keyset_page(query, Subject.id, after, limit)
@@ -0,0 +1,193 @@
+from datetime import datetime
+from sqlalchemy.dialects.sqlite import insert as upsert
+from models import db, Subject, Chapter, Quiz, QuizAttempt, UserStats, UserSubjectStats, UserMonthStats
+
+# Keep IN (...) lists well below SQLite's bound parameter limit
+REBUILD_CHUNK_SIZE = 500
+
+
+def attempt_percentage(score, total_questions):
+    return (score / total_questions * 100) if total_questions > 0 else 0
+
+
+def month_key(moment):
+    """SQL expression for the YYYY-MM rollup key, shared by the incremental and rebuild paths."""
+    return db.func.strftime('%Y-%m', moment)
+
+
+def month_name(key):
+    return datetime.strptime(key, '%Y-%m').strftime('%B %Y')
+
+
+def greatest(column, value):
+    return db.case((column < value, value), else_=column)
+
+
+def record_attempt(attempt, subject_id):
+    """Fold a freshly flushed attempt into the user's rollups (caller commits).
+
+    Counters change through UPDATE ... SET col = col + delta and upserts, so
+    concurrent submissions by the same user cannot lose an increment.
+    """
+    percentage = attempt_percentage(attempt.score, attempt.total_questions)
+    previous = QuizAttempt.query.filter(
+        QuizAttempt.user_id == attempt.user_id,
+        QuizAttempt.quiz_id == attempt.quiz_id,
+        QuizAttempt.id != attempt.id
+    )
+    month = db.session.query(month_key(QuizAttempt.attempt_date)).filter(QuizAttempt.id == attempt.id).scalar()
+    first_on_quiz = not db.session.query(previous.exists()).scalar()
+    first_in_month = first_on_quiz or not db.session.query(
+        previous.filter(month_key(QuizAttempt.attempt_date) == month).exists()).scalar()
+
+    bumped = db.session.execute(db.update(UserStats).where(UserStats.user_id == attempt.user_id).values(
+        total_attempts=UserStats.total_attempts + 1,
+        total_score=UserStats.total_score + attempt.score,
+        total_questions=UserStats.total_questions + attempt.total_questions,
+        unique_quizzes=UserStats.unique_quizzes + int(first_on_quiz),
+        best_percentage=greatest(UserStats.best_percentage, percentage),
+        last_attempt_id=greatest(db.func.coalesce(UserStats.last_attempt_id, 0), attempt.id)
+    ).execution_options(synchronize_session='fetch')).rowcount
+    if not bumped:
+        # No rollup yet: derive it from history, which already includes this attempt
+        rebuild_user_stats([attempt.user_id])
+        return
+
+    subject_row = upsert(UserSubjectStats).values(
+        user_id=attempt.user_id, subject_id=subject_id, attempts=1, total_score=attempt.score,
+        total_questions=attempt.total_questions, percentage_sum=percentage)
+    db.session.execute(subject_row.on_conflict_do_update(
+        index_elements=[UserSubjectStats.user_id, UserSubjectStats.subject_id],
+        set_={'attempts': UserSubjectStats.attempts + 1,
+              'total_score': UserSubjectStats.total_score + attempt.score,
+              'total_questions': UserSubjectStats.total_questions + attempt.total_questions,
+              'percentage_sum': UserSubjectStats.percentage_sum + percentage}))
+
+    month_row = upsert(UserMonthStats).values(
+        user_id=attempt.user_id, month=month, attempts=1, total_score=attempt.score,
+        total_questions=attempt.total_questions, unique_quizzes=1)
+    db.session.execute(month_row.on_conflict_do_update(
+        index_elements=[UserMonthStats.user_id, UserMonthStats.month],
+        set_={'attempts': UserMonthStats.attempts + 1,
+              'total_score': UserMonthStats.total_score + attempt.score,
+              'total_questions': UserMonthStats.total_questions + attempt.total_questions,
+              'unique_quizzes': UserMonthStats.unique_quizzes + int(first_in_month)}))
+
+
+def _rebuild_chunk(user_ids):
+    def scoped(query):
+        if user_ids is None:
+            return query
+        return query.filter(QuizAttempt.user_id.in_(user_ids))
+
+    for model in (UserStats, UserSubjectStats, UserMonthStats):
+        delete = model.query
+        if user_ids is not None:
+            delete = delete.filter(model.user_id.in_(user_ids))
+        delete.delete()
+
+    percentage = db.func.coalesce(
+        QuizAttempt.score * 100.0 / db.func.nullif(QuizAttempt.total_questions, 0), 0)
+
+    user_rows = scoped(db.session.query(
+        QuizAttempt.user_id,
+        db.func.count(QuizAttempt.id),
+        db.func.sum(QuizAttempt.score),
+        db.func.sum(QuizAttempt.total_questions),
+        db.func.count(db.distinct(QuizAttempt.quiz_id)),
+        db.func.max(percentage),
+        db.func.max(QuizAttempt.id)
+    )).group_by(QuizAttempt.user_id)
+    db.session.execute(db.insert(UserStats).from_select(
+        ['user_id', 'total_attempts', 'total_score', 'total_questions',
+         'unique_quizzes', 'best_percentage', 'last_attempt_id'],
+        user_rows
+    ))
+
+    subject_rows = scoped(db.session.query(
+        QuizAttempt.user_id,
+        Chapter.subject_id,
+        db.func.count(QuizAttempt.id),
+        db.func.sum(QuizAttempt.score),
+        db.func.sum(QuizAttempt.total_questions),
+        db.func.sum(percentage)
+    ).join(Quiz, QuizAttempt.quiz_id == Quiz.id)
+     .join(Chapter, Quiz.chapter_id == Chapter.id))\
+        .group_by(QuizAttempt.user_id, Chapter.subject_id)
+    db.session.execute(db.insert(UserSubjectStats).from_select(
+        ['user_id', 'subject_id', 'attempts', 'total_score', 'total_questions', 'percentage_sum'],
+        subject_rows
+    ))
+
+    month = month_key(QuizAttempt.attempt_date)
+    month_rows = scoped(db.session.query(
+        QuizAttempt.user_id,
+        month,
+        db.func.count(QuizAttempt.id),
+        db.func.sum(QuizAttempt.score),
+        db.func.sum(QuizAttempt.total_questions),
+        db.func.count(db.distinct(QuizAttempt.quiz_id))
+    )).group_by(QuizAttempt.user_id, month)
+    db.session.execute(db.insert(UserMonthStats).from_select(
+        ['user_id', 'month', 'attempts', 'total_score', 'total_questions', 'unique_quizzes'],
+        month_rows
+    ))
+
+    if user_ids is not None:
+        # Users without attempts still get an (empty) rollup row
+        existing = {row.user_id for row in
+                    db.session.query(UserStats.user_id).filter(UserStats.user_id.in_(user_ids))}
+        for user_id in set(user_ids) - existing:
+            db.session.add(UserStats(user_id=user_id, total_attempts=0, total_score=0,
+                                     total_questions=0, unique_quizzes=0, best_percentage=0))
+        db.session.flush()
+
+
+def rebuild_user_stats(user_ids=None):
+    """Recompute rollups from QuizAttempt for the given users, or everyone (caller commits)."""
+    if user_ids is None:
+        _rebuild_chunk(None)
+        return
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), REBUILD_CHUNK_SIZE):
+        _rebuild_chunk(user_ids[start:start + REBUILD_CHUNK_SIZE])
+
+
+def users_with_attempts(quiz_ids):
+    """Ids of users holding attempts on any of the given quizzes."""
+    quiz_ids = list(quiz_ids)
+    user_ids = set()
+    for start in range(0, len(quiz_ids), REBUILD_CHUNK_SIZE):
+        chunk = quiz_ids[start:start + REBUILD_CHUNK_SIZE]
+        user_ids.update(row.user_id for row in db.session.query(QuizAttempt.user_id)
+                        .filter(QuizAttempt.quiz_id.in_(chunk)).distinct())
+    return user_ids
+
+
+def delete_user_stats(user_id):
+    for model in (UserStats, UserSubjectStats, UserMonthStats):
+        model.query.filter_by(user_id=user_id).delete()
+
+
+def get_user_stats(user_id):
+    """The user's rollup row, built on first access for pre-existing users."""
+    user_stats = UserStats.query.get(user_id)
+    if user_stats is None:
+        rebuild_user_stats([user_id])
+        db.session.commit()
+        user_stats = UserStats.query.get(user_id)
+    return user_stats
+
+
+def get_subject_stats(user_id):
+    return db.session.query(UserSubjectStats, Subject.name)\
+        .join(Subject, UserSubjectStats.subject_id == Subject.id)\
+        .filter(UserSubjectStats.user_id == user_id)\
+        .order_by(UserSubjectStats.subject_id)\
+        .all()
+
+
+def get_month_stats(user_id):
+    return UserMonthStats.query.filter_by(user_id=user_id)\
+        .order_by(UserMonthStats.month.desc())\
+        .all()
@@ -0,0 +1,177 @@
+import glob
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+# Seconds a failed build is reported as failed before it is tried again
+DEFAULT_RETRY_SECONDS = 30
+
+_executor = None
+_pending = {}
+# cache_key -> monotonic time until which a failed build is not retried
+_failed = {}
+_lock = threading.Lock()
+
+
+class SummaryPdfFailed(Exception):
+    """The last build of this summary failed and its retry backoff has not run out."""
+
+
+def build_summary_pdf(summary):
+    """Render the performance summary PDF from plain data (no database access)."""
+    # ReportLab is slow to import, so only PDF builds pay for it
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    buffer = BytesIO()
+
+    # Create the PDF object using ReportLab
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # Add title
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30
+    )
+    elements.append(Paragraph("Quiz Performance Summary", title_style))
+    elements.append(Spacer(1, 20))
+
+    # Add overall statistics
+    elements.append(Paragraph("Overall Statistics", styles['Heading2']))
+    overall_data = [
+        ["Total Quizzes Attempted", str(summary['total_quizzes'])],
+        ["Average Score", f"{summary['average_score']:.1f}%"]
+    ]
+    overall_table = Table(overall_data)
+    overall_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 14),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elements.append(overall_table)
+    elements.append(Spacer(1, 20))
+
+    # Add month-wise statistics
+    elements.append(Paragraph("Month-wise Statistics", styles['Heading2']))
+    month_data = [["Month", "Total Attempts", "Unique Quizzes", "Average Score"]]
+    for month in summary['months']:
+        month_data.append([
+            month['month'],
+            str(month['attempts']),
+            str(month['unique_quizzes']),
+            f"{month['score']:.1f}%"
+        ])
+
+    month_table = Table(month_data)
+    month_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ALIGN', (1, 1), (-1, -1), 'CENTER')
+    ]))
+    elements.append(month_table)
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def summary_cache_key(user_stats):
+    # The latest attempt id changes on every submission; the attempt count also
+    # changes when older attempts are deleted
+    return f'{user_stats.user_id}-{user_stats.last_attempt_id or 0}-{user_stats.total_attempts}'
+
+
+def cached_summary_path(cache_dir, cache_key):
+    # Absolute, because send_file resolves relative paths against the app root
+    return os.path.abspath(os.path.join(cache_dir, f'summary_{cache_key}.pdf'))
+
+
+def _write_summary(cache_dir, user_id, cache_key, summary):
+    path = cached_summary_path(cache_dir, cache_key)
+    data = build_summary_pdf(summary)
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    # Older summaries of this user can never be served again
+    for stale in glob.glob(os.path.join(os.path.dirname(path), f'summary_{user_id}-*.pdf')):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path
+
+
+def _finished(cache_key, future, retry_seconds):
+    error = future.exception()
+    with _lock:
+        _pending.pop(cache_key, None)
+        if error is not None:
+            _failed[cache_key] = time.monotonic() + retry_seconds
+    if error is not None:
+        logging.getLogger(__name__).error(f'Summary PDF {cache_key} failed: {error}')
+
+
+def _check_failed(cache_key):
+    # Caller holds _lock
+    retry_at = _failed.get(cache_key)
+    if retry_at is None:
+        return
+    if time.monotonic() < retry_at:
+        raise SummaryPdfFailed('Your summary PDF could not be built. Please try again in a few minutes.')
+    del _failed[cache_key]
+
+
+def request_summary_pdf(cache_dir, user_id, cache_key, load_summary, max_workers=2,
+                        retry_seconds=DEFAULT_RETRY_SECONDS):
+    """Path of the cached PDF, or None after making sure a worker is building it.
+
+    load_summary is called in the calling thread, and only on a cache miss, to
+    collect the data the background build needs. Raises SummaryPdfFailed for
+    retry_seconds after a build failed, so pollers stop instead of
+    resubmitting a build that keeps failing.
+    """
+    global _executor
+    path = cached_summary_path(cache_dir, cache_key)
+    if os.path.exists(path):
+        return path
+    with _lock:
+        _check_failed(cache_key)
+        if cache_key in _pending:
+            return None
+    summary = load_summary()
+    with _lock:
+        _check_failed(cache_key)
+        if cache_key in _pending:
+            return None
+        if os.path.exists(path):
+            return path
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary-pdf')
+        future = _executor.submit(_write_summary, cache_dir, user_id, cache_key, summary)
+        _pending[cache_key] = future
+    future.add_done_callback(lambda f: _finished(cache_key, f, retry_seconds))
+    return None
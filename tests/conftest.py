@@ -0,0 +1,111 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app.py reads its configuration at import time
+WORKDIR = tempfile.mkdtemp(prefix='quiz_master_tests_')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(WORKDIR, "test.db")}'
+os.environ['CACHE_BACKEND'] = 'none'
+os.environ['PASSWORD_HASH_COST'] = '1024'
+os.environ['IDENTITY_CACHE_TTL'] = '0'
+os.environ['PDF_CACHE_DIR'] = os.path.join(WORKDIR, 'pdf_cache')
+# Log files and other relative paths land in the temporary directory
+os.chdir(WORKDIR)
+
+from flask import g
+from flask.testing import FlaskClient
+from sqlalchemy import event
+from app import app as flask_app, seed_admin
+from migrations import upgrade_database
+from models import db, User, Subject, Chapter, Quiz, Question, QuizAttempt
+
+PASSWORD = 'password123'
+
+
+class RequestClient(FlaskClient):
+    """Requests run inside the fixture's app context, so start each with an empty g
+    as a server would; otherwise Flask-Login's cached user leaks between clients."""
+
+    def open(self, *args, **kwargs):
+        for name in list(g):
+            g.pop(name)
+        return super().open(*args, **kwargs)
+
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    flask_app.test_client_class = RequestClient
+    flask_app.config['WTF_CSRF_ENABLED'] = False
+    with flask_app.app_context():
+        upgrade_database()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        seed_admin()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'admin@example.com', 'password': 'admin123'})
+    assert response.status_code == 302
+    return client
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements run inside the block into the yielded list."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def seed(subjects=2, chapters=2, quizzes=2, questions=3, users=3, attempts_per_quiz=2):
+    """Add a catalogue, users and attempts on every quiz; returns the new quizzes."""
+    from auth import hash_password
+    password = hash_password(PASSWORD)
+    start = User.query.filter(User.is_admin.isnot(True)).count()
+    new_users = [User(username=f'user{start + index}@example.com', password=password,
+                      full_name=f'User {start + index}', qualification='Test', dob=datetime(2000, 1, 1).date())
+                 for index in range(users)]
+    db.session.add_all(new_users)
+    new_quizzes = []
+    for s in range(subjects):
+        subject = Subject(name=f'Subject {s}', description='')
+        db.session.add(subject)
+        for c in range(chapters):
+            chapter = Chapter(name=f'Chapter {s}.{c}', description='', subject=subject)
+            db.session.add(chapter)
+            for q in range(quizzes):
+                quiz = Quiz(chapter=chapter, time_duration=10, remarks=f'Quiz {s}.{c}.{q}')
+                db.session.add(quiz)
+                new_quizzes.append(quiz)
+                for n in range(questions):
+                    db.session.add(Question(quiz=quiz, question_statement=f'Question number {n}?', option1='a',
+                                            option2='b', option3='c', option4='d', correct_option='a'))
+    db.session.flush()
+    for index, quiz in enumerate(new_quizzes):
+        for a in range(attempts_per_quiz):
+            user = new_users[(index + a) % len(new_users)]
+            db.session.add(QuizAttempt(user_id=user.id, quiz_id=quiz.id, score=(index + a) % (questions + 1),
+                                       total_questions=questions,
+                                       attempt_date=datetime(2024, 1, 1) + timedelta(days=index + a)))
+    db.session.commit()
+    return new_quizzes
@@ -0,0 +1,44 @@
+from conftest import count_queries, seed
+from reports import admin_summary_report
+
+
+def page_queries(client):
+    client.get('/admin_summary')  # warm the session user and lazily built state
+    with count_queries() as statements:
+        response = client.get('/admin_summary')
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_report_query_count_is_constant(app):
+    seed(subjects=1, chapters=1, quizzes=2)
+    with count_queries() as small:
+        report = admin_summary_report()
+    assert len(report['top_scores']) == 2
+
+    seed(subjects=4, chapters=3, quizzes=5, users=10, attempts_per_quiz=6)
+    with count_queries() as large:
+        report = admin_summary_report()
+    assert len(report['top_scores']) == 62
+    assert len(large) == len(small)
+
+
+def test_page_query_count_is_constant(app, admin_client):
+    seed(subjects=1, chapters=1, quizzes=2)
+    small = page_queries(admin_client)
+    seed(subjects=4, chapters=3, quizzes=5, users=10, attempts_per_quiz=6)
+    assert page_queries(admin_client) == small
+
+
+def test_report_figures(app):
+    quizzes = seed(subjects=2, chapters=1, quizzes=1, questions=4, users=2, attempts_per_quiz=2)
+    report = admin_summary_report()
+    assert report['summary']['total_subjects'] == 2
+    assert report['summary']['total_quizzes'] == 2
+    assert report['summary']['total_questions'] == 8
+    assert report['summary']['total_users'] == 2
+    top = {row['quiz_name']: row for row in report['top_scores']}
+    # Attempts on the first quiz scored 0 and 1, on the second 1 and 2
+    assert top[quizzes[0].remarks]['score'] == 1
+    assert top[quizzes[1].remarks]['score'] == 2
+    assert all(row['attempts'] == 2 for row in report['top_scores'])
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from assets import VENDOR, build_assets
+
+VENDORED = next(iter(VENDOR))
+
+
+@pytest.fixture
+def static_folder(app, tmp_path):
+    # A copy of static/ without any vendored files
+    os.makedirs(tmp_path / 'css')
+    for name in ('custom.css', 'admin.css'):
+        (tmp_path / 'css' / name).write_text('body { color: red; }\n')
+    original = app.static_folder
+    app.static_folder = str(tmp_path)
+    app.extensions['assets'] = None
+    yield tmp_path
+    app.static_folder = original
+    app.extensions['assets'] = None
+
+
+def test_missing_vendored_file_is_not_fetched_from_the_cdn(app, static_folder):
+    response = app.test_client().get(f'/static/{VENDORED}')
+    assert response.status_code == 404
+    assert 'Location' not in response.headers
+
+
+def test_vendored_file_is_fingerprinted(app, static_folder):
+    assert VENDORED not in build_assets(str(static_folder), offline=True, log=lambda message: None)
+    os.makedirs(static_folder / os.path.dirname(VENDORED))
+    (static_folder / VENDORED).write_text('window.Chart = function () {};\n')
+    manifest = build_assets(str(static_folder), offline=True, log=lambda message: None)
+    app.extensions['assets'] = None
+    response = app.test_client().get(f'/static/{manifest[VENDORED]}')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
@@ -0,0 +1,42 @@
+import re
+from datetime import datetime, timedelta
+
+from conftest import PASSWORD, seed
+from models import db, AttemptSession, QuizAttempt
+
+SESSION_FIELD = re.compile(r'name="attempt_session" value="(\d+)"')
+
+
+def start_attempt(app, quiz_id):
+    client = app.test_client()
+    client.post('/login', data={'username': 'user0@example.com', 'password': PASSWORD})
+    page = client.get(f'/attempt_quiz/{quiz_id}').get_data(as_text=True)
+    return client, SESSION_FIELD.search(page).group(1)
+
+
+def test_submission_redirects_and_ends_the_session(app):
+    quiz_id = seed(subjects=1, chapters=1, quizzes=1, users=1, attempts_per_quiz=0)[0].id
+    client, session_id = start_attempt(app, quiz_id)
+    response = client.post(f'/attempt_quiz/{quiz_id}', data={'attempt_session': session_id})
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/user_dashboard')
+    dashboard = client.get('/user_dashboard').get_data(as_text=True)
+    assert 'Quiz submitted successfully' in dashboard
+    assert 'An error occurred' not in dashboard
+    assert AttemptSession.query.count() == 0
+
+    # The same session cannot be submitted twice
+    client.post(f'/attempt_quiz/{quiz_id}', data={'attempt_session': session_id})
+    assert 'already been submitted' in client.get('/user_dashboard').get_data(as_text=True)
+    assert QuizAttempt.query.filter_by(quiz_id=quiz_id).count() == 1
+
+
+def test_late_submission_is_not_recorded(app):
+    quiz_id = seed(subjects=1, chapters=1, quizzes=1, users=1, attempts_per_quiz=0)[0].id
+    client, session_id = start_attempt(app, quiz_id)
+    db.session.execute(db.update(AttemptSession).values(deadline=datetime.utcnow() - timedelta(hours=1)))
+    db.session.commit()
+    client.post(f'/attempt_quiz/{quiz_id}', data={'attempt_session': session_id})
+    assert 'Time is up' in client.get('/user_dashboard').get_data(as_text=True)
+    assert QuizAttempt.query.filter_by(quiz_id=quiz_id).count() == 0
+    assert AttemptSession.query.count() == 0
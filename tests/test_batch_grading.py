@@ -0,0 +1,62 @@
+import io
+import random
+
+import batch_grading
+from batch_grading import grade_stream
+from conftest import seed
+from grading import OPTION_FIELDS, get_answer_key
+from models import db, Question, QuizAttempt, UserStats
+
+
+def mixed_answer_key_quiz():
+    quiz = seed(subjects=1, chapters=1, quizzes=1, questions=6, users=4, attempts_per_quiz=0)[0]
+    questions = Question.query.filter_by(quiz_id=quiz.id).order_by(Question.id).all()
+    for index, question in enumerate(questions):
+        question.correct_option = getattr(question, OPTION_FIELDS[index % 4])
+    # Two options share the right answer's text, so either one scores
+    questions[-1].option3 = questions[-1].option1 = 'same'
+    questions[-1].correct_option = 'same'
+    # Edits through edit_question store the option field name instead of the text
+    questions[-2].correct_option = 'option4'
+    quiz.content_version += 1
+    db.session.commit()
+    return quiz, questions
+
+
+def test_batch_scores_match_answer_key_grade(app, monkeypatch):
+    quiz, questions = mixed_answer_key_quiz()
+    rebuilds = []
+    rebuild = batch_grading.rebuild_user_stats
+
+    def counted_rebuild(user_ids):
+        rebuilds.append(set(user_ids))
+        rebuild(user_ids)
+
+    monkeypatch.setattr(batch_grading, 'rebuild_user_stats', counted_rebuild)
+
+    rng = random.Random(7)
+    sheets = []
+    for line in range(25):
+        picks = [rng.choice([None, 1, 2, 3, 4]) for _ in questions]
+        sheets.append((f'user{line % 4}@example.com', picks))
+    text = 'user,quiz,answers\n' + ''.join(
+        f"{user},{quiz.id},{';'.join('' if pick is None else str(pick) for pick in picks)}\n"
+        for user, picks in sheets)
+
+    report = grade_stream(io.StringIO(text), 'csv', chunk_size=4)
+    assert report['inserted'] == len(sheets) and report['error_count'] == 0
+
+    answer_key = get_answer_key(quiz)
+    attempts = QuizAttempt.query.filter_by(quiz_id=quiz.id).order_by(QuizAttempt.id).all()
+    for attempt, (_, picks) in zip(attempts, sheets):
+        form = {f'question_{question.id}': OPTION_FIELDS[pick - 1]
+                for question, pick in zip(questions, picks) if pick is not None}
+        assert attempt.score == answer_key.grade(form)
+        assert attempt.total_questions == len(questions)
+
+    # Seven chunks, one rollup rebuild covering every user
+    assert len(rebuilds) == 1 and len(rebuilds[0]) == 4
+    totals = {row.user_id: row.total_score for row in UserStats.query}
+    for user_id in rebuilds[0]:
+        assert totals[user_id] == sum(a.score for a in attempts if a.user_id == user_id)
+
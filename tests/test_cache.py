@@ -0,0 +1,40 @@
+import threading
+
+from flask import g
+
+from cache import MemoryCache, NullCache, cached, invalidate, CATALOGUE, SUMMARY
+
+
+def as_worker(app, cache):
+    # Each worker process has its own backend; g starts empty per request
+    app.extensions['cache'] = cache
+    g.pop('cache_generations', None)
+
+
+def test_invalidation_reaches_other_workers(app):
+    original = app.extensions['cache']
+    first, second = MemoryCache(), MemoryCache()
+    try:
+        as_worker(app, second)
+        assert cached(CATALOGUE, 'tree', lambda: 'old') == 'old'
+        assert cached(SUMMARY, 'admin', lambda: 'summary') == 'summary'
+
+        as_worker(app, first)
+        invalidate(CATALOGUE)
+
+        as_worker(app, second)
+        assert cached(CATALOGUE, 'tree', lambda: 'new') == 'new'
+        # Other namespaces keep their entries
+        assert cached(SUMMARY, 'admin', lambda: 'rebuilt') == 'summary'
+    finally:
+        app.extensions['cache'] = original
+
+
+def test_stats_count_every_lookup_across_threads():
+    cache = NullCache()
+    threads = [threading.Thread(target=lambda: [cache.get('key') for _ in range(2000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats.to_dict()['misses'] == 16000
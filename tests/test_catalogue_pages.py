@@ -0,0 +1,29 @@
+import pytest
+
+from conftest import count_queries, seed
+
+PAGES = ('/quiz_management', '/admin_dashboard', '/admin/search/subjects', '/admin_summary')
+
+
+def page_queries(client, path):
+    client.get(path)  # warm the session user and lazily built state
+    with count_queries() as statements:
+        response = client.get(path)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('path', PAGES)
+def test_query_count_does_not_grow_with_catalogue(app, admin_client, path):
+    seed(subjects=2, chapters=2, quizzes=2)
+    small = page_queries(admin_client, path)
+    # Twice the chapters and quizzes per chapter
+    seed(subjects=2, chapters=4, quizzes=4)
+    assert page_queries(admin_client, path) == small
+
+
+def test_quiz_management_lists_whole_tree(app, admin_client):
+    seed(subjects=1, chapters=2, quizzes=3, questions=4)
+    page = admin_client.get('/quiz_management').get_data(as_text=True)
+    assert 'Chapter 0.1' in page
+    assert 'Quiz 0.1.2' in page
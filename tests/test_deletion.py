@@ -0,0 +1,75 @@
+import re
+
+import pytest
+
+from conftest import PASSWORD, seed
+from deletion import cascade_delete, pending_deletions
+from models import db, User, Subject, Chapter, Quiz, Question, QuizAttempt, AttemptSession, UserStats
+
+SESSION_FIELD = re.compile(r'name="attempt_session" value="(\d+)"')
+
+
+class RecordingJob:
+    def __init__(self, on_stage=None):
+        self.on_stage = on_stage or {}
+        self.stages = []
+
+    def update(self, **progress):
+        stage = progress.get('stage')
+        if stage:
+            self.stages.append(stage)
+            if stage in self.on_stage:
+                self.on_stage[stage]()
+
+
+def test_submission_during_cascade_is_rejected(app):
+    quiz = seed(subjects=1, chapters=1, quizzes=1, users=1, attempts_per_quiz=3)[0]
+    quiz_id, subject_id = quiz.id, quiz.chapter.subject_id
+    client = app.test_client()
+    client.post('/login', data={'username': 'user0@example.com', 'password': PASSWORD})
+    page = client.get(f'/attempt_quiz/{quiz_id}').get_data(as_text=True)
+    session_id = SESSION_FIELD.search(page).group(1)
+
+    def submit_and_reopen():
+        # The subject row goes last, but nothing under it can be taken meanwhile
+        assert db.session.get(Subject, subject_id) is not None
+        client.post(f'/attempt_quiz/{quiz_id}', data={'attempt_session': session_id})
+        assert client.get(f'/attempt_quiz/{quiz_id}').status_code == 404
+        assert AttemptSession.query.count() == 0
+
+    job = RecordingJob({'attempts': submit_and_reopen})
+    cascade_delete(job, 'subject', subject_id, batch_size=2)
+    assert job.stages == ['attempts', 'questions', 'catalogue', 'statistics', 'done']
+    for model in (Subject, Chapter, Quiz, Question, QuizAttempt, AttemptSession):
+        assert db.session.query(model).count() == 0
+    assert not pending_deletions()
+
+
+class WorkerDied(Exception):
+    pass
+
+
+def test_interrupted_cascade_is_resumed(app):
+    quizzes = seed(subjects=1, chapters=1, quizzes=2, users=2, attempts_per_quiz=3)
+    quiz_id = quizzes[0].id
+    user_ids = [user.id for user in User.query.filter(User.is_admin.isnot(True))]
+
+    def die():
+        raise WorkerDied()
+
+    with pytest.raises(WorkerDied):
+        cascade_delete(RecordingJob({'questions': die}), 'quiz', quiz_id, batch_size=2)
+    db.session.rollback()
+    # Attempts are gone, but the quiz and its questions are still there
+    assert [(pending.kind, pending.stage) for pending in pending_deletions()] == [('quiz', 'questions')]
+    assert QuizAttempt.query.filter_by(quiz_id=quiz_id).count() == 0
+    assert db.session.get(Quiz, quiz_id) is not None
+
+    job = RecordingJob()
+    cascade_delete(job, 'quiz', quiz_id, batch_size=2)
+    assert job.stages == ['questions', 'catalogue', 'statistics', 'done']
+    assert db.session.get(Quiz, quiz_id) is None
+    assert Question.query.filter_by(quiz_id=quiz_id).count() == 0
+    assert not pending_deletions()
+    for user_id in user_ids:
+        assert db.session.get(UserStats, user_id).total_attempts == QuizAttempt.query.filter_by(user_id=user_id).count()
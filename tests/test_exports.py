@@ -0,0 +1,53 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+from conftest import seed
+from exports import COLUMNS
+from models import db, Chapter, Quiz, QuizAttempt, Subject, User
+
+
+def download(client, **params):
+    response = client.get('/admin/export/attempts', query_string=params)
+    assert response.status_code == 200
+    assert response.is_streamed
+    return response
+
+
+def test_csv_export_streams_filtered_rows_with_formulas_escaped(app, admin_client, monkeypatch):
+    monkeypatch.setitem(app.config, 'EXPORT_BATCH_SIZE', 2)
+    seed(subjects=2, chapters=1, quizzes=2)
+    user = User.query.filter_by(username='user0@example.com').one()
+    user.full_name = '=HYPERLINK("http://example.com")'
+    db.session.commit()
+    subject = Subject.query.filter_by(name='Subject 0').one()
+
+    response = download(admin_client, subject_id=subject.id, start='2024-01-01', end='2024-01-02')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+    expected = [row.id for row in db.session.query(QuizAttempt.id).join(Quiz).join(Chapter)
+                .filter(Chapter.subject_id == subject.id, QuizAttempt.attempt_date < datetime(2024, 1, 3))
+                .order_by(QuizAttempt.id)]
+    assert len(expected) == 3
+    assert [int(row['attempt_id']) for row in rows] == expected
+    assert {row['subject'] for row in rows} == {'Subject 0'}
+    escaped = [row for row in rows if row['username'] == 'user0@example.com']
+    assert escaped and all(row['full_name'] == '\'=HYPERLINK("http://example.com")' for row in escaped)
+
+
+def test_gzip_export_decompresses_to_the_full_jsonl(app, admin_client, monkeypatch):
+    monkeypatch.setitem(app.config, 'EXPORT_BATCH_SIZE', 3)
+    seed(subjects=1, chapters=2, quizzes=2)
+    response = download(admin_client, format='jsonl', gzip='1')
+    assert response.mimetype == 'application/gzip'
+    assert response.headers['Content-Disposition'].endswith('.jsonl.gz')
+
+    lines = gzip.decompress(response.get_data()).decode('utf-8').splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == QuizAttempt.query.count() == 8
+    assert list(records[0]) == list(COLUMNS)
+    first = QuizAttempt.query.order_by(QuizAttempt.id).first()
+    assert records[0]['attempt_id'] == first.id
+    assert records[0]['percentage'] == round(first.score / first.total_questions * 100, 2)
@@ -0,0 +1,70 @@
+import threading
+
+from conftest import seed
+from deletion import cascade_delete
+from leaderboards import LeaderboardRegistry
+from models import db, User, QuizAttempt
+from test_deletion import RecordingJob
+
+
+def ranked_users(registry, quiz_id=None):
+    return {row['user_id'] for row in registry.standings(quiz_id, limit=100)['top']}
+
+
+def rebuilt(registry):
+    registry.sync()
+    registry._rebuilder.join()
+    return registry
+
+
+def test_other_processes_drop_deleted_users(app):
+    quizzes = seed(subjects=1, chapters=1, quizzes=2, users=3, attempts_per_quiz=3)
+    user_ids = [user.id for user in User.query.filter(User.is_admin.isnot(True)).order_by(User.id)]
+    # Each registry stands in for the boards held by one worker process
+    other = LeaderboardRegistry(sync_interval=0)
+    assert ranked_users(other) == set(user_ids)
+
+    cascade_delete(RecordingJob(), 'user', user_ids[0])
+    assert ranked_users(rebuilt(other)) == set(user_ids[1:])
+    assert user_ids[0] not in ranked_users(other, quizzes[0].id)
+
+
+def test_one_thread_rebuilds_while_others_read_the_old_boards(app):
+    seed(subjects=1, chapters=1, quizzes=1, users=3, attempts_per_quiz=3)
+    user_id = User.query.filter(User.is_admin.isnot(True)).first().id
+    registry = LeaderboardRegistry(sync_interval=0)
+    registry.sync()
+    cascade_delete(RecordingJob(), 'user', user_id)
+
+    started, release, calls = threading.Event(), threading.Event(), []
+    rebuild = registry.rebuild
+
+    def slow_rebuild(generation=None):
+        calls.append(generation)
+        started.set()
+        release.wait(5)
+        rebuild(generation)
+
+    registry.rebuild = slow_rebuild
+    registry.sync()
+    assert started.wait(5)
+    for _ in range(3):
+        # Served from the previous boards without starting another rebuild
+        assert user_id in ranked_users(registry)
+    release.set()
+    registry._rebuilder.join()
+    assert len(calls) == 1
+    assert user_id not in ranked_users(registry)
+
+
+def test_new_attempts_are_folded_in_without_rebuild(app):
+    quiz = seed(subjects=1, chapters=1, quizzes=1, users=2, attempts_per_quiz=2)[0]
+    other = LeaderboardRegistry(sync_interval=0)
+    other.sync()
+    boards = other._quizzes
+    user = User.query.filter(User.is_admin.isnot(True)).first()
+    db.session.add(QuizAttempt(user_id=user.id, quiz_id=quiz.id, score=3, total_questions=3))
+    db.session.commit()
+    assert other.standings(quiz.id)['top'][0] == {'rank': 1, 'user_id': user.id, 'name': user.full_name,
+                                                 'value': 100.0}
+    assert other._quizzes is boards
@@ -0,0 +1,84 @@
+import io
+
+from conftest import seed
+from models import db, Question, Quiz
+from question_import import import_stream
+
+CSV_BANK = '''question_statement,option1,option2,option3,option4,correct_option
+What is the capital of France?,Paris,Rome,Berlin,Madrid,Paris
+Which planet is the largest?,Mars,Jupiter,Venus,Earth,B
+How many sides has a hexagon?,5,6,7,8,option2
+Short?,a,b,c,d,a
+Which gas do plants absorb?,Oxygen,Nitrogen,Carbon dioxide,Helium,3
+What is 12 times 12 exactly?,124,144,142,122,2
+'''
+
+MARKDOWN_BANK = '''# Quiz {quiz_id}
+## What is 2 + 2 in base ten?
+- [ ] 3
+- [x] 4
+- [ ] 5
+- [ ] 22
+
+## Which of these is a prime
+number below ten?
+- [ ] 4
+- [ ] 6
+- [x] 7
+- [ ] 9
+
+## Which colours mix into green?
+- [x] Blue and yellow
+- [x] Yellow and blue
+- [ ] Red and white
+- [ ] Black and white
+'''
+
+
+def question_count(quiz_id):
+    return Question.query.filter_by(quiz_id=quiz_id).count()
+
+
+def test_csv_dry_run_reports_errors_and_writes_nothing(app):
+    quiz = seed(subjects=1, chapters=1, quizzes=1, questions=2, attempts_per_quiz=0)[0]
+    version = quiz.content_version
+
+    report = import_stream(io.StringIO(CSV_BANK), 'csv', quiz_id=quiz.id, dry_run=True)
+
+    assert report['dry_run']
+    assert (report['processed'], report['valid'], report['inserted']) == (6, 5, 0)
+    assert report['error_count'] == 1
+    assert report['errors'][0]['line'] == 5
+    assert 'at least 10 characters' in report['errors'][0]['error']
+    assert question_count(quiz.id) == 2
+    assert db.session.get(Quiz, quiz.id).content_version == version
+
+
+def test_csv_import_inserts_valid_rows_in_chunks(app):
+    quiz = seed(subjects=1, chapters=1, quizzes=1, questions=2, attempts_per_quiz=0)[0]
+    version = quiz.content_version
+
+    report = import_stream(io.StringIO(CSV_BANK), 'csv', quiz_id=quiz.id, chunk_size=2)
+
+    assert (report['processed'], report['inserted'], report['error_count']) == (6, 5, 1)
+    assert question_count(quiz.id) == 7
+    imported = Question.query.filter_by(quiz_id=quiz.id).order_by(Question.id).all()[2:]
+    # Every form of correct_option is stored as the answer text
+    assert [question.correct_option for question in imported] == ['Paris', 'Jupiter', '6', 'Carbon dioxide', '144']
+    assert db.session.get(Quiz, quiz.id).content_version > version
+
+
+def test_markdown_import_rejects_ambiguous_answers(app):
+    quiz = seed(subjects=1, chapters=1, quizzes=1, questions=0, attempts_per_quiz=0)[0]
+    bank = MARKDOWN_BANK.format(quiz_id=quiz.id)
+
+    dry_run = import_stream(io.StringIO(bank), 'md', dry_run=True)
+    assert (dry_run['valid'], dry_run['inserted'], dry_run['error_count']) == (2, 0, 1)
+    assert question_count(quiz.id) == 0
+
+    report = import_stream(io.StringIO(bank), 'md', chunk_size=1)
+    assert (report['processed'], report['inserted']) == (3, 2)
+    assert report['errors'] == [{'line': 15, 'error': 'mark exactly one option as correct'}]
+    statements = [question.question_statement for question in
+                  Question.query.filter_by(quiz_id=quiz.id).order_by(Question.id)]
+    assert statements == ['What is 2 + 2 in base ten?', 'Which of these is a prime\nnumber below ten?']
@@ -0,0 +1,79 @@
+import json
+import re
+
+from conftest import PASSWORD, seed
+from grading import bump_quiz_version, get_answer_key
+from models import db, AttemptSession, Question, QuizAttempt
+from question_pools import attempt_layout
+
+QUESTION_IDS = re.compile(r'const questionIds = (\[[^\]]*\]);')
+SESSION_FIELD = re.compile(r'name="attempt_session" value="(\d+)"')
+
+
+def test_draw_keeps_pool_order_without_shuffle(app):
+    quiz = seed(subjects=1, chapters=1, quizzes=1, questions=10)[0]
+    quiz.questions_per_attempt = 4
+    pool = list(get_answer_key(quiz).masks)
+    for seed_value in range(50):
+        question_ids, option_orders = attempt_layout(quiz, get_answer_key(quiz), seed_value)
+        assert len(question_ids) == 4
+        assert question_ids == sorted(question_ids, key=pool.index)
+        assert option_orders is None
+
+
+def open_quiz(client, quiz_id):
+    page = client.get(f'/attempt_quiz/{quiz_id}').get_data(as_text=True)
+    return json.loads(QUESTION_IDS.search(page).group(1)), SESSION_FIELD.search(page).group(1)
+
+
+def start_pooled_quiz(app):
+    quiz = seed(subjects=1, chapters=1, quizzes=1, questions=6, users=1, attempts_per_quiz=0)[0]
+    quiz.questions_per_attempt = 3
+    db.session.commit()
+    client = app.test_client()
+    client.post('/login', data={'username': 'user0@example.com', 'password': PASSWORD})
+    return quiz, client
+
+
+def test_grading_redraws_the_questions_shown(app):
+    quiz, client = start_pooled_quiz(app)
+    shown, session_id = open_quiz(client, quiz.id)
+    # A reload rebuilds the same draw from the stored seed
+    assert open_quiz(client, quiz.id) == (shown, session_id)
+    answers = {f'question_{question_id}': 'option1' for question_id in shown}
+    client.post(f'/attempt_quiz/{quiz.id}', data={'attempt_session': session_id, **answers})
+    attempt = QuizAttempt.query.filter_by(quiz_id=quiz.id).one()
+    assert (attempt.score, attempt.total_questions) == (3, 3)
+
+
+def test_submission_after_the_quiz_changed_is_not_graded(app):
+    quiz, client = start_pooled_quiz(app)
+    quiz_id = quiz.id
+    shown, session_id = open_quiz(client, quiz_id)
+
+    # The pool changes while the attempt is open
+    for number in range(5):
+        db.session.add(Question(quiz_id=quiz_id, question_statement=f'Late question {number}?', option1='a',
+                                option2='b', option3='c', option4='d', correct_option='a'))
+    bump_quiz_version(quiz)
+    db.session.commit()
+
+    answers = {f'question_{question_id}': 'option1' for question_id in shown}
+    client.post(f'/attempt_quiz/{quiz_id}', data={'attempt_session': session_id, **answers})
+    assert 'was changed while you were taking it' in client.get('/user_dashboard').get_data(as_text=True)
+    assert QuizAttempt.query.filter_by(quiz_id=quiz_id).count() == 0
+
+
+def test_reload_after_the_quiz_changed_draws_again(app):
+    quiz, client = start_pooled_quiz(app)
+    _, session_id = open_quiz(client, quiz.id)
+    deadline = db.session.get(AttemptSession, int(session_id)).deadline
+    bump_quiz_version(quiz)
+    db.session.commit()
+
+    shown, reopened_id = open_quiz(client, quiz.id)
+    session = db.session.get(AttemptSession, int(reopened_id))
+    assert (reopened_id, session.deadline, session.content_version) == (session_id, deadline, quiz.content_version)
+    answers = {f'question_{question_id}': 'option1' for question_id in shown}
+    client.post(f'/attempt_quiz/{quiz.id}', data={'attempt_session': session_id, **answers})
+    assert QuizAttempt.query.filter_by(quiz_id=quiz.id).one().score == 3
@@ -0,0 +1,55 @@
+import re
+
+from conftest import PASSWORD, seed
+from grading import bump_quiz_version
+from models import db, Question
+
+QUESTION_IDS = re.compile(r'const questionIds = (\[[^\]]*\]);')
+SESSION_FIELD = re.compile(r'name="attempt_session" value="(\d+)"')
+
+
+def login(app, index):
+    client = app.test_client()
+    client.post('/login', data={'username': f'user{index}@example.com', 'password': PASSWORD})
+    return client
+
+
+def open_quiz(client, quiz_id):
+    page = client.get(f'/attempt_quiz/{quiz_id}').get_data(as_text=True)
+    return SESSION_FIELD.search(page).group(1), QUESTION_IDS.search(page).group(1)
+
+
+def test_questions_need_a_live_session_of_your_own(app):
+    quiz_id = seed(subjects=1, chapters=1, quizzes=1, users=2, attempts_per_quiz=0)[0].id
+    owner, other = login(app, 0), login(app, 1)
+    url = f'/api/v1/quizzes/{quiz_id}/questions'
+    assert owner.get(url).status_code == 404
+    session_id, _ = open_quiz(owner, quiz_id)
+    assert other.get(url, query_string={'attempt_session': session_id}).status_code == 403
+
+    response = owner.get(url, query_string={'attempt_session': session_id})
+    assert response.status_code == 200
+    assert len(response.get_json()['questions']) == 3
+    revalidated = owner.get(url, query_string={'attempt_session': session_id},
+                            headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_pooled_quiz_only_sends_the_drawn_questions(app):
+    quiz = seed(subjects=1, chapters=1, quizzes=1, questions=8, users=1, attempts_per_quiz=0)[0]
+    quiz.questions_per_attempt = 3
+    db.session.commit()
+    client = login(app, 0)
+    session_id, shown = open_quiz(client, quiz.id)
+    response = client.get(f'/api/v1/quizzes/{quiz.id}/questions', query_string={'attempt_session': session_id})
+    payload = response.get_json()
+    assert str([question['id'] for question in payload['questions']]).replace(' ', '') == shown.replace(' ', '')
+    assert 'correct_option' not in response.get_data(as_text=True)
+
+    # The draw no longer matches once a question is deleted
+    Question.query.filter_by(id=payload['questions'][0]['id']).delete()
+    bump_quiz_version(quiz)
+    db.session.commit()
+    response = client.get(f'/api/v1/quizzes/{quiz.id}/questions', query_string={'attempt_session': session_id},
+                          headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 409
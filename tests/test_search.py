@@ -0,0 +1,51 @@
+from sqlalchemy import event
+
+from models import db
+from conftest import seed
+
+
+def plans(statements):
+    """EXPLAIN QUERY PLAN details of every recorded SELECT."""
+    details = []
+    with db.engine.connect() as connection:
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith('SELECT'):
+                rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+                details.extend(row[-1] for row in rows)
+    return details
+
+
+def search(client, kind, term):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(f'/admin/search/{kind}', query_string={'q': term})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return response.get_json(), statements
+
+
+def test_short_user_terms_match_prefixes_through_an_index(app, admin_client):
+    seed(subjects=1, chapters=1, quizzes=1, users=12)
+    payload, _ = search(admin_client, 'users', 'sEr')
+    assert len(payload['results']) == 12
+    payload, statements = search(admin_client, 'users', 'US')
+    assert len(payload['results']) == 12
+    assert not search(admin_client, 'users', 'se')[0]['results']
+    search_plan = [detail for detail in plans(statements) if 'user' in detail]
+    assert any('ix_user_username_nocase' in detail for detail in search_plan)
+    assert not any(detail.startswith('SCAN user') for detail in search_plan)
+
+
+def test_subject_terms_match_subject_or_chapter_prefixes(app, admin_client):
+    seed(subjects=3, chapters=2, quizzes=1)
+    payload, _ = search(admin_client, 'subjects', 'subject 1')
+    assert [row['name'] for row in payload['results']] == ['Subject 1']
+    payload, statements = search(admin_client, 'subjects', 'chapter 2.')
+    assert [row['name'] for row in payload['results']] == ['Subject 2']
+    assert any('ix_chapter_name_nocase' in detail for detail in plans(statements))
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from conftest import seed
+from models import db, User, QuizAttempt, UserStats, UserSubjectStats, UserMonthStats
+from stats import get_user_stats, rebuild_user_stats, record_attempt
+
+ROLLUPS = (UserStats, UserSubjectStats, UserMonthStats)
+
+
+def snapshot(user_id):
+    # Sums of percentages are floats, so compare them rounded
+    return {model.__tablename__: sorted(
+        tuple(round(value, 6) if isinstance(value, float) else value
+              for value in (getattr(row, column.name) for column in model.__table__.columns))
+        for row in model.query.filter_by(user_id=user_id))
+        for model in ROLLUPS}
+
+
+def test_incremental_rollups_match_a_rebuild(app):
+    quizzes = seed(subjects=2, chapters=1, quizzes=2, users=2, attempts_per_quiz=1)
+    user = User.query.filter(User.is_admin.isnot(True)).first()
+    get_user_stats(user.id)
+    # Repeat quizzes, new quizzes, and dates either side of a month boundary
+    for quiz, score, moment in ((quizzes[0], 3, datetime(2024, 1, 31, 23, 59)), (quizzes[0], 1, datetime(2024, 2, 1)),
+                                (quizzes[3], 2, datetime(2024, 2, 15)), (quizzes[3], 0, datetime(2024, 2, 16))):
+        attempt = QuizAttempt(user_id=user.id, quiz_id=quiz.id, score=score, total_questions=3, attempt_date=moment)
+        db.session.add(attempt)
+        db.session.flush()
+        record_attempt(attempt, quiz.chapter.subject_id)
+        db.session.commit()
+    incremental = snapshot(user.id)
+
+    rebuild_user_stats()
+    db.session.commit()
+    assert snapshot(user.id) == incremental
+    assert db.session.get(UserStats, user.id).total_attempts == QuizAttempt.query.filter_by(user_id=user.id).count()
@@ -0,0 +1,58 @@
+import time
+
+import summary_pdf
+from conftest import PASSWORD, seed
+
+DOWNLOAD = '/user/summary/download'
+STATUS = '/user/summary/download/status'
+
+
+def login(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'user0@example.com', 'password': PASSWORD})
+    return client
+
+
+def wait_for_builds(timeout=10):
+    # A build leaves _pending only once its outcome is recorded
+    deadline = time.monotonic() + timeout
+    while summary_pdf._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_summary_is_built_in_the_background(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'PDF_CACHE_DIR', str(tmp_path))
+    seed(subjects=1, chapters=1, quizzes=1, users=1, attempts_per_quiz=2)
+    client = login(app)
+    assert client.get(DOWNLOAD).status_code == 202
+    wait_for_builds()
+    assert client.get(STATUS).get_json()['ready'] is True
+    response = client.get(DOWNLOAD)
+    assert response.status_code == 200
+    assert response.data.startswith(b'%PDF')
+
+
+def test_failed_build_is_reported_instead_of_resubmitted(app, tmp_path, monkeypatch):
+    # A file where the cache directory should be, so every build fails
+    blocked = tmp_path / 'blocked'
+    blocked.write_text('')
+    monkeypatch.setitem(app.config, 'PDF_CACHE_DIR', str(blocked / 'pdf_cache'))
+    monkeypatch.setattr(summary_pdf, '_failed', {})
+    seed(subjects=1, chapters=1, quizzes=1, users=1, attempts_per_quiz=2)
+    client = login(app)
+    assert client.get(DOWNLOAD).status_code == 202
+    wait_for_builds()
+
+    status = client.get(STATUS)
+    assert status.status_code == 503
+    assert status.get_json()['ready'] is False
+    assert 'could not be built' in status.get_json()['error']
+    assert not summary_pdf._pending
+    page = client.get(DOWNLOAD)
+    assert page.status_code == 503
+    assert 'could not be built' in page.get_data(as_text=True)
+
+    # Once the backoff runs out the build is tried again
+    monkeypatch.setattr(summary_pdf, '_failed', {key: 0 for key in summary_pdf._failed})
+    assert client.get(DOWNLOAD).status_code == 202
+    wait_for_builds()
@@ -0,0 +1,118 @@
+from models import db, Quiz, QuizAttempt
+
+# Points drawn on the dashboard trend chart, however long the history is
+MAX_TREND_POINTS = 120
+RECENT_ATTEMPTS = 2
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def attempt_rows(user_id):
+    """Column-projected attempts of a user joined with their quiz names, as tuples."""
+    return db.session.query(
+        QuizAttempt.id,
+        QuizAttempt.attempt_date,
+        QuizAttempt.score,
+        QuizAttempt.total_questions,
+        Quiz.remarks
+    ).outerjoin(Quiz, Quiz.id == QuizAttempt.quiz_id)\
+        .filter(QuizAttempt.user_id == user_id)
+
+
+def percentage(score, total_questions):
+    return round(score / total_questions * 100, 1) if total_questions else 0.0
+
+
+def recent_point(row):
+    attempt_id, attempt_date, score, total_questions, remarks = row
+    return {
+        'quiz_name': remarks or 'Unknown Quiz',
+        'score': score,
+        'total_questions': total_questions,
+        'attempt_date': attempt_date.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def trend_point(row):
+    attempt_id, attempt_date, score, total_questions, remarks = row
+    return {
+        'id': attempt_id,
+        'quiz_name': remarks or 'Unknown Quiz',
+        'score': score,
+        'total_questions': total_questions,
+        'attempt_date': attempt_date.strftime('%Y-%m-%d'),
+        'percentage': percentage(score, total_questions)
+    }
+
+
+def downsample(points, max_points, value=lambda point: point['percentage']):
+    """Pick at most max_points of points with largest-triangle-three-buckets.
+
+    The first and last points are always kept; every other kept point is a
+    real attempt chosen to preserve the visual peaks and dips of the series.
+    """
+    if max_points < 3 or len(points) <= max_points:
+        return list(points)
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (max_points - 2)
+    previous = 0
+    for bucket in range(max_points - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(points))
+        # Average of the following bucket is the third corner of the triangle
+        following = range(end, next_end) or [len(points) - 1]
+        avg_x = sum(following) / len(following)
+        avg_y = sum(value(points[index]) for index in following) / len(following)
+        prev_y = value(points[previous])
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            area = abs((previous - avg_x) * (value(points[index]) - prev_y)
+                       - (previous - index) * (avg_y - prev_y))
+            if area > best_area:
+                best, best_area = index, area
+        sampled.append(points[best])
+        previous = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def dashboard_history(user_id, max_points=MAX_TREND_POINTS):
+    """Recent results, a downsampled trend series and the attempt count, from one query."""
+    rows = attempt_rows(user_id)\
+        .order_by(QuizAttempt.attempt_date.asc(), QuizAttempt.id.asc())\
+        .all()
+    recent = [recent_point(row) for row in reversed(rows[-RECENT_ATTEMPTS:])]
+    trend = downsample([trend_point(row) for row in rows], max_points)
+    return recent, trend, len(rows)
+
+
+def page_size(limit):
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def trend_page(user_id, before=None, limit=None):
+    """One full-resolution page of the trend, walking back from the newest attempt.
+
+    before is the id of the oldest attempt on the previous page. Returns the
+    points in chronological order and the cursor for the next older page.
+    """
+    limit = page_size(limit)
+    query = attempt_rows(user_id)
+    if before:
+        cursor = db.session.query(QuizAttempt.attempt_date)\
+            .filter(QuizAttempt.id == before, QuizAttempt.user_id == user_id)\
+            .scalar_subquery()
+        query = query.filter(db.or_(
+            QuizAttempt.attempt_date < cursor,
+            db.and_(QuizAttempt.attempt_date == cursor, QuizAttempt.id < before)
+        ))
+    rows = query.order_by(QuizAttempt.attempt_date.desc(), QuizAttempt.id.desc())\
+        .limit(limit + 1)\
+        .all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    points = [trend_point(row) for row in reversed(rows)]
+    return points, (rows[-1][0] if has_more else None)